@@ -1,3 +1,4 @@
-from . import preprocessing # noqa: F401
-from . import util # noqa: F401
-from . import nepho # noqa: F401
\ No newline at end of file
+from ._lazy import attach
+
+# Subpackages are imported on first use; see lars._lazy.
+__getattr__, __dir__, __all__ = attach(__name__, {}, submodules=["preprocessing", "util", "nepho"])
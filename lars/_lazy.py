@@ -0,0 +1,49 @@
+"""Deferred imports for package ``__init__`` modules (PEP 562).
+
+The plotting helpers, radar readers and model SDKs that lars wraps take
+seconds to import between them. Packages declare which submodule each
+public name lives in and import it on first attribute access, so
+``import lars`` stays cheap and a worker only loads what it uses.
+"""
+import importlib
+from typing import Dict, Iterable, List, Tuple
+
+
+def attach(package: str, names: Dict[str, str],
+           submodules: Iterable[str] = ()) -> Tuple:
+    """
+    Build ``__getattr__``, ``__dir__`` and ``__all__`` for a lazy package.
+
+    Parameters
+    ----------
+    package : str
+        The package's ``__name__``.
+    names : dict
+        Mapping of public name to the relative module defining it, e.g.
+        ``{"OllamaModel": ".ollama_model"}``.
+    submodules : iterable of str
+        Submodules that are themselves exposed as attributes.
+
+    Returns
+    -------
+    tuple
+        ``(__getattr__, __dir__, __all__)`` to assign in the package.
+    """
+    submodules = set(submodules)
+    public: List[str] = sorted(set(names) | submodules)
+
+    def __getattr__(name):
+        if name in submodules:
+            return importlib.import_module(f".{name}", package)
+        module = names.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module, package), name)
+        # Cache on the package so later lookups skip __getattr__.
+        setattr(importlib.import_module(package), name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(importlib.import_module(package))) | set(public))
+
+    return __getattr__, __dir__, public
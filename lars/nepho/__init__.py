@@ -1,4 +1,23 @@
-from . import models # noqa: F401
+from .._lazy import attach
 from .config import config, Config # noqa: F401
-from .inference import label_radar_data, DEFAULT_CATEGORIES, CODEBOOK_CATEGORIES, CODEBOOK_GUIDELINES, CODEBOOK_CRITERIA, CODEBOOK_COLOR_CRITERIA, CODEBOOK_COLORMAP, COLOR_DBZ_RANGE, DEFAULT_VMIN, DEFAULT_VMAX, categories_from_codebook, guidelines_from_codebook, criteria_from_codebook, color_criteria_from_codebook, colormap_from_codebook # noqa: F401
-from .tracking import compute_validation_metrics, log_run_to_mlflow, codebook_hash # noqa: F401
+
+# Backends and their SDKs (openai, aiohttp, asksageclient) load on first use.
+__getattr__, __dir__, __all__ = attach(__name__, {
+    **dict.fromkeys(["label_radar_data", "iter_label_radar_data", "label_radar_data_ensemble",
+                     "DEFAULT_CATEGORIES", "CODEBOOK_CATEGORIES", "CODEBOOK_GUIDELINES",
+                     "CODEBOOK_CRITERIA", "CODEBOOK_COLOR_CRITERIA", "CODEBOOK_COLORMAP",
+                     "COLOR_DBZ_RANGE", "DEFAULT_VMIN", "DEFAULT_VMAX",
+                     "categories_from_codebook", "guidelines_from_codebook",
+                     "criteria_from_codebook", "color_criteria_from_codebook",
+                     "colormap_from_codebook", "probability_columns"], ".inference"),
+    "LabelJournal": ".journal",
+    **dict.fromkeys(["label_radar_data_batch", "write_batch_requests"], ".batch"),
+    **dict.fromkeys(["HTTPTransport", "get_transport", "set_transport"], ".transport"),
+    **dict.fromkeys(["RetryPolicy", "CircuitBreaker", "TransientModelError"], ".retry"),
+    "AdaptiveConcurrency": ".concurrency",
+    **dict.fromkeys(["RateLimiter", "get_rate_limiter", "set_rate_limiter"], ".ratelimit"),
+    "EndpointPool": ".endpoints",
+    **dict.fromkeys(["get_model", "register_model", "available_backends"], ".models.registry"),
+    **dict.fromkeys(["compute_validation_metrics", "log_run_to_mlflow", "codebook_hash"],
+                    ".tracking"),
+}, submodules=["models"])
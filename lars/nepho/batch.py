@@ -0,0 +1,402 @@
+"""OpenAI Batch API execution mode for large labelling runs.
+
+Instead of one synchronous chat call per image, every request for a
+DataFrame is written to Batch-API JSON-lines files, uploaded and run as
+batch jobs. Batch jobs are billed at a discount and do not count against
+the synchronous rate limits, which suits seasonal backfills where nobody
+is waiting for the answer. A batch input file holds at most
+``BATCH_MAX_REQUESTS`` requests and ``BATCH_MAX_BYTES`` bytes, so larger
+runs are split into several jobs. The job IDs are kept in a small state
+file so an interrupted run picks the same jobs up again instead of
+resubmitting.
+"""
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from ..preprocessing.labels import apply_criteria_to_labels
+from .config import config
+from .inference import (DEFAULT_CATEGORIES, _build_prompt, _label_lookup,
+                        _parse_label, _resolve_color_scale, _row_prompt)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+# OpenAI's limits on a single batch input file.
+BATCH_MAX_REQUESTS = 50_000
+BATCH_MAX_BYTES = 200 * 1024 * 1024
+_FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def _custom_id(pos):
+    return f"row-{pos}"
+
+
+def _load_state(state_path):
+    if state_path is None or not os.path.exists(state_path):
+        return {}
+    with open(state_path, "r") as f:
+        return json.load(f)
+
+
+def _part_path(state_path, index):
+    """Request file for job ``index``: next to the state file, or a temp file."""
+    if state_path is not None:
+        return f"{state_path}.requests-{index}.jsonl"
+    fd, path = tempfile.mkstemp(suffix=".jsonl")
+    os.close(fd)
+    return path
+
+
+def _save_state(state_path, state):
+    """Write the state file atomically so a crash never leaves it half-written."""
+    if state_path is None:
+        return
+    directory = os.path.dirname(state_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+
+def _request_lines(radar_df, model, positions, categories=None,
+                   guidelines=None, site="Bankhead National Forest",
+                   vmin=None, vmax=None, codebook_path=None,
+                   use_previous_labels=False, constrained_output=False):
+    """Yield ``(pos, line)`` with the Batch-API request line for each position."""
+    if categories is None:
+        categories = DEFAULT_CATEGORIES
+    vmin, vmax = _resolve_color_scale(vmin, vmax, codebook_path)
+    prompt = _build_prompt(radar_df.columns, categories, guidelines, site,
+                           vmin, vmax)
+    file_paths = radar_df["file_path"].to_numpy()
+    times = (radar_df["time"].to_numpy() if "time" in radar_df.columns
+             else radar_df.index.to_numpy())
+    hand_labels = (radar_df["label"].to_numpy() if "label" in radar_df.columns
+                   else None)
+    choices = list(categories) if constrained_output else None
+    for pos in positions:
+        body = model.build_request(
+            _row_prompt(prompt, times, hand_labels, pos, use_previous_labels),
+            images=[file_paths[pos]], choices=choices)
+        yield pos, json.dumps({"custom_id": _custom_id(pos), "method": "POST",
+                               "url": BATCH_ENDPOINT, "body": body})
+
+
+def write_batch_requests(radar_df, model, path, categories=None,
+                         guidelines=None, site="Bankhead National Forest",
+                         vmin=None, vmax=None, codebook_path=None,
+                         use_previous_labels=False, constrained_output=False):
+    """
+    Write one Batch-API request per row of ``radar_df`` to ``path``.
+
+    Each line holds the same Chat Completions request ``model.chat`` would
+    send for that row, with ``custom_id`` ``row-<position>``. The file is
+    not split; ``label_radar_data_batch`` splits large runs into files
+    under the Batch API limits.
+
+    Parameters
+    ----------
+    radar_df (pd.DataFrame): DataFrame containing radar data to be labeled.
+    model (GPTModel): Model whose ``build_request`` produces the request
+        bodies.
+    path (str): Output JSON-lines file.
+
+    The remaining parameters are as for ``label_radar_data``.
+
+    Returns
+    -------
+    int
+        Number of requests written.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        for _, line in _request_lines(
+                radar_df, model, range(len(radar_df)), categories=categories,
+                guidelines=guidelines, site=site, vmin=vmin, vmax=vmax,
+                codebook_path=codebook_path,
+                use_previous_labels=use_previous_labels,
+                constrained_output=constrained_output):
+            f.write(line + "\n")
+    return len(radar_df)
+
+
+def _write_request_parts(lines, path_for, max_requests, max_bytes):
+    """
+    Write request lines to as many files as the batch limits require.
+
+    Returns
+    -------
+    list of [str, int, int]
+        ``[path, start, stop]`` for each file, holding row positions
+        ``start`` to ``stop - 1``.
+    """
+    parts = []
+    f = None
+    try:
+        for pos, line in lines:
+            data = (line + "\n").encode()
+            if len(data) > max_bytes:
+                raise ValueError(f"The request for row {pos} is {len(data)} bytes, "
+                                 f"over the {max_bytes}-byte batch file limit")
+            if f is None or count >= max_requests or size + len(data) > max_bytes:
+                if f is not None:
+                    f.close()
+                path = path_for(len(parts))
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                f = open(path, "wb")
+                parts.append([path, pos, pos])
+                count = size = 0
+            f.write(data)
+            count += 1
+            size += len(data)
+            parts[-1][2] = pos + 1
+    finally:
+        if f is not None:
+            f.close()
+    return parts
+
+
+async def submit_batch(client, requests_path):
+    """Upload a request file and start a batch job; return the batch object."""
+    with open(requests_path, "rb") as f:
+        input_file = await client.files.create(file=f, purpose="batch")
+    return await client.batches.create(input_file_id=input_file.id,
+                                       endpoint=BATCH_ENDPOINT,
+                                       completion_window="24h")
+
+
+async def wait_for_batch(client, batch_id, poll_interval=None, timeout=None,
+                         verbose=False):
+    """
+    Poll a batch job until it reaches a final status.
+
+    Raises
+    ------
+    TimeoutError
+        If ``timeout`` seconds pass first. The job keeps running and can be
+        waited on again later.
+    """
+    if poll_interval is None:
+        poll_interval = config.BATCH_POLL_INTERVAL
+    start = time.monotonic()
+    while True:
+        batch = await client.batches.retrieve(batch_id)
+        if verbose:
+            counts = getattr(batch, "request_counts", None)
+            print(f"Batch {batch_id}: {batch.status} {counts or ''}")
+        if batch.status in _FINAL_STATUSES:
+            return batch
+        if timeout is not None and time.monotonic() - start >= timeout:
+            raise TimeoutError(f"Batch {batch_id} still {batch.status} after {timeout} s")
+        await asyncio.sleep(poll_interval)
+
+
+async def _read_file(client, file_id):
+    if not file_id:
+        return []
+    content = await client.files.content(file_id)
+    return [json.loads(line) for line in content.text.splitlines() if line.strip()]
+
+
+async def read_batch_results(client, batch):
+    """
+    Download a finished batch's output and error files.
+
+    Returns
+    -------
+    dict
+        Maps ``custom_id`` to ``(text, usage, error)``; ``text`` is None
+        for requests that failed and ``error`` is None for those that
+        succeeded.
+    """
+    results = {}
+    lines = (await _read_file(client, getattr(batch, "output_file_id", None))
+             + await _read_file(client, getattr(batch, "error_file_id", None)))
+    for line in lines:
+        response = line.get("response") or {}
+        body = response.get("body") or {}
+        error = line.get("error")
+        if error is None and response.get("status_code", 200) != 200:
+            error = body.get("error") or f"HTTP {response.get('status_code')}"
+        if error is not None:
+            if isinstance(error, dict):
+                error = error.get("message") or json.dumps(error)
+            results[line["custom_id"]] = (None, {}, str(error))
+            continue
+        text = body["choices"][0]["message"]["content"]
+        results[line["custom_id"]] = (text, body.get("usage") or {}, None)
+    return results
+
+
+async def label_radar_data_batch(radar_df, model, categories=None,
+                                 guidelines=None, criteria=None,
+                                 codebook_path=None,
+                                 site="Bankhead National Forest",
+                                 verbose=False, vmin=None, vmax=None,
+                                 use_previous_labels=False,
+                                 constrained_output=False, state_path=None,
+                                 poll_interval=None, timeout=None,
+                                 max_requests=BATCH_MAX_REQUESTS,
+                                 max_bytes=BATCH_MAX_BYTES):
+    """
+    Label radar data with OpenAI Batch API jobs.
+
+    Builds the same requests as ``label_radar_data`` (see
+    ``write_batch_requests``), splits them into jobs of consecutive rows
+    that each stay under ``max_requests`` requests and ``max_bytes``
+    bytes, submits the jobs, waits for them to finish and maps the replies
+    back to rows by ``custom_id``.
+
+    Parameters
+    ----------
+    radar_df (pd.DataFrame): DataFrame containing radar data to be labeled.
+    model (GPTModel): Model to run. Its ``client`` is used for the Files
+        and Batches APIs.
+    state_path (str, optional): JSON file recording the submitted jobs and
+        the rows each one covers. If it already holds jobs for a DataFrame
+        of the same length, those jobs are waited on (and any not yet
+        submitted are submitted) instead of starting over, so an
+        interrupted run (or one that hit ``timeout``) can simply be called
+        again. The request files are written next to it. Without a state
+        path nothing is resumable.
+    poll_interval (float, optional): Seconds between status checks.
+        Defaults to ``config.BATCH_POLL_INTERVAL``.
+    timeout (float, optional): Give up waiting after this many seconds and
+        raise ``TimeoutError``; the jobs keep running.
+    max_requests (int): Most requests per job. Default
+        ``BATCH_MAX_REQUESTS`` (50,000).
+    max_bytes (int): Largest request file per job. Default
+        ``BATCH_MAX_BYTES`` (200 MB).
+
+    The remaining parameters are as for ``label_radar_data``.
+
+    Returns
+    -------
+    pd.DataFrame
+        ``radar_df`` with ``llm_label``, ``llm_error``,
+        ``llm_label_source`` (``"batch"``), ``llm_prompt_tokens`` and
+        ``llm_completion_tokens`` columns. Rows the jobs produced no reply
+        for keep an empty ``llm_label`` and the reason in ``llm_error``.
+    """
+    if not hasattr(model, "build_request"):
+        raise ValueError("Batch mode requires a model with build_request, e.g. GPTModel")
+    if categories is None:
+        categories = DEFAULT_CATEGORIES
+    client = model.client
+    n_rows = len(radar_df)
+    request_kwargs = dict(categories=categories, guidelines=guidelines,
+                          site=site, vmin=vmin, vmax=vmax,
+                          codebook_path=codebook_path,
+                          use_previous_labels=use_previous_labels,
+                          constrained_output=constrained_output)
+
+    state = _load_state(state_path)
+    if state.get("batch_id"):
+        # State file from before runs were split into several jobs.
+        state = {"n_rows": state.get("n_rows"), "jobs": [{
+            "batch_id": state["batch_id"], "input_file_id": state.get("input_file_id"),
+            "start": 0, "stop": state.get("n_rows"), "status": state.get("status")}]}
+    if state.get("jobs") and state.get("n_rows") != n_rows:
+        raise ValueError(f"{state_path} belongs to a batch of {state.get('n_rows')} "
+                         f"rows, not {n_rows}")
+
+    paths = {}
+
+    def path_for(index):
+        paths[index] = _part_path(state_path, index)
+        return paths[index]
+
+    try:
+        if not state.get("jobs"):
+            parts = _write_request_parts(
+                _request_lines(radar_df, model, range(n_rows), **request_kwargs),
+                path_for, max_requests, max_bytes)
+            state = {"n_rows": n_rows, "jobs": [
+                {"batch_id": None, "input_file_id": None, "start": start,
+                 "stop": stop, "status": None}
+                for _, start, stop in parts]}
+            _save_state(state_path, state)
+        for index, job in enumerate(state["jobs"]):
+            if job["batch_id"]:
+                continue
+            path = paths.get(index)
+            if path is None:
+                # Resumed before this job was submitted: reuse its request
+                # file if it was kept next to the state file, else rewrite it.
+                path = path_for(index)
+                if state_path is None or not os.path.exists(path):
+                    with open(path, "w") as f:
+                        for _, line in _request_lines(radar_df, model,
+                                                      range(job["start"], job["stop"]),
+                                                      **request_kwargs):
+                            f.write(line + "\n")
+            batch = await submit_batch(client, path)
+            job.update(batch_id=batch.id, input_file_id=batch.input_file_id,
+                       status=batch.status)
+            _save_state(state_path, state)
+            if verbose:
+                print(f"Submitted batch {batch.id} with rows "
+                      f"{job['start']}-{job['stop'] - 1}")
+    finally:
+        if state_path is None:
+            for path in paths.values():
+                if os.path.exists(path):
+                    os.remove(path)
+
+    start_time = time.monotonic()
+    results = {}
+    produced_output = False
+    for job in state["jobs"]:
+        remaining = (None if timeout is None
+                     else max(0.0, timeout - (time.monotonic() - start_time)))
+        batch = await wait_for_batch(client, job["batch_id"],
+                                     poll_interval=poll_interval,
+                                     timeout=remaining, verbose=verbose)
+        job["status"] = batch.status
+        _save_state(state_path, state)
+        if (getattr(batch, "output_file_id", None)
+                or getattr(batch, "error_file_id", None)):
+            produced_output = True
+            results.update(await read_batch_results(client, batch))
+    if not produced_output:
+        summary = ", ".join(f"{job['batch_id']} ({job['status']})" for job in state["jobs"])
+        raise RuntimeError(f"Batch jobs {summary} ended with no output")
+
+    lookup = _label_lookup(categories)
+    llm_labels = np.full(n_rows, None, dtype=object)
+    llm_errors = np.full(n_rows, None, dtype=object)
+    llm_prompt_tokens = np.full(n_rows, None, dtype=object)
+    llm_completion_tokens = np.full(n_rows, None, dtype=object)
+    for job in state["jobs"]:
+        for pos in range(job["start"], job["stop"]):
+            result = results.get(_custom_id(pos))
+            if result is None:
+                llm_errors[pos] = f"No result in batch {job['batch_id']} ({job['status']})"
+                continue
+            text, usage, error = result
+            if error is not None:
+                llm_labels[pos] = "Unknown"
+                llm_errors[pos] = error
+                continue
+            llm_labels[pos] = _parse_label(text, categories, lookup)
+            llm_prompt_tokens[pos] = usage.get("prompt_tokens")
+            llm_completion_tokens[pos] = usage.get("completion_tokens")
+    radar_df["llm_label"] = llm_labels
+    radar_df["llm_error"] = llm_errors
+    radar_df["llm_label_source"] = "batch"
+    radar_df["llm_prompt_tokens"] = pd.array(llm_prompt_tokens, dtype="Int64")
+    radar_df["llm_completion_tokens"] = pd.array(llm_completion_tokens, dtype="Int64")
+    if criteria:
+        radar_df = apply_criteria_to_labels(radar_df, criteria,
+                                            label_column="llm_label")
+    return radar_df
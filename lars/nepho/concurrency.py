@@ -0,0 +1,159 @@
+"""Adaptive concurrency limit for labelling runs.
+
+The right number of requests to keep in flight depends on the backend: a
+large local Ollama server can take many, a rate-limited GPT deployment
+few. ``AdaptiveConcurrency`` finds it at run time with the additive
+increase / multiplicative decrease (AIMD) rule used for TCP congestion
+control, and can be passed as ``max_concurrent`` to ``label_radar_data``.
+"""
+from collections import deque
+from typing import Optional
+
+from .config import config
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD controller for the number of requests kept in flight.
+
+    Every healthy completion raises the limit by ``increase / limit``, so
+    it grows by about ``increase`` per round of requests. An overload
+    signal (rate limit, 5xx or timeout) or a p95 latency above
+    ``latency_tolerance`` times the healthy baseline multiplies it by
+    ``backoff``. Requests already in flight when the limit was cut report
+    the same congestion, so the limit is cut at most once per ``limit``
+    completions. If a latency cut does not bring the next window's p95
+    down, the slowdown is not caused by load (longer prompts, bigger
+    images, a different model), so that p95 becomes the new baseline
+    instead of cutting again.
+
+    Keep one controller per backend and reuse it across runs so each run
+    starts from the limit the last one settled on.
+
+    Parameters
+    ----------
+    initial : int, optional
+        Starting limit. Defaults to ``config.MAX_CONCURRENT_MODELS``.
+    min_limit : int
+        Lowest limit. Default 1.
+    max_limit : int, optional
+        Highest limit. Defaults to ``config.ADAPTIVE_MAX_CONCURRENCY``.
+    increase : float
+        Additive increase per round of requests. Default 1.
+    backoff : float
+        Multiplicative decrease factor, between 0 and 1. Default 0.5.
+    latency_tolerance : float
+        How far the recent p95 latency may rise above the baseline before
+        it counts as congestion. Default 2.
+    window : int
+        Number of recent latencies used for the p95. Default 50.
+    """
+
+    def __init__(self, initial: Optional[int] = None, min_limit: int = 1,
+                 max_limit: Optional[int] = None, increase: float = 1.0,
+                 backoff: float = 0.5, latency_tolerance: float = 2.0,
+                 window: int = 50):
+        if initial is None:
+            initial = config.MAX_CONCURRENT_MODELS
+        if max_limit is None:
+            max_limit = max(config.ADAPTIVE_MAX_CONCURRENCY, initial)
+        if not 1 <= min_limit <= initial <= max_limit:
+            raise ValueError("Need 1 <= min_limit <= initial <= max_limit")
+        if not 0 < backoff < 1:
+            raise ValueError("backoff must be between 0 and 1")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.latencies = deque(maxlen=window)
+        self.baseline_p95 = None
+        # p95 that triggered the last latency cut, until a window shows
+        # whether the cut helped.
+        self._cut_p95 = None
+        self.completions = 0
+        self.overloads = 0
+        self.decreases = 0
+        self._limit = float(initial)
+        self._since_decrease = float("inf")
+        self.limit_min = self.limit_max = initial
+
+    @property
+    def limit(self) -> int:
+        """Current number of requests that may be in flight."""
+        return max(self.min_limit, int(self._limit))
+
+    def _p95(self) -> float:
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def record(self, latency: Optional[float] = None, overloaded: bool = False):
+        """
+        Report one completed request.
+
+        Parameters
+        ----------
+        latency : float, optional
+            Seconds the request took.
+        overloaded : bool
+            True if it failed with a sign of overload (429, 5xx, timeout).
+        """
+        self.completions += 1
+        self._since_decrease += 1
+        if overloaded:
+            self.overloads += 1
+            self._decrease()
+            return
+        if latency is not None:
+            self.latencies.append(latency)
+            if len(self.latencies) >= min(10, self.latencies.maxlen):
+                p95 = self._p95()
+                if self.baseline_p95 is None:
+                    self.baseline_p95 = p95
+                elif p95 > self.latency_tolerance * self.baseline_p95:
+                    if self._cut_p95 is None:
+                        if self._decrease():
+                            self._cut_p95 = p95
+                        return
+                    if len(self.latencies) < self.latencies.maxlen:
+                        # Wait for a full window at the lower limit.
+                        return
+                    if p95 >= 0.9 * self._cut_p95:
+                        # The cut did not help: the latency changed for
+                        # another reason, so re-learn the baseline.
+                        self.baseline_p95 = p95
+                        self._cut_p95 = None
+                    else:
+                        if self._decrease():
+                            self._cut_p95 = p95
+                        return
+                else:
+                    # Follow slow drift (e.g. longer prompts) while healthy.
+                    self.baseline_p95 = 0.9 * self.baseline_p95 + 0.1 * p95
+                    self._cut_p95 = None
+        self._limit = min(self.max_limit, self._limit + self.increase / self._limit)
+        self.limit_max = max(self.limit_max, self.limit)
+
+    def _decrease(self) -> bool:
+        """Cut the limit, unless it was cut within the last ``limit`` completions."""
+        if self._since_decrease < self.limit:
+            return False
+        self._limit = max(self.min_limit, self._limit * self.backoff)
+        self._since_decrease = 0
+        self.decreases += 1
+        self.latencies.clear()
+        self.limit_min = min(self.limit_min, self.limit)
+        return True
+
+    def metrics(self) -> dict:
+        """Return the current limit and counters, for logging."""
+        return {
+            "concurrency/limit": self.limit,
+            "concurrency/limit_min": self.limit_min,
+            "concurrency/limit_max": self.limit_max,
+            "concurrency/decreases": self.decreases,
+            "concurrency/overloads": self.overloads,
+        }
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(limit={self.limit})"
@@ -15,6 +15,15 @@ class Config:
     # Context window size (tokens) passed to Ollama as num_ctx. Ollama's
     # default is small (2048), which silently truncates long prompts/images.
     OLLAMA_NUM_CTX: int = int(os.getenv("OLLAMA_NUM_CTX", "8192"))
+    # How long a confirmed model-availability check stays valid (seconds),
+    # and how long Ollama keeps the model loaded after a request.
+    OLLAMA_READY_TTL: float = float(os.getenv("OLLAMA_READY_TTL", "300"))
+    OLLAMA_KEEP_ALIVE: str = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    # OLLAMA_BASE_URL may list several comma-separated servers; a server
+    # that fails sits out OLLAMA_EJECT_TIME seconds, doubling on repeated
+    # failures up to OLLAMA_MAX_EJECT_TIME.
+    OLLAMA_EJECT_TIME: float = float(os.getenv("OLLAMA_EJECT_TIME", "10"))
+    OLLAMA_MAX_EJECT_TIME: float = float(os.getenv("OLLAMA_MAX_EJECT_TIME", "300"))
     
     # Default models
     DEFAULT_GPT_MODEL: str = os.getenv("DEFAULT_GPT_MODEL", "gpt-4-vision-preview")
@@ -26,10 +35,62 @@ class Config:
         "SUPPORTED_IMAGE_FORMATS", "jpg,jpeg,png,gif,bmp,webp"
     ).split(",")
     
+    # Skip decoding images to verify them before sending; only safe for
+    # images written by lars.preprocessing.preprocess_radar_data.
+    TRUST_IMAGES: bool = os.getenv("TRUST_IMAGES", "false").lower() in ("1", "true", "yes")
+
+    # In-memory LRU of base64-encoded image payloads shared by all backends
+    IMAGE_PAYLOAD_CACHE_MB: float = float(os.getenv("IMAGE_PAYLOAD_CACHE_MB", "256"))
+    
+    # Triage: largest percentage of gates above 10 dBZ at which a scan is
+    # labelled "No Precipitation" without calling the model
+    TRIAGE_CLEAR_AIR_MAX_PCT: float = float(os.getenv("TRIAGE_CLEAR_AIR_MAX_PCT", "0.5"))
+
     # Parallel processing settings
     MAX_CONCURRENT_MODELS: int = int(os.getenv("MAX_CONCURRENT_MODELS", "3"))
+    # Upper bound for max_concurrent="adaptive"
+    ADAPTIVE_MAX_CONCURRENCY: int = int(os.getenv("ADAPTIVE_MAX_CONCURRENCY", "64"))
+    # HedgedModel: latency quantile after which a duplicate request is sent,
+    # samples needed before hedging starts, and most hedges per call.
+    HEDGE_QUANTILE: float = float(os.getenv("HEDGE_QUANTILE", "0.95"))
+    HEDGE_MIN_SAMPLES: int = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+    HEDGE_MAX_RATE: float = float(os.getenv("HEDGE_MAX_RATE", "0.1"))
     REQUEST_TIMEOUT: int = int(os.getenv("REQUEST_TIMEOUT", "60"))
 
+    # Process-wide requests/tokens per minute per backend and API key (see
+    # lars.nepho.ratelimit); unset means unlimited. Images count as
+    # RATE_LIMIT_IMAGE_TOKENS each when estimating a request's tokens.
+    OPENAI_RPM: Optional[float] = float(os.getenv("OPENAI_RPM")) if os.getenv("OPENAI_RPM") else None
+    OPENAI_TPM: Optional[float] = float(os.getenv("OPENAI_TPM")) if os.getenv("OPENAI_TPM") else None
+    ASK_SAGE_RPM: Optional[float] = float(os.getenv("ASK_SAGE_RPM")) if os.getenv("ASK_SAGE_RPM") else None
+    ASK_SAGE_TPM: Optional[float] = float(os.getenv("ASK_SAGE_TPM")) if os.getenv("ASK_SAGE_TPM") else None
+    RATE_LIMIT_IMAGE_TOKENS: int = int(os.getenv("RATE_LIMIT_IMAGE_TOKENS", "800"))
+
+    # Retries of transient backend errors (429, 5xx, timeouts) and the
+    # circuit breaker that pauses requests to a failing backend
+    RETRY_MAX_ATTEMPTS: int = int(os.getenv("RETRY_MAX_ATTEMPTS", "5"))
+    RETRY_BASE_DELAY: float = float(os.getenv("RETRY_BASE_DELAY", "1"))
+    RETRY_MAX_DELAY: float = float(os.getenv("RETRY_MAX_DELAY", "60"))
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RESET_TIMEOUT: float = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+    # Seconds between status checks of an OpenAI Batch API job
+    BATCH_POLL_INTERVAL: float = float(os.getenv("BATCH_POLL_INTERVAL", "60"))
+
+    # Shared HTTP connection pool (see lars.nepho.transport)
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "32"))
+    HTTP_KEEPALIVE_TIMEOUT: float = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+
+    # On-disk response cache used by CachedModel
+    RESPONSE_CACHE_DIR: str = os.getenv(
+        "RESPONSE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "lars", "responses")
+    )
+    RESPONSE_CACHE_MAX_MB: float = float(os.getenv("RESPONSE_CACHE_MAX_MB", "512"))
+
+    # Threads for the blocking Ask Sage client calls
+    ASK_SAGE_MAX_WORKERS: int = int(os.getenv("ASK_SAGE_MAX_WORKERS", "16"))
+
     DEFAULT_ASK_SAGE_USER_URL = "https://api.asksage.anl.gov/user"
     DEFAULT_ASK_SAGE_SERVER_URL = "https://api.asksage.anl.gov/server"
     
@@ -0,0 +1,198 @@
+"""Client-side load balancing over several model servers.
+
+A single Ollama server runs only so many generations at once. With
+``EndpointPool`` one ``OllamaModel`` can spread its requests over several
+servers without a proxy in front of them: each request goes to the
+healthy host with the least expected wait, estimated from the requests it
+already has in flight and a moving average of its recent latency. Hosts
+that fail are ejected for a while and then re-probed with a single
+request.
+"""
+import asyncio
+import time
+from typing import List, Optional, Sequence
+
+from .config import config
+
+
+class Endpoint:
+    """
+    Load and health state of one server in an ``EndpointPool``.
+
+    Parameters
+    ----------
+    url : str
+        Base URL of the server.
+    """
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.in_flight = 0
+        self.latency = None
+        self.requests = 0
+        self.errors = 0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        # Time the model was last confirmed installed on this server.
+        self.available_at = None
+        self._lock = None
+        self._lock_loop = None
+
+    def lock(self) -> asyncio.Lock:
+        """Lock for one-off setup on this server (e.g. pulling the model)."""
+        # asyncio.Lock binds to the loop it is first used on, so keep one per loop.
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    def ejected(self, now: Optional[float] = None) -> bool:
+        """Whether the server is sitting out after a failure."""
+        now = time.monotonic() if now is None else now
+        if now < self.ejected_until:
+            return True
+        # Once the ejection ends a single probe request is let through; the
+        # host rejoins fully only if that request succeeds.
+        return self.failures > 0 and self.in_flight > 0
+
+    def __repr__(self) -> str:
+        return (f"{self.__class__.__name__}({self.url!r}, in_flight={self.in_flight}, "
+                f"latency={self.latency})")
+
+
+class EndpointPool:
+    """
+    Route requests to the least-loaded healthy server.
+
+    A host's expected wait is ``(in_flight + 1) * latency``, where
+    ``latency`` is an exponentially weighted moving average of its recent
+    request latencies; hosts with no measurements yet are scored with the
+    best latency seen so they get tried straight away. A failed request
+    ejects its host for ``eject_time`` seconds, doubling with each
+    consecutive failure up to ``max_eject_time``. If every host is ejected
+    the one due back first is used anyway, so a single-host pool behaves
+    like a plain client.
+
+    Parameters
+    ----------
+    urls : sequence of str
+        Base URLs of the servers.
+    eject_time : float, optional
+        Seconds a host sits out after its first failure. Defaults to
+        ``config.OLLAMA_EJECT_TIME``.
+    max_eject_time : float, optional
+        Longest ejection. Defaults to ``config.OLLAMA_MAX_EJECT_TIME``.
+    alpha : float
+        Weight of the newest latency in the moving average. Default 0.3.
+    """
+
+    def __init__(self, urls: Sequence[str], eject_time: Optional[float] = None,
+                 max_eject_time: Optional[float] = None, alpha: float = 0.3):
+        if not urls:
+            raise ValueError("EndpointPool needs at least one URL")
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be in (0, 1]")
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.eject_time = config.OLLAMA_EJECT_TIME if eject_time is None else eject_time
+        self.max_eject_time = (config.OLLAMA_MAX_EJECT_TIME if max_eject_time is None
+                               else max_eject_time)
+        self.alpha = alpha
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def _score(self, endpoint: Endpoint, default_latency: float) -> float:
+        latency = endpoint.latency if endpoint.latency is not None else default_latency
+        return (endpoint.in_flight + 1) * latency
+
+    def pick(self, exclude: Sequence[Endpoint] = ()) -> Optional[Endpoint]:
+        """
+        Choose the server for the next request and count it as in flight.
+
+        Every ``pick`` must be matched by a ``release``.
+
+        Parameters
+        ----------
+        exclude : sequence of Endpoint
+            Hosts already tried for this request.
+
+        Returns
+        -------
+        Endpoint or None
+            None if every host is excluded.
+        """
+        now = time.monotonic()
+        candidates = [e for e in self.endpoints if e not in exclude]
+        if not candidates:
+            return None
+        healthy = [e for e in candidates if not e.ejected(now)]
+        if healthy:
+            known = [e.latency for e in self.endpoints if e.latency is not None]
+            default_latency = min(known) if known else 1.0
+            endpoint = min(healthy, key=lambda e: (self._score(e, default_latency),
+                                                   e.in_flight, e.requests))
+        else:
+            endpoint = min(candidates, key=lambda e: e.ejected_until)
+        endpoint.in_flight += 1
+        endpoint.requests += 1
+        return endpoint
+
+    def release(self, endpoint: Endpoint, latency: Optional[float] = None,
+                failed: bool = False):
+        """
+        Report that a request picked from this pool finished.
+
+        Parameters
+        ----------
+        endpoint : Endpoint
+            The host returned by ``pick``.
+        latency : float, optional
+            Seconds the request took, if it succeeded.
+        failed : bool
+            True if the host failed (connection error, timeout, 5xx); the
+            host is then ejected. Requests that were already in flight when
+            the host was ejected and fail afterwards count as errors but do
+            not extend the ejection.
+        """
+        endpoint.in_flight -= 1
+        if failed:
+            endpoint.errors += 1
+            now = time.monotonic()
+            if now < endpoint.ejected_until:
+                return
+            endpoint.failures += 1
+            endpoint.ejections += 1
+            backoff = self.eject_time * 2 ** (endpoint.failures - 1)
+            endpoint.ejected_until = now + min(self.max_eject_time, backoff)
+            return
+        endpoint.failures = 0
+        endpoint.ejected_until = 0.0
+        if latency is not None:
+            if endpoint.latency is None:
+                endpoint.latency = latency
+            else:
+                endpoint.latency += self.alpha * (latency - endpoint.latency)
+
+    def healthy(self) -> List[Endpoint]:
+        """Hosts not currently ejected."""
+        now = time.monotonic()
+        return [e for e in self.endpoints if not e.ejected(now)]
+
+    def stats(self) -> dict:
+        """Return per-host request, error and latency figures."""
+        return {
+            e.url: {
+                "requests": e.requests,
+                "errors": e.errors,
+                "ejections": e.ejections,
+                "in_flight": e.in_flight,
+                "latency_s": e.latency,
+                "ejected": e.ejected(),
+            }
+            for e in self.endpoints
+        }
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({[e.url for e in self.endpoints]})"
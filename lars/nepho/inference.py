@@ -1,8 +1,19 @@
 import asyncio
+import json
 import os
 import re
+import time
+import warnings
 
-from ..preprocessing.labels import apply_criteria_to_labels
+import numpy as np
+import pandas as pd
+
+from ..preprocessing.image_hash import find_near_duplicates
+from ..preprocessing.labels import apply_criteria_to_labels, reclassify_label, triage_labels
+from .concurrency import AdaptiveConcurrency
+from .config import config
+from .journal import LabelJournal
+from .retry import TransientModelError
 
 DEFAULT_CATEGORIES = {"No precipitation": "No echoes greater than 10 dBZ present. A circle of echoes near radar site may be present due to ground clutter.",
                       "Stratiform rain": "Widespread echoes between 0 and 35 dBZ, not present as a circular pattern around the radar site.",
@@ -488,26 +499,668 @@ _DEFAULT_CODEBOOK = os.path.join(
     os.path.dirname(__file__), "..", "..", "CODEBOOK.md"
 )
 _default_codebook_path = os.path.normpath(_DEFAULT_CODEBOOK)
-CODEBOOK_CATEGORIES = (
-    categories_from_codebook(_default_codebook_path)
-    if os.path.exists(_default_codebook_path) else None
-)
-CODEBOOK_GUIDELINES = (
-    guidelines_from_codebook(_default_codebook_path)
-    if os.path.exists(_default_codebook_path) else None
-)
-CODEBOOK_CRITERIA = (
-    criteria_from_codebook(_default_codebook_path)
-    if os.path.exists(_default_codebook_path) else None
-)
-CODEBOOK_COLOR_CRITERIA = (
-    color_criteria_from_codebook(_default_codebook_path)
-    if os.path.exists(_default_codebook_path) else None
-)
-CODEBOOK_COLORMAP = (
-    colormap_from_codebook(_default_codebook_path)
-    if os.path.exists(_default_codebook_path) else None
-)
+# CODEBOOK_* constants are parsed from the bundled codebook on first
+# access (see __getattr__ at the end of this module), not at import.
+_CODEBOOK_PARSERS = {
+    "CODEBOOK_CATEGORIES": categories_from_codebook,
+    "CODEBOOK_GUIDELINES": guidelines_from_codebook,
+    "CODEBOOK_CRITERIA": criteria_from_codebook,
+    "CODEBOOK_COLOR_CRITERIA": color_criteria_from_codebook,
+    "CODEBOOK_COLORMAP": colormap_from_codebook,
+}
+
+def _label_lookup(categories):
+    """Map the normalized spelling of each category to its canonical name."""
+    return {category.strip().rstrip(".").lower(): category.rstrip(".").strip()
+            for category in categories}
+
+
+def probability_columns(categories):
+    """
+    Map each category to the column that holds its probability.
+
+    ``label_radar_data(..., score=True)`` writes the probability of each
+    category to ``llm_prob_<category>``, with the name lower-cased and
+    runs of other characters replaced by ``_`` (e.g. ``"Stratiform rain"``
+    → ``llm_prob_stratiform_rain``).
+    """
+    return {
+        category: "llm_prob_" + re.sub(r"[^0-9a-z]+", "_",
+                                       category.strip().rstrip(".").lower()).strip("_")
+        for category in categories
+    }
+
+
+def _match_label(output_model, categories, lookup=None):
+    """
+    Return the category named in a model reply, or None if none is.
+
+    Constrained replies (``{"label": ...}``) and replies whose last line is
+    exactly a category name are resolved with a dictionary lookup; anything
+    else falls back to the first category named on the last line.
+    """
+    if lookup is None:
+        lookup = _label_lookup(categories)
+    text = output_model.strip()
+    if text.startswith("{"):
+        try:
+            reply = json.loads(text)
+        except json.JSONDecodeError:
+            reply = None
+        if isinstance(reply, dict) and isinstance(reply.get("label"), str):
+            text = reply["label"]
+    last_line = text.split("\n")[-1].strip().lower()
+    label = lookup.get(last_line.rstrip("."))
+    if label is not None:
+        return label
+    for category in categories:
+        if category.lower() in last_line:
+            return category.rstrip(".").strip()
+    return None
+
+
+def _parse_label(output_model, categories, lookup=None):
+    """
+    Return the category named in a model reply.
+
+    Resolved like ``_match_label``, but a reply naming no category gives
+    ``"Unknown"``.
+    """
+    label = _match_label(output_model, categories, lookup)
+    return "Unknown" if label is None else label
+
+
+def _chat_kwargs(model, categories, constrained_output):
+    """
+    Extra ``chat`` arguments for one model.
+
+    Constrained output passes the categories as ``choices``; otherwise a
+    model created with ``stream=True`` gets them as ``stop_labels`` so it
+    can stop generating once it has named one.
+    """
+    if constrained_output:
+        return {"choices": list(categories)}
+    if getattr(model, "stream", False):
+        return {"stop_labels": list(categories)}
+    return {}
+
+
+def _resolve_color_scale(vmin, vmax, codebook_path):
+    """Fill in missing ``vmin`` / ``vmax`` from the codebook, then the defaults."""
+    if (vmin is None or vmax is None) and codebook_path is not None:
+        cmap = colormap_from_codebook(codebook_path)
+        if vmin is None:
+            vmin = cmap["vmin"]
+        if vmax is None:
+            vmax = cmap["vmax"]
+    if vmin is None:
+        vmin = DEFAULT_VMIN
+    if vmax is None:
+        vmax = DEFAULT_VMAX
+    return vmin, vmax
+
+
+def _build_prompt(columns, categories, guidelines, site, vmin, vmax):
+    """Build the part of the labelling prompt shared by every image."""
+    prompt = "This is an image of weather radar base reflectivity data." \
+                f" The radar site is the ARM Facility {site} site." \
+             " Please classify the weather depicted into one of the following categories: " \
+             f"{', '.join(categories) if categories else ', '.join(categories)}."
+    prompt += "Each category is defined as follows: "
+    for category, description in categories.items():
+        prompt += f"{category}: {description}; "
+    prompt += f"The reflectivity values range from {vmin} dBZ as indicated by the blue colors to {vmax} dBZ as indicated by the red colors."
+    for key in columns:
+        if key.startswith("pct_gates_") and key.endswith("dbz"):
+            threshold = key[len("pct_gates_"):-len("dbz")]
+            prompt += f" The percentage of gates with relfectivity above {threshold} dBZ is provided as {key} in the data."
+        if key.startswith("n_gates_") and key.endswith("dbz"):
+            threshold = key[len("n_gates_"):-len("dbz")]
+            prompt += f" The number of gates with relfectivity above {threshold} dBZ is provided as {key} in the data."
+
+    if guidelines:
+        prompt += " When classifying, follow these annotator guidelines: "
+        prompt += " ".join(guidelines)
+    return prompt
+
+
+def _previous_labels(times, hand_labels, pos, use_previous_labels):
+    """Sentences giving the hand labels of the images before row ``pos``."""
+    text = ""
+    if use_previous_labels and hand_labels is not None:
+        for i in range(use_previous_labels):
+            prev = pos - i - 1
+            if prev >= 0:
+                text += f" The label for the previous radar image taken at time {times[prev]} is {hand_labels[prev]}."
+    return text
+
+
+def _row_prompt(prompt, times, hand_labels, pos, use_previous_labels):
+    """Append the per-image instructions for row ``pos`` to the shared prompt."""
+    prompt_with_time = prompt + f"Please provide just the category label for the radar image taken at time {times[pos]}."
+    prompt_with_time = prompt_with_time + "Do not provide your reasoning for your selection, just the category."
+    prompt_with_time += _previous_labels(times, hand_labels, pos, use_previous_labels)
+    return prompt_with_time
+
+
+def _packed_prompt(prompt, times, hand_labels, positions, use_previous_labels):
+    """Append indexed instructions for several images sent in one request."""
+    packed = prompt + f"You are given {len(positions)} radar images, numbered 1 to {len(positions)} in the order they are attached."
+    for i, pos in enumerate(positions, start=1):
+        packed += f" Image {i} was taken at time {times[pos]}."
+        if i == 1:
+            packed += _previous_labels(times, hand_labels, pos, use_previous_labels)
+    packed += " Reply with exactly one line per image of the form '<image number>: <category label>'."
+    packed += " Do not provide your reasoning for your selection, just the numbered categories."
+    return packed
+
+
+# Timings copied from a reply's ``ChatResult`` into each row's record; the
+# stages after ``server_latency`` break it down (Ollama reports all three).
+_STAGE_LATENCY_KEYS = ("load_latency", "prompt_eval_latency", "eval_latency")
+_LATENCY_KEYS = ("server_latency",) + _STAGE_LATENCY_KEYS
+
+_PACKED_LINE = re.compile(r"^\W*(?:image\s*)?(\d+)\s*[:.)\-]\s*(.+)$", re.IGNORECASE)
+
+
+def _parse_packed_labels(output_model, n_images, categories, lookup=None):
+    """
+    Return the category for each image of a packed reply.
+
+    Lines of the form ``<n>: <category>`` are matched to image ``n``; each
+    answer is resolved like a single-image reply with ``_match_label``.
+    Images without a line naming a category (or with more than one line)
+    get None, so they can be told apart from an answer that names an
+    "Unknown" category.
+    """
+    if lookup is None:
+        lookup = _label_lookup(categories)
+    labels = [None] * n_images
+    seen = set()
+    for line in output_model.splitlines():
+        match = _PACKED_LINE.match(line.strip())
+        if match is None:
+            continue
+        index = int(match.group(1)) - 1
+        if not 0 <= index < n_images:
+            continue
+        label = _match_label(match.group(2).strip("*` "), categories, lookup)
+        if index in seen:
+            labels[index] = None
+            continue
+        seen.add(index)
+        labels[index] = label
+    return labels
+
+
+def _split_count(total, n):
+    """Split an integer count over ``n`` items, first items taking the remainder."""
+    if total is None:
+        return [None] * n
+    base, extra = divmod(total, n)
+    return [base + (1 if i < extra else 0) for i in range(n)]
+
+
+def _split_time(total, n):
+    """Split a duration in seconds evenly over ``n`` items."""
+    return None if total is None else total / n
+
+
+async def _iter_completed(label_row, positions, max_concurrent,
+                          should_stop=None):
+    """
+    Run ``label_row(pos)`` for every row position in ``positions``, keeping
+    at most ``max_concurrent`` calls in flight, and yield results as they
+    complete. ``max_concurrent`` may be an ``AdaptiveConcurrency``, whose
+    current limit is read each time a slot frees up. Once ``should_stop()``
+    returns True no new calls are started; those already in flight are
+    still awaited and yielded.
+    """
+    positions = iter(positions)
+    pending = set()
+    exhausted = False
+    try:
+        while not exhausted or pending:
+            while not exhausted and len(pending) < getattr(max_concurrent, "limit", max_concurrent):
+                if should_stop is not None and should_stop():
+                    exhausted = True
+                    break
+                pos = next(positions, None)
+                if pos is None:
+                    exhausted = True
+                    break
+                pending.add(asyncio.ensure_future(label_row(pos)))
+            if not pending:
+                break
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+def _resolve_concurrency(max_concurrent):
+    """Return ``max_concurrent`` as a positive int or an ``AdaptiveConcurrency``."""
+    if max_concurrent is None:
+        return config.MAX_CONCURRENT_MODELS
+    if isinstance(max_concurrent, str) and max_concurrent == "adaptive":
+        return AdaptiveConcurrency()
+    if isinstance(max_concurrent, AdaptiveConcurrency):
+        return max_concurrent
+    if not isinstance(max_concurrent, int) or max_concurrent < 1:
+        raise ValueError("max_concurrent must be a positive integer, \"adaptive\" "
+                         "or an AdaptiveConcurrency")
+    return max_concurrent
+
+
+def _is_overload(error):
+    return isinstance(error, (TransientModelError, asyncio.TimeoutError))
+
+
+class _UsageBudget:
+    """Running token/cost totals for a labelling run, with optional limits."""
+
+    def __init__(self, token_budget=None, cost_budget=None, token_prices=None):
+        if cost_budget is not None and token_prices is None:
+            raise ValueError("cost_budget requires token_prices")
+        self.token_budget = token_budget
+        self.cost_budget = cost_budget
+        self.token_prices = token_prices
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def add(self, record):
+        self.prompt_tokens += record["prompt_tokens"] or 0
+        self.completion_tokens += record["completion_tokens"] or 0
+
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens
+
+    @property
+    def cost(self):
+        if self.token_prices is None:
+            return None
+        prompt_price, completion_price = self.token_prices
+        return (self.prompt_tokens * prompt_price
+                + self.completion_tokens * completion_price) / 1000
+
+    @property
+    def exhausted(self):
+        if self.token_budget is not None and self.total_tokens >= self.token_budget:
+            return True
+        if self.cost_budget is not None and self.cost >= self.cost_budget:
+            return True
+        return False
+
+
+async def _label_records(radar_df, model, *, categories, guidelines, site,
+                         vmin, vmax, model_output_dir, use_previous_labels,
+                         max_concurrent, journal_path, resume, verbose,
+                         constrained_output, triage, criteria,
+                         color_criteria, dedup_distance, dedup_window,
+                         budget, pack_size, score=False):
+    """Shared engine behind ``label_radar_data`` and ``iter_label_radar_data``."""
+    max_concurrent = _resolve_concurrency(max_concurrent)
+    controller = (max_concurrent if isinstance(max_concurrent, AdaptiveConcurrency)
+                  else None)
+    if pack_size is None:
+        pack_size = 1
+    if not isinstance(pack_size, int) or pack_size < 1:
+        raise ValueError("pack_size must be a positive integer")
+    if pack_size > 1 and constrained_output:
+        raise ValueError("pack_size cannot be combined with constrained_output")
+    if score and (pack_size > 1 or constrained_output):
+        raise ValueError("score cannot be combined with pack_size or constrained_output")
+    if resume and journal_path is None:
+        raise ValueError("resume=True requires a journal_path")
+    if triage and not criteria and not (
+            "pct_gates_10dbz" in radar_df.columns
+            and "no precipitation" in _label_lookup(categories)):
+        raise ValueError("triage requires criteria, or a pct_gates_10dbz column "
+                         "and a 'No Precipitation' category for clear-air scans")
+    journal = LabelJournal(journal_path) if journal_path is not None else None
+
+    prompt = _build_prompt(radar_df.columns, categories, guidelines, site,
+                           vmin, vmax)
+    file_paths = radar_df["file_path"].to_numpy()
+    times = (radar_df["time"].to_numpy() if "time" in radar_df.columns
+             else radar_df.index.to_numpy())
+    hand_labels = (radar_df["label"].to_numpy() if "label" in radar_df.columns
+                   else None)
+    lookup = _label_lookup(categories)
+    chat_kwargs = _chat_kwargs(model, categories, constrained_output)
+    triaged = None
+    if triage:
+        allowed = None if triage is True else list(triage)
+        triaged = triage_labels(radar_df, criteria, labels=allowed,
+                                categories=list(categories)).to_numpy()
+        if len(triaged) and not any(isinstance(label, str) for label in triaged):
+            warnings.warn("triage decided no rows; every row goes to the model")
+    dependents = {}
+    if dedup_distance is not None:
+        candidates = [pos for pos in range(len(file_paths))
+                      if triaged is None or not isinstance(triaged[pos], str)]
+        stat_columns = [c for c in radar_df.columns if c.startswith("pct_gates_")]
+        stats = (radar_df[stat_columns].to_numpy(dtype=float)[candidates]
+                 if stat_columns else None)
+        duplicate_of = find_near_duplicates(
+            file_paths[candidates], times[candidates],
+            max_distance=dedup_distance, window=dedup_window, stats=stats)
+        for i, rep in enumerate(duplicate_of):
+            if rep >= 0:
+                dependents.setdefault(candidates[rep], []).append(candidates[i])
+    duplicates = {pos for deps in dependents.values() for pos in deps}
+
+    def _new_record(pos, source):
+        return {
+            "position": pos,
+            "file_path": file_paths[pos],
+            "time": times[pos],
+            "label": "Unknown",
+            "raw_output": None,
+            "latency": None,
+            "prompt_tokens": None,
+            "completion_tokens": None,
+            "server_latency": None,
+            "load_latency": None,
+            "prompt_eval_latency": None,
+            "eval_latency": None,
+            "rate_limit_wait": None,
+            "hedged": False,
+            "hedge_saved": None,
+            "probabilities": None,
+            "error": None,
+            "source": source,
+            "reused_from": None,
+        }
+
+    def _with_duplicates(record):
+        yield record
+        for pos in dependents.get(record["position"], ()):
+            duplicate = _new_record(pos, "dedup")
+            duplicate["label"] = record["label"]
+            duplicate["raw_output"] = record["raw_output"]
+            duplicate["error"] = record["error"]
+            duplicate["reused_from"] = record["file_path"]
+            yield duplicate
+
+    def _finish(record, output, output_model):
+        pos = record["position"]
+        fi = file_paths[pos]
+        record["label"] = output
+        record["raw_output"] = output_model
+        if verbose:
+            print("Category assigned:", output)
+            print("Model output:", output_model)
+            if hand_labels is not None:
+                print("Hand label:", hand_labels[pos])
+        if model_output_dir is not None:
+            output_file = f"{model_output_dir}/{os.path.basename(fi).replace('.png', '_llm_output.txt')}"
+            with open(output_file, "w") as f:
+                f.write(output_model)
+        if journal is not None:
+            journal.record(fi, output, output_model, time=times[pos])
+        return record
+
+    async def _label_row(pos):
+        fi = file_paths[pos]
+        record = _new_record(pos, "model")
+        prompt_with_time = _row_prompt(prompt, times, hand_labels, pos,
+                                       use_previous_labels)
+        start = time.perf_counter()
+        try:
+            if score:
+                output_model = await model.score(prompt_with_time, images=[fi],
+                                                 choices=list(categories))
+            else:
+                output_model = await model.chat(prompt_with_time, images=[fi],
+                                                **chat_kwargs)
+        except NotImplementedError:
+            # The backend cannot do this at all (e.g. score=True on a model
+            # without log-probabilities); fail the run, not every row.
+            raise
+        except Exception as e:
+            # Other errors say nothing about load, so they are not reported
+            # as healthy completions.
+            if controller is not None and _is_overload(e):
+                controller.record(overloaded=True)
+            if verbose:
+                print(f"Error labelling {fi}: {e}")
+            record["error"] = str(e)
+            return record
+        record["latency"] = time.perf_counter() - start
+        if controller is not None:
+            controller.record(record["latency"])
+        record["prompt_tokens"] = getattr(output_model, "prompt_tokens", None)
+        record["completion_tokens"] = getattr(output_model, "completion_tokens", None)
+        for key in _LATENCY_KEYS:
+            record[key] = getattr(output_model, key, None)
+        record["rate_limit_wait"] = getattr(output_model, "rate_limit_wait", None)
+        record["hedged"] = getattr(output_model, "hedged", False)
+        record["hedge_saved"] = getattr(output_model, "hedge_saved", None)
+        record["probabilities"] = getattr(output_model, "probabilities", None)
+        budget.add(record)
+        output_model = output_model.strip()
+        return _finish(record, _parse_label(output_model, categories, lookup),
+                       output_model)
+
+    async def _label_pack(group):
+        """Label the rows in ``group`` with one request, falling back to
+        single-image calls for any image whose label cannot be parsed."""
+        if len(group) == 1:
+            return [await _label_row(group[0])]
+        packed_prompt = _packed_prompt(prompt, times, hand_labels, group,
+                                       use_previous_labels)
+        start = time.perf_counter()
+        try:
+            output_model = await model.chat(
+                packed_prompt, images=[file_paths[pos] for pos in group])
+        except Exception as e:
+            # Other errors say nothing about load, so they are not reported
+            # as healthy completions.
+            if controller is not None and _is_overload(e):
+                controller.record(overloaded=True)
+            if verbose:
+                print(f"Error labelling pack of {len(group)}, retrying singly: {e}")
+            return [await _label_row(pos) for pos in group]
+        latency = time.perf_counter() - start
+        if controller is not None:
+            controller.record(latency)
+        labels = _parse_packed_labels(output_model, len(group), categories,
+                                      lookup)
+        parsed = [pos for pos, label in zip(group, labels) if label is not None]
+        prompt_tokens = _split_count(getattr(output_model, "prompt_tokens", None),
+                                     max(len(parsed), 1))
+        completion_tokens = _split_count(
+            getattr(output_model, "completion_tokens", None), max(len(parsed), 1))
+        # Like the tokens, the pack's timings are shared out over the rows
+        # it labelled, so per-row sums match the time spent.
+        n_parsed = max(len(parsed), 1)
+        timings = {key: _split_time(getattr(output_model, key, None), n_parsed)
+                   for key in _LATENCY_KEYS + ("rate_limit_wait", "hedge_saved")}
+        timings["latency"] = _split_time(latency, n_parsed)
+        hedged = getattr(output_model, "hedged", False)
+        output_model = output_model.strip()
+        records = []
+        k = 0
+        for pos, label in zip(group, labels):
+            if label is None:
+                records.append(await _label_row(pos))
+                continue
+            record = _new_record(pos, "model")
+            record.update(timings)
+            record["hedged"] = hedged
+            record["prompt_tokens"] = prompt_tokens[k]
+            record["completion_tokens"] = completion_tokens[k]
+            k += 1
+            budget.add(record)
+            records.append(_finish(record, label, output_model))
+        if not parsed:
+            # Nothing parsed: the pack's tokens were still spent.
+            budget.add({"prompt_tokens": prompt_tokens[0],
+                        "completion_tokens": completion_tokens[0]})
+        return records
+
+    model_positions = []
+    for pos, fi in enumerate(file_paths):
+        if pos in duplicates:
+            continue
+        if triaged is not None and isinstance(triaged[pos], str):
+            record = _new_record(pos, "triage")
+            record["label"] = triaged[pos]
+            yield record
+        elif resume and fi in journal:
+            entry = journal.get(fi)
+            record = _new_record(pos, "journal")
+            record["label"] = entry["label"]
+            record["raw_output"] = entry["raw_output"]
+            for out in _with_duplicates(record):
+                yield out
+        else:
+            model_positions.append(pos)
+
+    groups = [model_positions[i:i + pack_size]
+              for i in range(0, len(model_positions), pack_size)]
+    completed = _iter_completed(_label_pack, groups, max_concurrent,
+                                should_stop=lambda: budget.exhausted)
+    try:
+        async for records in completed:
+            for record in records:
+                for out in _with_duplicates(record):
+                    yield out
+    finally:
+        await completed.aclose()
+    if budget.exhausted:
+        warnings.warn(
+            f"Labelling stopped early: token/cost budget reached after "
+            f"{budget.total_tokens} tokens. Rows that were not labelled "
+            f"are left empty; rerun with resume=True to continue."
+        )
+
+
+async def iter_label_radar_data(radar_df, model, categories=None,
+                                guidelines=None, criteria=None,
+                                color_criteria=None, codebook_path=None,
+                                site="Bankhead National Forest",
+                                verbose=False, vmin=None, vmax=None,
+                                model_output_dir=None,
+                                use_previous_labels=False,
+                                max_concurrent=None, journal_path=None,
+                                resume=False, constrained_output=False,
+                                triage=False, dedup_distance=None,
+                                dedup_window="30min", token_budget=None,
+                                cost_budget=None, token_prices=None,
+                                pack_size=None, score=False):
+    """
+    Label radar data and yield one result record per row as soon as it completes.
+
+    This is the streaming counterpart of ``label_radar_data``: it sends the
+    same prompts, but instead of returning a DataFrame once every row is
+    done it yields a dict per row in completion order, so results can be
+    written to storage or aggregated while the run is still going. The
+    DataFrame is not modified.
+
+    Parameters
+    ----------
+    radar_df (pd.DataFrame): DataFrame containing radar data to be labeled.
+    model: Model used for labeling the radar data.
+    criteria (dict, optional): Hard quantitative criteria as returned by
+        ``criteria_from_codebook``, enforced on each record with
+        ``reclassify_label`` using the row's ``pct_gates_*`` / ``n_gates_*``
+        values.
+
+    The remaining parameters are as for ``label_radar_data``.
+
+    Yields
+    ------
+    dict
+        One record per row with keys ``position`` (row position in
+        ``radar_df``), ``file_path``, ``time``, ``label``, ``raw_output``,
+        ``latency`` (seconds spent in ``model.chat``, or None when the label
+        came from the journal or the call failed), ``prompt_tokens``,
+        ``completion_tokens``, ``server_latency``, ``rate_limit_wait``,
+        ``hedged``, ``hedge_saved`` and ``probabilities`` (as reported by
+        the backend's ``ChatResult``, or None), ``error``,
+        ``source``
+        (``"model"``, ``"journal"``, ``"triage"`` or ``"dedup"``),
+        ``reused_from`` (file path whose label was reused, or None), and
+        ``label_original`` / ``criteria_violation`` (None unless a criterion
+        reclassified the label).
+    """
+    if categories is None:
+        categories = DEFAULT_CATEGORIES
+    vmin, vmax = _resolve_color_scale(vmin, vmax, codebook_path)
+    criteria_fields = sorted({
+        rule["field"] for rules in (criteria or {}).values() for rule in rules
+        if rule["field"] in radar_df.columns
+    })
+    criteria_values = radar_df[criteria_fields].to_numpy()
+    budget = _UsageBudget(token_budget, cost_budget, token_prices)
+
+    records = _label_records(
+        radar_df, model, categories=categories, guidelines=guidelines,
+        site=site, vmin=vmin, vmax=vmax, model_output_dir=model_output_dir,
+        use_previous_labels=use_previous_labels,
+        max_concurrent=max_concurrent, journal_path=journal_path,
+        resume=resume, verbose=verbose,
+        constrained_output=constrained_output, triage=triage,
+        criteria=criteria, color_criteria=color_criteria,
+        dedup_distance=dedup_distance, dedup_window=dedup_window,
+        budget=budget, pack_size=pack_size, score=score)
+    try:
+        async for record in records:
+            record["label_original"] = None
+            record["criteria_violation"] = None
+            if criteria and record["error"] is None:
+                values = dict(zip(criteria_fields,
+                                  criteria_values[record["position"]]))
+                label, original, note = reclassify_label(record["label"],
+                                                         values, criteria)
+                record["label"] = label
+                record["label_original"] = original
+                record["criteria_violation"] = note
+            yield record
+    finally:
+        await records.aclose()
+
+
+def _usage_metrics(radar_df, budget, max_concurrent=None):
+    """Summarize the per-row usage columns for ``log_run_to_mlflow``."""
+    metrics = {
+        "usage/prompt_tokens": budget.prompt_tokens,
+        "usage/completion_tokens": budget.completion_tokens,
+        "usage/total_tokens": budget.total_tokens,
+        "usage/model_calls": int((radar_df["llm_label_source"] == "model").sum()),
+        "usage/budget_exhausted": int(budget.exhausted),
+    }
+    if budget.cost is not None:
+        metrics["usage/cost"] = budget.cost
+    for column in ("llm_latency", "llm_server_latency", "llm_load_latency",
+                   "llm_prompt_eval_latency", "llm_eval_latency",
+                   "llm_rate_limit_wait"):
+        values = radar_df[column].dropna()
+        if len(values):
+            name = column[len("llm_"):]
+            metrics[f"usage/{name}_total_s"] = float(values.sum())
+            metrics[f"usage/{name}_mean_s"] = float(values.mean())
+            metrics[f"usage/{name}_p95_s"] = float(values.quantile(0.95))
+    model_rows = radar_df["llm_label_source"] == "model"
+    if model_rows.any():
+        hedged = radar_df.loc[model_rows, "llm_hedged"]
+        metrics["usage/hedge_rate"] = float(hedged.mean())
+        metrics["usage/hedges"] = int(hedged.sum())
+        metrics["usage/hedge_wins"] = int(radar_df["llm_hedge_saved"].notna().sum())
+        metrics["usage/hedge_saved_total_s"] = float(radar_df["llm_hedge_saved"].sum())
+    if isinstance(max_concurrent, AdaptiveConcurrency):
+        metrics.update(max_concurrent.metrics())
+    return metrics
+
 
 async def label_radar_data(radar_df, model, categories=None, guidelines=None,
                            criteria=None, color_criteria=None,
@@ -515,7 +1168,12 @@ async def label_radar_data(radar_df, model, categories=None, guidelines=None,
                            mlflow_tracking_uri=None, codebook_path=None,
                            site="Bankhead National Forest",
                            verbose=True, vmin=None, vmax=None, model_output_dir=None,
-                           use_previous_labels=False):
+                           use_previous_labels=False, max_concurrent=None,
+                           journal_path=None, resume=False,
+                           constrained_output=False, triage=False,
+                           dedup_distance=None, dedup_window="30min",
+                           token_budget=None, cost_budget=None,
+                           token_prices=None, pack_size=None, score=False):
     """
     Label radar data using a given model.
 
@@ -535,9 +1193,9 @@ async def label_radar_data(radar_df, model, categories=None, guidelines=None,
         ``llm_label_criteria_violation``. Pass ``CODEBOOK_CRITERIA`` to
         enforce the bundled codebook.
     color_criteria (dict, optional): Color-based criteria as returned by
-        ``color_criteria_from_codebook``. Used only for validation
-        metric computation when ``mlflow_experiment`` is set; does not
-        modify any labels. Pass ``CODEBOOK_COLOR_CRITERIA`` to evaluate
+        ``color_criteria_from_codebook``. Used for validation metric
+        computation when ``mlflow_experiment`` is set and for ``triage``;
+        never overrides a model label. Pass ``CODEBOOK_COLOR_CRITERIA`` to evaluate
         against the bundled codebook.
     mlflow_experiment (str, optional): If provided, opens an MLflow run
         under this experiment and logs params, validation metrics
@@ -559,6 +1217,90 @@ async def label_radar_data(radar_df, model, categories=None, guidelines=None,
     model_output_dir: str: Directory to save model outputs.
     use_previous_labels: bool or int: If True, the function will use the previous *use_previous_labels* 
         labels as an additional input to the model for labeling. This can be useful if the model is being used to refine or validate existing labels.
+        Previous rows are taken by position, so ``radar_df`` should be sorted by time.
+    max_concurrent (int, str or AdaptiveConcurrency, optional): Maximum
+        number of ``model.chat`` requests kept in flight at once. Defaults
+        to ``config.MAX_CONCURRENT_MODELS``; pass 1 to label one image at a
+        time. Pass ``"adaptive"`` (or an ``AdaptiveConcurrency`` to reuse
+        one across runs of the same backend) to let the limit grow while
+        the backend is healthy and shrink on rate limits, timeouts or
+        rising latency; its final limit is logged under ``concurrency/``.
+        A request that fails does not cancel the rest of the batch: its
+        row is labelled ``"Unknown"`` and the error message is recorded in
+        ``llm_error``.
+    journal_path (str, optional): Path of an append-only JSON-lines journal
+        (see ``LabelJournal``). Each successful call is appended with its
+        raw model output and parsed label as soon as it completes.
+    resume (bool): If True, rows whose ``file_path`` is already in
+        ``journal_path`` take their label from the journal instead of
+        calling the model again. Requires ``journal_path``.
+    constrained_output (bool): If True, pass the category names to
+        ``model.chat`` as ``choices`` so that backends with structured
+        output (GPT ``response_format``, Ollama ``format``) can only reply
+        with ``{"label": <category>}`` and stop after a handful of tokens.
+        Otherwise, models created with ``stream=True`` are passed the
+        categories as ``stop_labels`` and stop as soon as a reply line is
+        exactly a category name.
+    triage (bool or list of str): If set, rows whose reflectivity statistics
+        decide the class on their own are labelled without calling the
+        model: clear-air scans (``pct_gates_10dbz`` at most
+        ``config.TRIAGE_CLEAR_AIR_MAX_PCT``) and rows that ``criteria`` rule
+        out of every other category (see ``triage_labels``). Color criteria
+        are never used for this, and a category without criteria can never
+        be ruled out. Pass a list of labels to restrict which classes may be
+        assigned this way, e.g. ``["No Precipitation"]``. The path
+        each row took is recorded in ``llm_label_source`` (``"model"``,
+        ``"journal"``, ``"triage"`` or ``"dedup"``).
+    dedup_distance (int, optional): If set, rows not decided by triage are
+        hashed with ``image_dhash`` and any image within this Hamming
+        distance of an earlier representative image inside
+        ``dedup_window`` reuses that image's label instead of calling the
+        model (see ``find_near_duplicates``; 12 of 256 bits suits the
+        scans in ``examples/``). Labels are only reused between rows whose
+        ``pct_gates_*`` values also match. Reused rows are flagged in
+        ``llm_label_reused``. ``radar_df`` should be sorted by time.
+    dedup_window (str or pd.Timedelta): Time window for ``dedup_distance``.
+        Default ``"30min"``.
+    token_budget (int, optional): Stop starting new model calls once the
+        run has used this many prompt + completion tokens. Calls already in
+        flight are completed; rows that were never sent keep an empty
+        ``llm_label`` and can be finished later with ``resume=True``.
+    cost_budget (float, optional): As ``token_budget``, but for the cost
+        computed from ``token_prices``.
+    token_prices (tuple of float, optional): ``(prompt, completion)`` price
+        per 1000 tokens, used for ``cost_budget`` and the logged cost.
+    pack_size (int, optional): Send up to this many consecutive images in
+        one request, with numbered instructions asking for one
+        ``<n>: <category>`` line per image, so the shared prompt is paid
+        once per pack instead of once per image. Images whose label cannot
+        be read from the packed reply are sent again on their own. The
+        pack's token counts and timings (``llm_latency``,
+        ``llm_server_latency`` etc.) are split evenly over the rows
+        labelled from it, so their sums match the pack's totals.
+        Cannot be combined with ``constrained_output``. Default 1.
+    score (bool): If True, call ``model.score`` instead of ``model.chat``:
+        backends that expose token log-probabilities (``GPTModel``) list
+        the categories under single-letter keys and return a probability
+        for every category from one call that generates a single token.
+        ``llm_label`` is the most probable category, and the probabilities
+        are stored in one ``llm_prob_<category>`` column per category (see
+        ``probability_columns``); pass them to ``fit_dawid_skene`` as
+        ``soft_columns``. Cannot be combined with ``pack_size`` or
+        ``constrained_output``. A backend that cannot score raises
+        ``NotImplementedError`` on the first row.
+
+    Per-row client latency, server-reported latency, time spent waiting
+    for the backend's rate limiter and token counts from the backend's
+    ``ChatResult`` are stored in ``llm_latency``, ``llm_server_latency``,
+    ``llm_rate_limit_wait``, ``llm_prompt_tokens`` and
+    ``llm_completion_tokens``; their totals are logged to MLflow under
+    ``usage/``. Backends that break the server time down (Ollama) also
+    fill ``llm_load_latency`` (loading the model), ``llm_prompt_eval_latency``
+    (reading the prompt and images) and ``llm_eval_latency`` (generating
+    the reply); the other backends leave them NaN. With a ``HedgedModel``, ``llm_hedged`` flags rows whose
+    request was duplicated and ``llm_hedge_saved`` holds the estimated
+    seconds saved where the duplicate answered first; the hedge rate and
+    total saving are logged with the usage metrics.
 
     Returns
     -------
@@ -567,69 +1309,71 @@ async def label_radar_data(radar_df, model, categories=None, guidelines=None,
     """
     if categories is None:
         categories = DEFAULT_CATEGORIES
-    if (vmin is None or vmax is None) and codebook_path is not None:
-        cmap = colormap_from_codebook(codebook_path)
-        if vmin is None:
-            vmin = cmap["vmin"]
-        if vmax is None:
-            vmax = cmap["vmax"]
-    if vmin is None:
-        vmin = DEFAULT_VMIN
-    if vmax is None:
-        vmax = DEFAULT_VMAX
-    prompt = "This is an image of weather radar base reflectivity data." \
-                f" The radar site is the ARM Facility {site} site." \
-             " Please classify the weather depicted into one of the following categories: " \
-             f"{', '.join(categories) if categories else ', '.join(categories)}."
-    prompt += "Each category is defined as follows: "
-    for category, description in categories.items():
-        prompt += f"{category}: {description}; "
-    prompt += f"The reflectivity values range from {vmin} dBZ as indicated by the blue colors to {vmax} dBZ as indicated by the red colors."
-    for key in radar_df.columns:
-        if key.startswith("pct_gates_") and key.endswith("dbz"):
-            threshold = key[len("pct_gates_"):-len("dbz")]
-            prompt += f" The percentage of gates with relfectivity above {threshold} dBZ is provided as {key} in the data."
-        if key.startswith("n_gates_") and key.endswith("dbz"):
-            threshold = key[len("n_gates_"):-len("dbz")]
-            prompt += f" The number of gates with relfectivity above {threshold} dBZ is provided as {key} in the data."
-    
-    if guidelines:
-        prompt += " When classifying, follow these annotator guidelines: "
-        prompt += " ".join(guidelines)
-    radar_df["llm_label"] = ""
-
-    for fi in radar_df["file_path"].values:
-        time = radar_df.loc[radar_df["file_path"] == fi, "time"].values[0]
-        cur_index = radar_df.index[radar_df["file_path"] == fi][0]
-        prompt_with_time = prompt + f"Please provide just the category label for the radar image taken at time {time}."      
-        prompt_with_time = prompt_with_time + "Do not provide your reasoning for your selection, just the category."
-        if use_previous_labels:
-            for i in range(use_previous_labels):
-                if cur_index - i - 1 >= 0:
-                    prev_label = radar_df.loc[cur_index - i - 1, "label"]
-                    prompt_with_time += f" The label for the previous radar image taken at time {radar_df.loc[cur_index - i - 1, 'time']} is {prev_label}."
-                    
-        output_model = await model.chat(prompt_with_time, images=[fi])
-        # Find the category label in the output
-        output_model = output_model.strip()
-        output = "Unknown"
-        for category in categories.keys():
-            output_lower = output_model.lower()
-            last_line = output_lower.split("\n")[-1].strip().lower()
-            if category.lower() in last_line:
-                output = category
-                break
-        if verbose:
-             print("Category assigned:", output)
-             print("Model output:", output_model)
-             print("Hand label:", radar_df.loc[radar_df["file_path"] == fi, "label"].values[0])
-        if model_output_dir is not None:
-            output_file = f"{model_output_dir}/{os.path.basename(fi).replace('.png', '_llm_output.txt')}"
-            with open(output_file, "w") as f:
-                f.write(output_model)
-        if output[-1] == ".":
-            output = output[:-1]
-        radar_df.loc[radar_df["file_path"] == fi, "llm_label"] = output.strip()
+    vmin, vmax = _resolve_color_scale(vmin, vmax, codebook_path)
+
+    budget = _UsageBudget(token_budget, cost_budget, token_prices)
+    max_concurrent = _resolve_concurrency(max_concurrent)
+    n_rows = len(radar_df)
+    llm_labels = np.full(n_rows, None, dtype=object)
+    llm_errors = np.full(n_rows, None, dtype=object)
+    llm_sources = np.full(n_rows, None, dtype=object)
+    llm_reused = np.zeros(n_rows, dtype=bool)
+    llm_latency = np.full(n_rows, np.nan)
+    llm_server_latency = np.full(n_rows, np.nan)
+    llm_stage_latency = {key: np.full(n_rows, np.nan) for key in _STAGE_LATENCY_KEYS}
+    llm_rate_limit_wait = np.full(n_rows, np.nan)
+    llm_hedged = np.zeros(n_rows, dtype=bool)
+    llm_hedge_saved = np.full(n_rows, np.nan)
+    prob_columns = probability_columns(categories) if score else {}
+    llm_probs = {category: np.full(n_rows, np.nan) for category in prob_columns}
+    llm_prompt_tokens = np.full(n_rows, None, dtype=object)
+    llm_completion_tokens = np.full(n_rows, None, dtype=object)
+    records = _label_records(
+        radar_df, model, categories=categories, guidelines=guidelines,
+        site=site, vmin=vmin, vmax=vmax, model_output_dir=model_output_dir,
+        use_previous_labels=use_previous_labels,
+        max_concurrent=max_concurrent, journal_path=journal_path,
+        resume=resume, verbose=verbose,
+        constrained_output=constrained_output, triage=triage,
+        criteria=criteria, color_criteria=color_criteria,
+        dedup_distance=dedup_distance, dedup_window=dedup_window,
+        budget=budget, pack_size=pack_size, score=score)
+    async for record in records:
+        llm_labels[record["position"]] = record["label"]
+        llm_errors[record["position"]] = record["error"]
+        llm_sources[record["position"]] = record["source"]
+        llm_reused[record["position"]] = record["reused_from"] is not None
+        if record["source"] == "model":
+            llm_latency[record["position"]] = record["latency"] or np.nan
+            llm_server_latency[record["position"]] = record["server_latency"] or np.nan
+            for key, values in llm_stage_latency.items():
+                if record[key] is not None:
+                    values[record["position"]] = record[key]
+            if record["rate_limit_wait"] is not None:
+                llm_rate_limit_wait[record["position"]] = record["rate_limit_wait"]
+            llm_hedged[record["position"]] = record["hedged"]
+            if record["hedge_saved"] is not None:
+                llm_hedge_saved[record["position"]] = record["hedge_saved"]
+            for category, probability in (record["probabilities"] or {}).items():
+                if category in llm_probs:
+                    llm_probs[category][record["position"]] = probability
+            llm_prompt_tokens[record["position"]] = record["prompt_tokens"]
+            llm_completion_tokens[record["position"]] = record["completion_tokens"]
+    radar_df["llm_label"] = llm_labels
+    radar_df["llm_error"] = llm_errors
+    radar_df["llm_label_source"] = llm_sources
+    radar_df["llm_label_reused"] = llm_reused
+    radar_df["llm_latency"] = llm_latency
+    radar_df["llm_server_latency"] = llm_server_latency
+    for key, values in llm_stage_latency.items():
+        radar_df[f"llm_{key}"] = values
+    radar_df["llm_rate_limit_wait"] = llm_rate_limit_wait
+    radar_df["llm_hedged"] = llm_hedged
+    radar_df["llm_hedge_saved"] = llm_hedge_saved
+    for category, column in prob_columns.items():
+        radar_df[column] = llm_probs[category]
+    radar_df["llm_prompt_tokens"] = pd.array(llm_prompt_tokens, dtype="Int64")
+    radar_df["llm_completion_tokens"] = pd.array(llm_completion_tokens, dtype="Int64")
 
     if criteria:
         radar_df = apply_criteria_to_labels(radar_df, criteria,
@@ -649,11 +1393,140 @@ async def label_radar_data(radar_df, model, categories=None, guidelines=None,
                 "vmax": vmax,
                 "n_categories": len(categories),
                 "criteria_enforced": criteria is not None,
+                "constrained_output": constrained_output,
+                "triage": triage,
+                "dedup_distance": dedup_distance,
+                "token_budget": token_budget,
+                "cost_budget": cost_budget,
+                "pack_size": pack_size,
+                "score": score,
             },
+            metrics=_usage_metrics(radar_df, budget, max_concurrent),
             criteria=criteria,
             color_criteria=color_criteria,
             codebook_path=codebook_path,
             model_output_dir=model_output_dir,
         )
 
-    return radar_df
\ No newline at end of file
+    return radar_df
+
+async def label_radar_data_ensemble(radar_df, models, categories=None,
+                                    guidelines=None, column_names=None,
+                                    codebook_path=None,
+                                    site="Bankhead National Forest",
+                                    verbose=False, vmin=None, vmax=None,
+                                    use_previous_labels=False,
+                                    max_concurrent=None,
+                                    constrained_output=False):
+    """
+    Label radar data with several models at once.
+
+    Every image is validated and encoded once per distinct
+    ``downscale_factor`` and the resulting ``PreparedImage`` is sent to all
+    models concurrently, instead of running ``label_radar_data`` once per
+    model. The output has one label column per model, ready for
+    ``fit_dawid_skene`` or ``calculate_kappa_matrix``.
+
+    Parameters
+    ----------
+    radar_df (pd.DataFrame): DataFrame containing radar data to be labeled.
+    models (list of BaseModel): Models to query.
+    column_names (list of str, optional): Output label column for each
+        model. Defaults to ``llm_label_<model_name>``. Names must be unique.
+    max_concurrent (int, optional): Maximum number of rows in flight; each
+        row sends one request to every model, so no backend sees more than
+        this many concurrent requests. Defaults to
+        ``config.MAX_CONCURRENT_MODELS``.
+
+    The remaining parameters are as for ``label_radar_data``.
+
+    Returns
+    -------
+    pd.DataFrame
+        ``radar_df`` with a label column per model. A failed call leaves
+        that model's label as NaN (treated as "did not label" by
+        ``fit_dawid_skene``) and records the message in the matching
+        ``<column>_error`` column.
+    """
+    if categories is None:
+        categories = DEFAULT_CATEGORIES
+    if max_concurrent is None:
+        max_concurrent = config.MAX_CONCURRENT_MODELS
+    if not isinstance(max_concurrent, int) or max_concurrent < 1:
+        raise ValueError("max_concurrent must be a positive integer")
+    if column_names is None:
+        column_names = [f"llm_label_{model.model_name}" for model in models]
+    if len(column_names) != len(models):
+        raise ValueError("column_names must have one entry per model")
+    if len(set(column_names)) != len(column_names):
+        raise ValueError(f"Label column names must be unique: {column_names}")
+    vmin, vmax = _resolve_color_scale(vmin, vmax, codebook_path)
+
+    prompt = _build_prompt(radar_df.columns, categories, guidelines, site,
+                           vmin, vmax)
+    file_paths = radar_df["file_path"].to_numpy()
+    times = (radar_df["time"].to_numpy() if "time" in radar_df.columns
+             else radar_df.index.to_numpy())
+    hand_labels = (radar_df["label"].to_numpy() if "label" in radar_df.columns
+                   else None)
+    lookup = _label_lookup(categories)
+    chat_kwargs = [_chat_kwargs(model, categories, constrained_output)
+                   for model in models]
+    labels = np.full((len(models), len(radar_df)), np.nan, dtype=object)
+    errors = np.full((len(models), len(radar_df)), None, dtype=object)
+
+    async def _ask(k, model, pos, image):
+        try:
+            output_model = await model.chat(
+                _row_prompt(prompt, times, hand_labels, pos,
+                            use_previous_labels),
+                images=[image], **chat_kwargs[k])
+        except Exception as e:
+            errors[k, pos] = str(e)
+            return
+        labels[k, pos] = _parse_label(output_model, categories, lookup)
+        if verbose:
+            print(f"{column_names[k]}: {labels[k, pos]}")
+
+    async def _label_row(pos):
+        fi = file_paths[pos]
+        prepared = {}
+        calls = []
+        for k, model in enumerate(models):
+            # Models that validate images must not reuse an encoding made
+            # by a model that trusts them.
+            key = (model.downscale_factor, model.trust_images)
+            if key not in prepared:
+                try:
+                    prepared[key] = model.prepare_image(fi)
+                except Exception as e:
+                    prepared[key] = e
+            if isinstance(prepared[key], Exception):
+                errors[k, pos] = str(prepared[key])
+                continue
+            calls.append(_ask(k, model, pos, prepared[key]))
+        await asyncio.gather(*calls)
+
+    completed = _iter_completed(_label_row, range(len(file_paths)),
+                                max_concurrent)
+    try:
+        async for _ in completed:
+            pass
+    finally:
+        await completed.aclose()
+
+    for k, column in enumerate(column_names):
+        radar_df[column] = labels[k]
+        radar_df[f"{column}_error"] = errors[k]
+    return radar_df
+
+
+def __getattr__(name):
+    # PEP 562 hook; the parsed value is kept as a module global.
+    parser = _CODEBOOK_PARSERS.get(name)
+    if parser is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = (parser(_default_codebook_path)
+             if os.path.exists(_default_codebook_path) else None)
+    globals()[name] = value
+    return value
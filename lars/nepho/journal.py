@@ -0,0 +1,94 @@
+"""Append-only checkpoint journal for long labelling runs.
+
+Every completed model call is appended to a JSON-lines file as soon as it
+finishes, so a run that dies part-way through can be restarted with
+``label_radar_data(..., journal_path=..., resume=True)`` without paying for
+the calls that already succeeded.
+"""
+import json
+import os
+
+
+class LabelJournal:
+    """
+    Append-only JSON-lines journal of labelling results keyed by file path.
+
+    Each line is one record with ``file_path``, ``time``, ``label`` and
+    ``raw_output`` keys. When a file path appears more than once the last
+    record wins. A truncated final line (e.g. from a process killed
+    mid-write) is cut from the file on load, so the next record starts on
+    a line of its own.
+
+    Parameters
+    ----------
+    path : str
+        Location of the journal file. Parent directories are created if
+        needed; the file itself is created on the first write.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._records = self._load()
+
+    def _load(self):
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+        self._repair_tail()
+        with open(self.path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if "file_path" in record:
+                    records[record["file_path"]] = record
+        return records
+
+    def _repair_tail(self):
+        """Make the file end in a newline before anything is appended."""
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if not data or data.endswith(b"\n"):
+                return
+            cut = data.rfind(b"\n") + 1
+            try:
+                json.loads(data[cut:])
+            except ValueError:
+                # Partial record from an interrupted write: drop it.
+                f.truncate(cut)
+            else:
+                f.write(b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def __contains__(self, file_path):
+        return file_path in self._records
+
+    def __len__(self):
+        return len(self._records)
+
+    def get(self, file_path):
+        """Return the journalled record for ``file_path``, or None."""
+        return self._records.get(file_path)
+
+    def record(self, file_path, label, raw_output, time=None):
+        """Append one completed result and flush it to disk."""
+        record = {
+            "file_path": str(file_path),
+            "time": None if time is None else str(time),
+            "label": label,
+            "raw_output": raw_output,
+        }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._records[record["file_path"]] = record
+        return record
@@ -1,6 +1,13 @@
-from .base_model import BaseModel
-from .gpt_model import GPTModel
-from .ollama_model import OllamaModel
-from .ask_sage_model import AskSageModel
+from ..._lazy import attach
 
-__all__ = ["BaseModel", "GPTModel", "OllamaModel", "AskSageModel"]
+# Each backend's SDK is imported only when its class is first used.
+__getattr__, __dir__, __all__ = attach(__name__, {
+    **dict.fromkeys(["BaseModel", "ChatResult", "PayloadCache", "PreparedImage"], ".base_model"),
+    "GPTModel": ".gpt_model",
+    "OllamaModel": ".ollama_model",
+    "AskSageModel": ".ask_sage_model",
+    "CachedModel": ".cached_model",
+    "RetryingModel": ".retrying_model",
+    "HedgedModel": ".hedged_model",
+    **dict.fromkeys(["get_model", "register_model", "available_backends"], ".registry"),
+})
@@ -1,21 +1,38 @@
 import asyncio
 import json
 import os
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
 from typing import List, Optional
-from .base_model import BaseModel
+from .base_model import BaseModel, ChatResult
 from ..config import config
+from ..ratelimit import RateLimiter, get_rate_limiter
+from ..retry import TransientModelError, is_transient_status, parse_retry_after
 
+import requests
 from asksageclient import AskSageClient
 
 
 class AskSageModel(BaseModel):
-    """Ask Sage model implementation using the asksageclient API."""
+    """
+    Ask Sage model implementation using the asksageclient API.
 
-    def __init__(self, model_name: str, credentials_json: str, downscale_factor: Optional[int] = None):
-        super().__init__(model_name, downscale_factor=downscale_factor)
+    ``AskSageClient`` is blocking, so its calls run on a thread pool
+    reserved for Ask Sage (``config.ASK_SAGE_MAX_WORKERS`` threads, shared
+    by all instances) rather than the event loop's small default executor,
+    which other libraries also use. Pass ``executor`` to size it per model.
+    """
+
+    def __init__(self, model_name: str, credentials_json: str, downscale_factor: Optional[int] = None,
+                 trust_images: Optional[bool] = None, executor: Optional[Executor] = None,
+                 rate_limiter: Optional[RateLimiter] = None):
+        super().__init__(model_name, downscale_factor=downscale_factor, trust_images=trust_images)
+        self.executor = executor or _default_executor()
         self.credentials = _load_credentials(credentials_json)
         self.api_key = self.credentials['credentials']['api_key']
         self.email = self.credentials['credentials']['Ask_sage_user_info']['username']
+        self.rate_limiter = rate_limiter or get_rate_limiter("ask_sage", self.api_key)
         self.client = AskSageClient(
             email=self.email,
             api_key=self.api_key,
@@ -23,53 +40,76 @@ class AskSageModel(BaseModel):
             server_base_url=config.DEFAULT_ASK_SAGE_SERVER_URL
         )
 
-    async def chat(self, prompt: str, images: Optional[List[str]] = None) -> str:
-        """Generate a response using Ask Sage model."""
+    async def chat(self, prompt: str, images: Optional[List[str]] = None,
+                   choices: Optional[List[str]] = None,
+                   stop_labels: Optional[List[str]] = None) -> str:
+        """
+        Generate a response using Ask Sage model.
+
+        Ask Sage has no structured-output or streaming option, so
+        ``choices`` and ``stop_labels`` are accepted for interface
+        compatibility and otherwise ignored.
+        """
         try:
-            loop = asyncio.get_event_loop()
+            loop = asyncio.get_running_loop()
+            wait = await self.rate_limiter.acquire(
+                self.estimate_tokens(prompt, len(images or [])))
+            start = time.perf_counter()
 
             if images and self.supports_vision():
-                temp_paths = []
-                try:
-                    prepared_images = []
-                    for image_path in images:
-                        if not self.validate_image(image_path):
-                            raise ValueError(f"Invalid image: {image_path}")
-
-                        if self.downscale_factor and self.downscale_factor > 1:
-                            prepared_path = self._downscale_image(image_path)
-                            temp_paths.append(prepared_path)
-                        else:
-                            prepared_path = image_path
-                        prepared_images.append(prepared_path)
-
-                    # query_with_file accepts a single path or a list
-                    file_arg = prepared_images[0] if len(prepared_images) == 1 else prepared_images
-                    response = await loop.run_in_executor(
-                        None,
-                        lambda: self.client.query_with_file(
-                            message=prompt,
-                            file=file_arg,
-                            model=self.model_name
-                        )
-                    )
-                finally:
-                    for temp_path in temp_paths:
-                        os.remove(temp_path)
+                # Image preparation reads and resizes files, so it runs on
+                # the executor along with the upload.
+                response = await loop.run_in_executor(
+                    self.executor, self._query_with_files, prompt, images)
             else:
                 response = await loop.run_in_executor(
-                    None,
+                    self.executor,
                     lambda: self.client.query(
                         message=prompt,
                         model=self.model_name
                     )
                 )
 
-            return response.get("message", "No response received")
+            return ChatResult(
+                response.get("message", "No response received"),
+                client_latency=time.perf_counter() - start,
+                rate_limit_wait=wait,
+            )
 
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise TransientModelError(f"Error calling Ask Sage API: {e}") from e
+        except requests.HTTPError as e:
+            raise _http_error(e) from e
         except Exception as e:
             raise RuntimeError(f"Error calling Ask Sage API: {e}")
 
+    def _query_with_files(self, prompt: str, images: List[str]) -> dict:
+        """Prepare the images and send them with ``query_with_file`` (blocking)."""
+        temp_paths = []
+        try:
+            prepared_images = []
+            for image in images:
+                image_path = os.fspath(image)
+                if self.downscale_factor and self.downscale_factor > 1:
+                    # Validates from the same read it downscales.
+                    prepared_path = self._downscale_image(image_path)
+                    temp_paths.append(prepared_path)
+                else:
+                    self.read_image(image_path)
+                    prepared_path = image_path
+                prepared_images.append(prepared_path)
+
+            # query_with_file accepts a single path or a list
+            file_arg = prepared_images[0] if len(prepared_images) == 1 else prepared_images
+            return self.client.query_with_file(
+                message=prompt,
+                file=file_arg,
+                model=self.model_name
+            )
+        finally:
+            for temp_path in temp_paths:
+                os.remove(temp_path)
+
     def supports_vision(self) -> bool:
         """Check if this model supports vision capabilities."""
         vision_keywords = ["claude", "gpt-4o", "gpt-4-vision", "vision", "gpt-5"]
@@ -78,9 +118,9 @@ class AskSageModel(BaseModel):
     async def list_available_models(self) -> List[str]:
         """List available Ask Sage models."""
         try:
-            loop = asyncio.get_event_loop()
+            loop = asyncio.get_running_loop()
             response = await loop.run_in_executor(
-                None,
+                self.executor,
                 lambda: self.client.get_models()
             )
             return response if isinstance(response, list) else []
@@ -88,6 +128,32 @@ class AskSageModel(BaseModel):
             return []
 
 
+def _http_error(e: requests.HTTPError) -> RuntimeError:
+    """Wrap an HTTP error from Ask Sage, marking 429 and 5xx as transient."""
+    message = f"Error calling Ask Sage API: {e}"
+    response = e.response
+    status = getattr(response, "status_code", None)
+    if status is not None and is_transient_status(status):
+        headers = getattr(response, "headers", None) or {}
+        return TransientModelError(message, status=status,
+                                   retry_after=parse_retry_after(headers.get("Retry-After")))
+    return RuntimeError(message)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _default_executor() -> ThreadPoolExecutor:
+    """Return the thread pool shared by Ask Sage models, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=config.ASK_SAGE_MAX_WORKERS,
+                                           thread_name_prefix="asksage")
+        return _executor
+
+
 # Load credentials from file
 def _load_credentials(filename):
     """Load API credentials from JSON file."""
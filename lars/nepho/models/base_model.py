@@ -1,7 +1,11 @@
 import base64
 import io
+import json
+import math
 import os
 import tempfile
+import threading
+from collections import OrderedDict
 
 from ..config import config
 from abc import ABC, abstractmethod
@@ -9,76 +13,505 @@ from typing import List, Optional, Dict, Any
 from PIL import Image
 
 
+class ChatResult(str):
+    """
+    Model reply text carrying token usage and timing metadata.
+
+    ``ChatResult`` is a ``str`` subclass, so callers that only need the
+    text can keep treating it as one. String methods such as ``strip``
+    return plain strings, so read the metadata before transforming the
+    text. Fields a backend does not report are None.
+
+    Attributes
+    ----------
+    prompt_tokens, completion_tokens : int or None
+        Input and output token counts reported by the backend.
+    client_latency : float or None
+        Wall-clock seconds spent waiting for the backend.
+    server_latency : float or None
+        Seconds the backend reports spending on the request.
+    load_latency : float or None
+        Seconds the backend reports spending loading the model.
+    prompt_eval_latency : float or None
+        Seconds the backend reports spending reading the prompt (and
+        images) before generating.
+    eval_latency : float or None
+        Seconds the backend reports spending generating the reply.
+    cached : bool
+        True if the reply was served from a cache without calling the
+        backend.
+    stopped_early : bool
+        True if a streamed reply was cut off once its label was recognized.
+    rate_limit_wait : float or None
+        Seconds the request waited for the backend's rate limiter.
+    hedged : bool
+        True if ``HedgedModel`` sent a duplicate of the request.
+    hedge_saved : float or None
+        Estimated seconds saved when the duplicate answered first.
+    probabilities : dict or None
+        Probability of each category, for replies from ``score``.
+    """
+
+    def __new__(cls, text, prompt_tokens=None, completion_tokens=None,
+                client_latency=None, server_latency=None, load_latency=None,
+                prompt_eval_latency=None, eval_latency=None, cached=False,
+                stopped_early=False, rate_limit_wait=None, hedged=False,
+                hedge_saved=None, probabilities=None):
+        obj = super().__new__(cls, text if text is not None else "")
+        obj.prompt_tokens = prompt_tokens
+        obj.completion_tokens = completion_tokens
+        obj.client_latency = client_latency
+        obj.server_latency = server_latency
+        obj.load_latency = load_latency
+        obj.prompt_eval_latency = prompt_eval_latency
+        obj.eval_latency = eval_latency
+        obj.cached = cached
+        obj.stopped_early = stopped_early
+        obj.rate_limit_wait = rate_limit_wait
+        obj.hedged = hedged
+        obj.hedge_saved = hedge_saved
+        obj.probabilities = probabilities
+        return obj
+
+    @property
+    def total_tokens(self) -> Optional[int]:
+        if self.prompt_tokens is None and self.completion_tokens is None:
+            return None
+        return (self.prompt_tokens or 0) + (self.completion_tokens or 0)
+
+    def usage(self) -> Dict[str, Any]:
+        """Return the metadata as a plain dict."""
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "client_latency": self.client_latency,
+            "server_latency": self.server_latency,
+            "load_latency": self.load_latency,
+            "prompt_eval_latency": self.prompt_eval_latency,
+            "eval_latency": self.eval_latency,
+            "cached": self.cached,
+            "rate_limit_wait": self.rate_limit_wait,
+            "hedged": self.hedged,
+            "hedge_saved": self.hedge_saved,
+        }
+
+
+class PreparedImage:
+    """
+    An image that has already been validated and base64-encoded.
+
+    Passing a ``PreparedImage`` in ``images`` lets several models share one
+    encoding of the same file. It behaves as a path-like object, so
+    backends that need the file itself can still open it. ``validated`` is
+    False when it was encoded by a model with ``trust_images`` set, which
+    skips decoding the image; models that validate images do not reuse it.
+    """
+
+    def __init__(self, path: str, data: str, downscale_factor: Optional[int] = None,
+                 validated: bool = True):
+        self.path = path
+        self.data = data
+        self.downscale_factor = downscale_factor
+        self.validated = validated
+
+    def __fspath__(self) -> str:
+        return self.path
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.path!r}, downscale_factor={self.downscale_factor})"
+
+
+class LabelStreamParser:
+    """
+    Recognize a category label in a reply as it is streamed.
+
+    Text is fed in chunks with ``feed``. As soon as a completed line is
+    exactly one of ``labels`` (ignoring case, surrounding whitespace and a
+    trailing period), or the reply so far is a complete
+    ``{"label": <label>}`` object, ``feed`` returns True and ``text`` holds
+    the reply up to the end of that line. The truncated reply ends with the
+    recognized label, so it parses to the same category as it would if
+    generation had stopped there. Lines that merely mention a category are
+    not enough to stop early.
+
+    Parameters
+    ----------
+    labels : list of str
+        The category names to watch for.
+    """
+
+    def __init__(self, labels: List[str]):
+        self._labels = {label.strip().rstrip(".").lower() for label in labels}
+        self._reply = ""
+        self._pending = ""
+        self._consumed = 0
+        self.text = ""
+        self.label_found = False
+
+    def _is_label(self, line: str) -> bool:
+        return line.strip().rstrip(".").lower() in self._labels
+
+    def _is_label_object(self, text: str) -> bool:
+        text = text.strip()
+        if not (text.startswith("{") and text.endswith("}")):
+            return False
+        try:
+            reply = json.loads(text)
+        except json.JSONDecodeError:
+            return False
+        return (isinstance(reply, dict) and isinstance(reply.get("label"), str)
+                and self._is_label(reply["label"]))
+
+    def feed(self, chunk: str) -> bool:
+        """Add a chunk of the reply; return True once a label is recognized."""
+        if self.label_found or not chunk:
+            return self.label_found
+        self._reply += chunk
+        self._pending += chunk
+        *lines, self._pending = self._pending.split("\n")
+        for line in lines:
+            self._consumed += len(line) + 1
+            if self._is_label(line):
+                self.text = self._reply[:self._consumed - 1]
+                self.label_found = True
+                return True
+        self.text = self._reply
+        self.label_found = self._is_label_object(self._reply)
+        return self.label_found
+
+
+class PayloadCache:
+    """
+    Bounded LRU of base64-encoded image payloads.
+
+    Entries are keyed by ``(path, mtime, size, downscale_factor)``, so an
+    image that is rewritten on disk is re-encoded while an unchanged one is
+    encoded at most once per downscale factor, whichever backend asks for
+    it. When the stored payloads exceed ``max_size_mb`` the least recently
+    used entries are dropped.
+
+    Parameters
+    ----------
+    max_size_mb : float, optional
+        Upper bound on the total size of cached payloads. Defaults to
+        ``config.IMAGE_PAYLOAD_CACHE_MB``; 0 disables the cache.
+    """
+
+    def __init__(self, max_size_mb: Optional[float] = None):
+        if max_size_mb is None:
+            max_size_mb = config.IMAGE_PAYLOAD_CACHE_MB
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        # Ask Sage encodes from executor threads.
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[str]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data: str):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, stale = self._entries.popitem(last=False)
+                self._size -= len(stale)
+
+    def clear(self):
+        """Drop every cached payload and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "size_bytes": self._size,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
 class BaseModel(ABC):
-    """Abstract base class for all chatbot models."""
+    """
+    Abstract base class for all chatbot models.
 
-    def __init__(self, model_name: str, downscale_factor: Optional[int] = None):
+    Images are read from disk once per preparation: the same buffer is
+    checked and then encoded. Setting ``trust_images`` (or the
+    ``TRUST_IMAGES`` environment variable) skips decoding the image to
+    verify it, which is safe for the PNGs written by
+    ``preprocess_radar_data`` and saves a full decode per image.
+    """
+
+    #: Encoded image payloads, shared by every backend in the process.
+    payload_cache = PayloadCache()
+
+    def __init__(self, model_name: str, downscale_factor: Optional[int] = None,
+                 trust_images: Optional[bool] = None):
         if downscale_factor is not None and (not isinstance(downscale_factor, int) or downscale_factor < 1):
             raise ValueError("downscale_factor must be a positive integer")
         self.model_name = model_name
         self.downscale_factor = downscale_factor
+        self.trust_images = config.TRUST_IMAGES if trust_images is None else trust_images
 
     @abstractmethod
-    async def chat(self, prompt: str, images: Optional[List[str]] = None) -> str:
-        """Generate a response based on the prompt and optional images."""
+    async def chat(self, prompt: str, images: Optional[List[str]] = None,
+                   choices: Optional[List[str]] = None,
+                   stop_labels: Optional[List[str]] = None) -> str:
+        """
+        Generate a response based on the prompt and optional images.
+
+        Backends return a ``ChatResult`` so that token counts and timings
+        are available alongside the text.
+
+        When ``choices`` is given, backends that support structured output
+        constrain the reply to a JSON object ``{"label": <one of choices>}``
+        and cap the number of generated tokens accordingly.
+
+        When ``stop_labels`` is given, backends created with
+        ``stream=True`` stream the reply and cancel the request as soon as
+        a ``LabelStreamParser`` recognizes one of the labels.
+        """
         pass
 
-    def _downscale_image(self, image_path: str) -> str:
-        """Write a downscaled copy of the image to a temp file and return its path."""
-        with Image.open(image_path) as img:
+    async def score(self, prompt: str, images: Optional[List[str]] = None,
+                    choices: Optional[List[str]] = None) -> "ChatResult":
+        """
+        Return a probability for every one of ``choices`` from a single call.
+
+        Backends that expose token log-probabilities list the choices
+        under single-letter keys (see ``score_prompt``), generate one
+        token and read the probability of each key from its top
+        log-probabilities. The result's text is the most probable choice
+        and its ``probabilities`` attribute maps every choice to its
+        probability.
+        """
+        raise NotImplementedError(
+            f"{self.__class__.__name__} does not support log-probability scoring")
+
+    @staticmethod
+    def score_keys(n_choices: int) -> List[str]:
+        """Single-token keys ("A", "B", ...) under which choices are listed for ``score``."""
+        if not 1 <= n_choices <= 26:
+            raise ValueError("Log-probability scoring supports 1 to 26 choices")
+        return [chr(ord("A") + i) for i in range(n_choices)]
+
+    @classmethod
+    def score_prompt(cls, prompt: str, choices: List[str]) -> str:
+        """Append the lettered choices and ask for the letter alone."""
+        lines = [f"{key}. {choice}" for key, choice in
+                 zip(cls.score_keys(len(choices)), choices)]
+        return (f"{prompt}\n\nReply with only the letter of the category:\n"
+                + "\n".join(lines))
+
+    @classmethod
+    def choice_probabilities(cls, top_logprobs: Dict[str, float],
+                             choices: List[str]) -> Dict[str, float]:
+        """
+        Turn the top log-probabilities of the first reply token into choice probabilities.
+
+        Tokens that differ from a key only in whitespace or trailing
+        punctuation (" A", "A.") count towards it. Probabilities are
+        renormalized over the choices; a choice whose key is not among
+        the top tokens gets 0.
+
+        Raises
+        ------
+        ValueError
+            If none of the keys is among the top tokens.
+        """
+        keys = cls.score_keys(len(choices))
+        index = {key: i for i, key in enumerate(keys)}
+        mass = [0.0] * len(choices)
+        for token, logprob in top_logprobs.items():
+            i = index.get(token.strip().rstrip(".):").upper())
+            if i is not None:
+                mass[i] += math.exp(logprob)
+        total = sum(mass)
+        if total == 0:
+            raise ValueError("None of the category keys is among the top log-probabilities")
+        return {choice: m / total for choice, m in zip(choices, mass)}
+
+    @staticmethod
+    def label_schema(choices: List[str]) -> Dict[str, Any]:
+        """JSON schema for a reply of the form ``{"label": <one of choices>}``."""
+        return {
+            "type": "object",
+            "properties": {"label": {"type": "string", "enum": list(choices)}},
+            "required": ["label"],
+            "additionalProperties": False,
+        }
+
+    @staticmethod
+    def choice_token_budget(choices: List[str]) -> int:
+        """
+        Upper bound on the tokens needed to emit ``{"label": <choice>}``.
+
+        Assumes no tokenizer packs fewer than two characters per token, plus
+        a fixed allowance for the JSON punctuation and key.
+        """
+        longest = max(len(choice) for choice in choices)
+        return -(-longest // 2) + 10
+
+    @staticmethod
+    def estimate_tokens(prompt: str, n_images: int = 0, max_tokens: int = 0) -> int:
+        """
+        Rough upper estimate of the tokens a request will use, for rate limiting.
+
+        Assumes about four characters per prompt token and
+        ``config.RATE_LIMIT_IMAGE_TOKENS`` per image, plus the completion
+        allowance.
+        """
+        return len(prompt) // 4 + n_images * config.RATE_LIMIT_IMAGE_TOKENS + max_tokens
+
+    def _downscale_bytes(self, raw: bytes) -> bytes:
+        """Return the encoded image downscaled by ``downscale_factor``, in its original format."""
+        with Image.open(io.BytesIO(raw)) as img:
             img_format = img.format or "PNG"
             new_size = (
                 max(1, img.width // self.downscale_factor),
                 max(1, img.height // self.downscale_factor),
             )
             resized = img.resize(new_size, Image.LANCZOS)
-            suffix = os.path.splitext(image_path)[1] or ".png"
-            tmp = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
-            try:
-                resized.save(tmp.name, format=img_format)
-            finally:
-                tmp.close()
-            return tmp.name
+        buffer = io.BytesIO()
+        resized.save(buffer, format=img_format)
+        return buffer.getvalue()
+
+    def _downscale_image(self, image_path: str) -> str:
+        """Write a downscaled copy of the image to a temp file and return its path."""
+        raw = self.read_image(image_path)
+        suffix = os.path.splitext(image_path)[1] or ".png"
+        tmp = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+        try:
+            tmp.write(self._downscale_bytes(raw))
+        finally:
+            tmp.close()
+        return tmp.name
+
+    def read_image(self, image_path: str, file_size: Optional[int] = None) -> bytes:
+        """
+        Read an image file once and check it from the in-memory buffer.
+
+        Checks the extension and size, then (unless ``trust_images`` is
+        set) that the bytes decode as an image in a supported format.
+
+        Returns
+        -------
+        bytes
+            The file contents.
+
+        Raises
+        ------
+        ValueError
+            If the file is missing, too large or not a supported image.
+        """
+        file_ext = os.path.splitext(image_path)[1].lower().lstrip('.')
+        if file_ext not in config.SUPPORTED_IMAGE_FORMATS:
+            raise ValueError(f"Invalid image: {image_path} (unsupported extension)")
+        max_bytes = config.MAX_IMAGE_SIZE_MB * 1024 * 1024
+        try:
+            if file_size is None:
+                file_size = os.path.getsize(image_path)
+            if file_size > max_bytes:
+                raise ValueError(f"Invalid image: {image_path} (larger than {config.MAX_IMAGE_SIZE_MB} MB)")
+            with open(image_path, "rb") as image_file:
+                raw = image_file.read()
+        except OSError as e:
+            raise ValueError(f"Invalid image: {image_path} ({e})")
+        if self.trust_images:
+            return raw
+        try:
+            with Image.open(io.BytesIO(raw)) as img:
+                img_format = (img.format or "").lower()
+                img.verify()
+        except Exception as e:
+            raise ValueError(f"Invalid image: {image_path} ({e})")
+        if img_format not in config.SUPPORTED_IMAGE_FORMATS:
+            raise ValueError(f"Invalid image: {image_path} (unsupported format {img_format})")
+        return raw
 
     def encode_image(self, image_path: str) -> str:
-        """Encode image to base64 string for API calls, downscaling first if configured."""
+        """
+        Check and encode an image to a base64 string for API calls.
+
+        The file is read once; the same buffer is validated, downscaled in
+        memory if configured, and encoded. The result is kept in the shared
+        ``payload_cache`` so sending the same image again skips the work.
+        Payloads encoded without validation (``trust_images``) are cached
+        separately and only reused by models that also trust their images.
+
+        Raises
+        ------
+        ValueError
+            If the image is invalid or cannot be encoded.
+        """
+        factor = self.downscale_factor if self.downscale_factor and self.downscale_factor > 1 else None
         try:
-            temp_path = None
-            if self.downscale_factor and self.downscale_factor > 1:
-                temp_path = self._downscale_image(image_path)
-            try:
-                with open(temp_path or image_path, "rb") as image_file:
-                    return base64.b64encode(image_file.read()).decode('utf-8')
-            finally:
-                if temp_path:
-                    os.remove(temp_path)
+            stat = os.stat(image_path)
+        except OSError as e:
+            raise ValueError(f"Invalid image: {image_path} ({e})")
+        key = (os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size, factor)
+        data = self.payload_cache.get(key + (True,))
+        if data is None and self.trust_images:
+            data = self.payload_cache.get(key + (False,))
+        if data is not None:
+            return data
+        raw = self.read_image(image_path, file_size=stat.st_size)
+        try:
+            if factor:
+                raw = self._downscale_bytes(raw)
+            data = base64.b64encode(raw).decode('utf-8')
         except Exception as e:
             raise ValueError(f"Error encoding image {image_path}: {e}")
+        self.payload_cache.put(key + (not self.trust_images,), data)
+        return data
     
+    def prepare_image(self, image) -> PreparedImage:
+        """
+        Validate and encode an image for this model.
+
+        ``image`` may be a path or a ``PreparedImage``; a ``PreparedImage``
+        encoded with this model's ``downscale_factor`` is returned as is,
+        unless it was not validated and this model validates its images.
+        """
+        if (isinstance(image, PreparedImage)
+                and image.downscale_factor == self.downscale_factor
+                and (image.validated or self.trust_images)):
+            return image
+        image_path = os.fspath(image)
+        return PreparedImage(image_path, self.encode_image(image_path),
+                             downscale_factor=self.downscale_factor,
+                             validated=not self.trust_images)
+
     def validate_image(self, image_path: str) -> bool:
         """Validate if image exists and is in supported format."""
-        
-        
-        if not os.path.exists(image_path):
-            return False
-        
-        # Check file extension
-        file_ext = os.path.splitext(image_path)[1].lower().lstrip('.')
-        if file_ext not in config.SUPPORTED_IMAGE_FORMATS:
-            return False
-        
-        # Check file size
-        file_size_mb = os.path.getsize(image_path) / (1024 * 1024)
-        if file_size_mb > config.MAX_IMAGE_SIZE_MB:
-            return False
-        
-        # Try to open with PIL to validate it's a valid image
         try:
-            with Image.open(image_path) as img:
-                img.verify()
-            return True
-        except Exception:
+            self.read_image(image_path)
+        except ValueError:
             return False
+        return True
     
     def __str__(self) -> str:
         return f"{self.__class__.__name__}({self.model_name})"
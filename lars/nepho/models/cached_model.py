@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import sqlite3
+from typing import List, Optional
+from .base_model import BaseModel, ChatResult
+from ..config import config
+
+
+class CachedModel(BaseModel):
+    """
+    Persistent response cache wrapped around any other model.
+
+    Responses are stored in a SQLite database under ``cache_dir`` keyed by
+    the wrapped backend and model name, a hash of the prompt, and a hash of
+    each image's contents, so re-running an experiment over the same images
+    and prompt does not query the model again. When the stored responses
+    exceed ``max_size_mb``, the least recently used entries are evicted.
+
+    Parameters
+    ----------
+    model : BaseModel
+        The model whose responses are cached.
+    cache_dir : str, optional
+        Directory for the cache database. Defaults to
+        ``config.RESPONSE_CACHE_DIR``.
+    max_size_mb : float, optional
+        Upper bound on the total size of cached responses. Defaults to
+        ``config.RESPONSE_CACHE_MAX_MB``.
+    """
+
+    def __init__(self, model: BaseModel, cache_dir: Optional[str] = None,
+                 max_size_mb: Optional[float] = None):
+        super().__init__(model.model_name, downscale_factor=model.downscale_factor,
+                         trust_images=model.trust_images)
+        self.model = model
+        self.cache_dir = cache_dir or config.RESPONSE_CACHE_DIR
+        if max_size_mb is None:
+            max_size_mb = config.RESPONSE_CACHE_MAX_MB
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._image_hashes = {}
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(self.cache_dir, "responses.sqlite"))
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+            "size INTEGER NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self._db.commit()
+        self._clock = self._db.execute(
+            "SELECT COALESCE(MAX(last_used), 0) FROM responses"
+        ).fetchone()[0]
+
+    def __getattr__(self, name):
+        # Only reached for attributes CachedModel itself does not define,
+        # e.g. backend-specific helpers such as ``supports_vision``.
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def _image_hash(self, image) -> str:
+        image_path = os.fspath(image)
+        stat = os.stat(image_path)
+        memo_key = (image_path, stat.st_mtime_ns, stat.st_size)
+        digest = self._image_hashes.get(memo_key)
+        if digest is None:
+            with open(image_path, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            self._image_hashes[memo_key] = digest
+        return digest
+
+    def cache_key(self, prompt: str, images: Optional[List[str]] = None,
+                  choices: Optional[List[str]] = None,
+                  stop_labels: Optional[List[str]] = None) -> str:
+        """Return the cache key for a ``chat`` request."""
+        parts = [
+            type(self.model).__name__,
+            self.model.model_name,
+            str(self.model.downscale_factor),
+            hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+        ]
+        if choices:
+            parts.append("choices=" + "|".join(choices))
+        if stop_labels and getattr(self.model, "stream", False):
+            # An early-stopped reply is shorter than the full one.
+            parts.append("stop=" + "|".join(stop_labels))
+        parts.extend(self._image_hash(path) for path in images or [])
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def _touch(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    async def chat(self, prompt: str, images: Optional[List[str]] = None,
+                   choices: Optional[List[str]] = None,
+                   stop_labels: Optional[List[str]] = None) -> str:
+        """Return the cached response if present, otherwise call the wrapped model."""
+        key = self.cache_key(prompt, images, choices, stop_labels)
+        cached = self._lookup(key)
+        if cached is not None:
+            return ChatResult(cached, prompt_tokens=0, completion_tokens=0,
+                              client_latency=0.0, cached=True)
+
+        kwargs = {}
+        if choices:
+            kwargs["choices"] = choices
+        if stop_labels:
+            kwargs["stop_labels"] = stop_labels
+        response = await self.model.chat(prompt, images=images, **kwargs)
+        self._store(key, response)
+        return response
+
+    async def score(self, prompt: str, images: Optional[List[str]] = None,
+                    choices: Optional[List[str]] = None) -> ChatResult:
+        """Return cached choice probabilities if present, otherwise score with the wrapped model."""
+        key = self.cache_key("score\0" + prompt, images, choices)
+        cached = self._lookup(key)
+        if cached is not None:
+            probabilities = json.loads(cached)
+            return ChatResult(max(probabilities, key=probabilities.get),
+                              prompt_tokens=0, completion_tokens=0,
+                              client_latency=0.0, cached=True,
+                              probabilities=probabilities)
+
+        result = await self.model.score(prompt, images=images, choices=choices)
+        self._store(key, json.dumps(result.probabilities))
+        return result
+
+    def _lookup(self, key: str) -> Optional[str]:
+        """Return the stored response for ``key`` and count the hit or miss."""
+        row = self._db.execute(
+            "SELECT response FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._db.execute(
+            "UPDATE responses SET last_used = ? WHERE key = ?", (self._touch(), key)
+        )
+        self._db.commit()
+        return row[0]
+
+    def _store(self, key: str, response: str):
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses (key, response, size, last_used) "
+            "VALUES (?, ?, ?, ?)",
+            (key, response, size, self._touch()),
+        )
+        self._evict()
+        self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current size of the cache."""
+        entries, size = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+    def clear(self):
+        """Remove every cached response."""
+        self._db.execute("DELETE FROM responses")
+        self._db.commit()
+
+    def close(self):
+        """Close the cache database."""
+        self._db.close()
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}({self.model})"
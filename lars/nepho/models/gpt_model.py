@@ -1,69 +1,230 @@
 import asyncio
+import time
 from typing import List, Optional
+import openai
 from openai import AsyncOpenAI
-from .base_model import BaseModel
+from .base_model import BaseModel, ChatResult, LabelStreamParser
 from ..config import config
+from ..ratelimit import RateLimiter, get_rate_limiter
+from ..retry import TransientModelError, is_transient_status, parse_retry_after
+from ..transport import HTTPTransport, get_transport
 
 class GPTModel(BaseModel):
-    """GPT model implementation using OpenAI API."""
+    """
+    GPT model implementation using OpenAI API.
+
+    With ``stream=True`` replies are streamed, and when ``chat`` is given
+    ``stop_labels`` the stream is closed as soon as a label is recognized.
+
+    ``score`` returns a probability for every category from one call that
+    generates a single token, using ``logprobs``/``top_logprobs``. It works
+    with OpenAI and with OpenAI-compatible servers that report
+    log-probabilities (set ``base_url``, e.g. to a vLLM server).
+    """
     
     def __init__(self, model_name: str = None, api_key: str = None, base_url: str = None, temperature: float = 0.7,
-                 downscale_factor: Optional[int] = None):
+                 downscale_factor: Optional[int] = None, transport: Optional[HTTPTransport] = None,
+                 trust_images: Optional[bool] = None, stream: bool = False,
+                 rate_limiter: Optional[RateLimiter] = None):
         model_name = model_name or config.DEFAULT_GPT_MODEL
-        super().__init__(model_name, downscale_factor=downscale_factor)
+        super().__init__(model_name, downscale_factor=downscale_factor, trust_images=trust_images)
 
         self.temperature = temperature
+        self.stream = stream
         self.api_key = api_key or config.OPENAI_API_KEY
         self.base_url = base_url or config.OPENAI_BASE_URL
         if not self.api_key:
             raise ValueError("OpenAI API key is required. Set OPENAI_API_KEY environment variable.")
         
-        self.client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url)
+        self.rate_limiter = rate_limiter or get_rate_limiter("openai", self.api_key)
+        self.transport = transport or get_transport()
+        self._client = None
+        self._client_http = None
+        self._client_fixed = False
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """
+        The ``AsyncOpenAI`` client for the running event loop.
+
+        It is created on first use and recreated whenever the transport
+        hands out a new HTTP client, e.g. in a later ``asyncio.run``.
+        Assigning a client pins it instead.
+        """
+        if self._client_fixed:
+            return self._client
+        http_client = self.transport.openai_http_client()
+        if self._client is None or self._client_http is not http_client:
+            self._client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url,
+                                       http_client=http_client)
+            self._client_http = http_client
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+        self._client_http = None
+        self._client_fixed = True
     
-    async def chat(self, prompt: str, images: Optional[List[str]] = None) -> str:
-        """Generate a response using GPT model."""
-        try:
-            messages = []
+    def build_request(self, prompt: str, images: Optional[List[str]] = None,
+                      choices: Optional[List[str]] = None) -> dict:
+        """Return the Chat Completions request body for a ``chat`` call."""
+        messages = []
+        
+        # Handle images if provided
+        if images:
+            content = [{"type": "text", "text": prompt}]
             
-            # Handle images if provided
-            if images:
-                content = [{"type": "text", "text": prompt}]
-                
-                for image_path in images:
-                    if not self.validate_image(image_path):
-                        raise ValueError(f"Invalid image: {image_path}")
-                    
-                    image_data = self.encode_image(image_path)
-                    content.append({
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{image_data}"
-                        }
-                    })
-                
-                messages.append({
-                    "role": "user",
-                    "content": content
+            for image in images:
+                image_data = self.prepare_image(image).data
+                content.append({
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:image/png;base64,{image_data}"
+                    }
                 })
+            
+            messages.append({
+                "role": "user",
+                "content": content
+            })
+        else:
+            messages.append({
+                "role": "user",
+                "content": prompt
+            })
+        
+        request = {
+            "model": self.model_name,
+            "messages": messages,
+            "max_tokens": 1000,
+            "temperature": self.temperature,
+        }
+        if choices:
+            request["max_tokens"] = self.choice_token_budget(choices)
+            request["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "radar_label",
+                    "strict": True,
+                    "schema": self.label_schema(choices),
+                },
+            }
+        return request
+
+    async def chat(self, prompt: str, images: Optional[List[str]] = None,
+                   choices: Optional[List[str]] = None,
+                   stop_labels: Optional[List[str]] = None) -> str:
+        """Generate a response using GPT model."""
+        try:
+            request = self.build_request(prompt, images=images, choices=choices)
+            estimate = self.estimate_tokens(prompt, len(images or []), request["max_tokens"])
+            wait = await self.rate_limiter.acquire(estimate)
+
+            start = time.perf_counter()
+            if self.stream:
+                result = await self._stream_chat(request, stop_labels, start)
             else:
-                messages.append({
-                    "role": "user",
-                    "content": prompt
-                })
+                response = await self.client.chat.completions.create(**request)
+                client_latency = time.perf_counter() - start
+
+                usage = getattr(response, "usage", None)
+                result = ChatResult(
+                    response.choices[0].message.content,
+                    prompt_tokens=getattr(usage, "prompt_tokens", None),
+                    completion_tokens=getattr(usage, "completion_tokens", None),
+                    client_latency=client_latency,
+                )
+            self.rate_limiter.settle(estimate, result.total_tokens)
+            result.rate_limit_wait = wait
+            return result
             
-            response = await self.client.chat.completions.create(
-                model=self.model_name,
-                messages=messages,
-                max_tokens=1000,
-                temperature=self.temperature
+        except Exception as e:
+            raise _api_error(e) from e
+
+    async def score(self, prompt: str, images: Optional[List[str]] = None,
+                    choices: Optional[List[str]] = None) -> ChatResult:
+        """Score every choice from the log-probabilities of a one-token reply."""
+        if not choices:
+            raise ValueError("score requires choices")
+        choices = list(choices)
+        try:
+            request = self.build_request(self.score_prompt(prompt, choices), images=images)
+            request.update(max_tokens=1, temperature=0, logprobs=True,
+                           top_logprobs=min(_MAX_TOP_LOGPROBS, len(choices) + 5))
+            estimate = self.estimate_tokens(prompt, len(images or []), 1)
+            wait = await self.rate_limiter.acquire(estimate)
+
+            start = time.perf_counter()
+            response = await self.client.chat.completions.create(**request)
+            client_latency = time.perf_counter() - start
+
+            logprobs = getattr(response.choices[0], "logprobs", None)
+            if logprobs is None or not logprobs.content:
+                raise RuntimeError(f"{self.model_name} did not return log-probabilities")
+            top = {}
+            for entry in logprobs.content[0].top_logprobs:
+                top[entry.token] = entry.logprob
+            probabilities = self.choice_probabilities(top, choices)
+
+            usage = getattr(response, "usage", None)
+            result = ChatResult(
+                max(probabilities, key=probabilities.get),
+                prompt_tokens=getattr(usage, "prompt_tokens", None),
+                completion_tokens=getattr(usage, "completion_tokens", None),
+                client_latency=client_latency,
+                rate_limit_wait=wait,
+                probabilities=probabilities,
             )
-            
-            return response.choices[0].message.content
-            
+            self.rate_limiter.settle(estimate, result.total_tokens)
+            return result
+
         except Exception as e:
-            raise RuntimeError(f"Error calling GPT API: {e}")
+            raise _api_error(e) from e
+
+    async def _stream_chat(self, request, stop_labels, start) -> ChatResult:
+        """Stream a completion, closing it early once a label is recognized."""
+        request = dict(request, stream=True, stream_options={"include_usage": True})
+        parser = LabelStreamParser(stop_labels or [])
+        usage = None
+        stopped_early = False
+        stream = await self.client.chat.completions.create(**request)
+        try:
+            async for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                if parser.feed(chunk.choices[0].delta.content or ""):
+                    stopped_early = True
+                    break
+        finally:
+            await stream.close()
+        return ChatResult(
+            parser.text,
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None),
+            client_latency=time.perf_counter() - start,
+            stopped_early=stopped_early,
+        )
     
     def supports_vision(self) -> bool:
         """Check if this model supports vision capabilities."""
         return "vision" in self.model_name.lower() or "gpt-4" in self.model_name.lower() or "gpt-5" in self.model_name.lower()
     
+
+
+# Largest top_logprobs the Chat Completions API accepts.
+_MAX_TOP_LOGPROBS = 20
+
+
+def _api_error(e: Exception) -> RuntimeError:
+    """Wrap an OpenAI SDK exception, marking retryable ones as transient."""
+    message = f"Error calling GPT API: {e}"
+    status = getattr(e, "status_code", None)
+    if isinstance(e, (openai.APITimeoutError, openai.APIConnectionError)) or (
+            status is not None and is_transient_status(status)):
+        headers = getattr(getattr(e, "response", None), "headers", None) or {}
+        return TransientModelError(message, status=status,
+                                   retry_after=parse_retry_after(headers.get("retry-after")))
+    return RuntimeError(message)
@@ -0,0 +1,160 @@
+import asyncio
+import itertools
+import time
+from collections import deque
+from typing import List, Optional, Sequence
+from .base_model import BaseModel, ChatResult
+from ..config import config
+
+
+class HedgedModel(BaseModel):
+    """
+    Cut tail latency by duplicating slow requests.
+
+    Once ``min_samples`` calls have completed, a call still running after
+    the ``quantile`` latency of recent calls (the p95 by default) is sent
+    again, to the next of ``replicas`` or, without replicas, to the wrapped
+    model itself (an ``OllamaModel`` with several servers routes the
+    duplicate to a less busy one). The first successful answer is returned
+    and the other request is cancelled. At most ``max_hedge_rate`` of all
+    calls are duplicated, so a backend that is slow across the board is not
+    sent twice the load. Wrap the model once and share the wrapper::
+
+        model = HedgedModel(OllamaModel("llava", base_url=[url_a, url_b]))
+        df = await label_radar_data(df, model)
+
+    Replies are returned as ``ChatResult`` with ``hedged`` set when a
+    duplicate was sent and ``hedge_saved`` when the duplicate won.
+    ``hedge_saved`` is an estimate, since the cancelled request's latency
+    is never seen: the mean of the recent latencies above the hedging
+    threshold, minus the time the winning answer took.
+
+    Parameters
+    ----------
+    model : BaseModel
+        The model whose calls are hedged.
+    replicas : sequence of BaseModel, optional
+        Models that duplicates are sent to, in turn. Defaults to ``model``.
+    quantile : float, optional
+        Latency quantile after which a call is hedged. Defaults to
+        ``config.HEDGE_QUANTILE``.
+    min_samples : int, optional
+        Completed calls needed before hedging starts. Defaults to
+        ``config.HEDGE_MIN_SAMPLES``.
+    max_hedge_rate : float, optional
+        Largest fraction of calls that may be hedged. Defaults to
+        ``config.HEDGE_MAX_RATE``.
+    window : int
+        Number of recent latencies the threshold is computed from.
+        Default 200.
+    """
+
+    def __init__(self, model: BaseModel, replicas: Optional[Sequence[BaseModel]] = None,
+                 quantile: Optional[float] = None, min_samples: Optional[int] = None,
+                 max_hedge_rate: Optional[float] = None, window: int = 200):
+        super().__init__(model.model_name, downscale_factor=model.downscale_factor,
+                         trust_images=model.trust_images)
+        self.model = model
+        self.replicas = list(replicas) if replicas else [model]
+        self.quantile = config.HEDGE_QUANTILE if quantile is None else quantile
+        if not 0 < self.quantile < 1:
+            raise ValueError("quantile must be between 0 and 1")
+        self.min_samples = config.HEDGE_MIN_SAMPLES if min_samples is None else min_samples
+        self.max_hedge_rate = (config.HEDGE_MAX_RATE if max_hedge_rate is None
+                               else max_hedge_rate)
+        self.latencies = deque(maxlen=window)
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.latency_saved = 0.0
+        self._next_replica = itertools.cycle(self.replicas)
+
+    def __getattr__(self, name):
+        # Only reached for attributes HedgedModel itself does not define.
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds after which a call is hedged, or None while still learning."""
+        if len(self.latencies) < max(1, self.min_samples):
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+
+    def _tail_mean(self, delay: float) -> float:
+        tail = [latency for latency in self.latencies if latency >= delay]
+        return sum(tail) / len(tail) if tail else delay
+
+    async def chat(self, prompt: str, images: Optional[List[str]] = None,
+                   choices: Optional[List[str]] = None,
+                   stop_labels: Optional[List[str]] = None) -> str:
+        """Call the wrapped model, duplicating the call if it runs long."""
+        kwargs = {}
+        if choices:
+            kwargs["choices"] = choices
+        if stop_labels:
+            kwargs["stop_labels"] = stop_labels
+        self.calls += 1
+        delay = self.hedge_delay()
+        start = time.perf_counter()
+        primary = asyncio.ensure_future(self.model.chat(prompt, images=images, **kwargs))
+        pending = {primary}
+        may_hedge = delay is not None and self.hedges < self.max_hedge_rate * self.calls
+        try:
+            if may_hedge:
+                await asyncio.wait(pending, timeout=delay)
+            if primary.done() or not may_hedge:
+                result = await primary
+                self.latencies.append(time.perf_counter() - start)
+                return result
+
+            self.hedges += 1
+            backup = asyncio.ensure_future(
+                next(self._next_replica).chat(prompt, images=images, **kwargs))
+            pending = {primary, backup}
+            winner, error = None, None
+            while winner is None and pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = winner or task
+                    else:
+                        error = task.exception()
+            if winner is None:
+                raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+        elapsed = time.perf_counter() - start
+        # When the duplicate wins, the original took at least this long.
+        self.latencies.append(elapsed)
+        result = winner.result()
+        if not isinstance(result, ChatResult):
+            result = ChatResult(result)
+        result.hedged = True
+        if winner is backup:
+            self.hedge_wins += 1
+            result.hedge_saved = max(0.0, self._tail_mean(delay) - elapsed)
+            self.latency_saved += result.hedge_saved
+        return result
+
+    async def score(self, prompt: str, images: Optional[List[str]] = None,
+                    choices: Optional[List[str]] = None) -> ChatResult:
+        """Score with the wrapped model; scoring calls are short and not hedged."""
+        return await self.model.score(prompt, images=images, choices=choices)
+
+    def stats(self) -> dict:
+        """Return call and hedge counters."""
+        return {
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_rate": self.hedges / self.calls if self.calls else 0.0,
+            "latency_saved_s": self.latency_saved,
+            "hedge_delay_s": self.hedge_delay(),
+        }
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}({self.model})"
@@ -1,70 +1,166 @@
 import asyncio
 import aiohttp
 import json
-from typing import List, Optional, Dict, Any
-from .base_model import BaseModel
+import time
+from typing import List, Optional, Dict, Any, Sequence, Union
+from .base_model import BaseModel, ChatResult, LabelStreamParser
 from ..config import config
+from ..endpoints import Endpoint, EndpointPool
+from ..retry import TransientModelError, is_transient_status, parse_retry_after
+from ..transport import HTTPTransport, get_transport
 
 class OllamaModel(BaseModel):
-    """Ollama model implementation for local models."""
+    """
+    Ollama model implementation for local models.
+
+    Whether the model is installed is checked once and then trusted for
+    ``ready_ttl`` seconds, rather than probed before every request; if it
+    is missing, exactly one pull is issued even when many ``chat`` calls
+    start at once. Call ``ensure_ready()`` before a run to also load the
+    model into memory so the first request does not pay the cold-load
+    latency.
+
+    With ``stream=True`` replies are streamed, and when ``chat`` is given
+    ``stop_labels`` the request is dropped as soon as a label is
+    recognized, which makes Ollama stop generating.
+
+    ``base_url`` may be a list of servers (or a comma-separated string).
+    Each request then goes to the least-loaded healthy server (see
+    ``EndpointPool``); a server that fails is ejected for a while, and the
+    request is retried once on each of the other servers before the error
+    is raised. Availability is tracked per server.
+    """
     
-    def __init__(self, model_name: str = None, base_url: str = None, num_ctx: int = None,
-                 downscale_factor: Optional[int] = None):
+    def __init__(self, model_name: str = None, base_url: Union[str, Sequence[str]] = None,
+                 num_ctx: int = None,
+                 downscale_factor: Optional[int] = None, transport: Optional[HTTPTransport] = None,
+                 keep_alive: Optional[str] = None, ready_ttl: Optional[float] = None,
+                 trust_images: Optional[bool] = None, stream: bool = False,
+                 pool: Optional[EndpointPool] = None):
         model_name = model_name or config.DEFAULT_OLLAMA_MODEL
-        super().__init__(model_name, downscale_factor=downscale_factor)
+        super().__init__(model_name, downscale_factor=downscale_factor, trust_images=trust_images)
 
-        self.base_url = base_url or config.OLLAMA_BASE_URL
+        if pool is None:
+            base_url = base_url or config.OLLAMA_BASE_URL
+            if isinstance(base_url, str):
+                base_url = [url.strip() for url in base_url.split(",") if url.strip()]
+            pool = EndpointPool(base_url)
+        self.pool = pool
+        self.base_urls = [endpoint.url for endpoint in self.pool.endpoints]
+        self.base_url = self.base_urls[0]
         self.num_ctx = num_ctx or config.OLLAMA_NUM_CTX
         self.api_url = f"{self.base_url}/api/generate"
         self.chat_url = f"{self.base_url}/api/chat"
+        self.transport = transport or get_transport()
+        self.stream = stream
+        self.keep_alive = keep_alive or config.OLLAMA_KEEP_ALIVE
+        self.ready_ttl = config.OLLAMA_READY_TTL if ready_ttl is None else ready_ttl
     
-    async def check_model_exists(self) -> bool:
+    async def check_model_exists(self, base_url: Optional[str] = None) -> bool:
         """Check if the model is available in Ollama."""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.base_url}/api/tags") as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        models = [model["name"] for model in data.get("models", [])]
-                        return self.model_name in models
-                    return False
+            return await self._model_listed(base_url or self.base_url)
         except Exception:
             return False
+
+    async def _model_listed(self, base_url: str) -> bool:
+        # Unlike check_model_exists, lets connection errors through so an
+        # unreachable server is not mistaken for one missing the model.
+        session = self.transport.session()
+        async with session.get(f"{base_url}/api/tags") as response:
+            if response.status == 200:
+                data = await response.json()
+                models = [model["name"] for model in data.get("models", [])]
+                return self.model_name in models
+            return False
     
-    async def pull_model(self) -> bool:
+    async def pull_model(self, base_url: Optional[str] = None) -> bool:
         """Pull the model if it doesn't exist."""
         try:
-            async with aiohttp.ClientSession() as session:
-                payload = {"name": self.model_name}
-                async with session.post(
-                    f"{self.base_url}/api/pull", 
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=300)  # 5 minutes timeout
-                ) as response:
-                    return response.status == 200
+            session = self.transport.session()
+            payload = {"name": self.model_name}
+            async with session.post(
+                f"{base_url or self.base_url}/api/pull", 
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=300)  # 5 minutes timeout
+            ) as response:
+                return response.status == 200
         except Exception as e:
             print(f"Error pulling model {self.model_name}: {e}")
             return False
     
-    async def chat(self, prompt: str, images: Optional[List[str]] = None) -> str:
+    def _available(self, endpoint: Endpoint) -> bool:
+        return (endpoint.available_at is not None
+                and time.monotonic() - endpoint.available_at < self.ready_ttl)
+
+    async def ensure_available(self, endpoint: Optional[Endpoint] = None):
+        """
+        Make sure the model is installed, pulling it if necessary.
+
+        The result is cached per server for ``ready_ttl`` seconds.
+        Concurrent callers wait on a lock, so only one of them checks
+        ``/api/tags`` or pulls. Without ``endpoint`` every server is
+        checked.
+        """
+        if endpoint is None:
+            await asyncio.gather(*(self.ensure_available(e) for e in self.pool.endpoints))
+            return
+        if self._available(endpoint):
+            return
+        async with endpoint.lock():
+            if self._available(endpoint):
+                return
+            if not await self._model_listed(endpoint.url):
+                print(f"Model {self.model_name} not found on {endpoint.url}. "
+                      "Attempting to pull...")
+                if not await self.pull_model(endpoint.url):
+                    raise RuntimeError(f"Failed to pull model {self.model_name}")
+            endpoint.available_at = time.monotonic()
+
+    async def ensure_ready(self) -> float:
+        """
+        Make sure the model is installed and loaded into memory.
+
+        Sends an empty generate request with ``keep_alive`` to every server
+        so Ollama loads the model and keeps it resident for subsequent
+        calls.
+
+        Returns
+        -------
+        float
+            Longest time a server spent loading the model (0 if it was
+            already loaded everywhere).
+        """
+        loads = await asyncio.gather(*(self._load(e) for e in self.pool.endpoints))
+        return max(loads)
+
+    async def _load(self, endpoint: Endpoint) -> float:
+        await self.ensure_available(endpoint)
+        session = self.transport.session()
+        payload = {"model": self.model_name, "keep_alive": self.keep_alive}
+        async with session.post(
+            f"{endpoint.url}/api/generate",
+            json=payload,
+            timeout=aiohttp.ClientTimeout(total=300)
+        ) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                raise RuntimeError(f"Failed to load model {self.model_name}: "
+                                   f"{response.status} - {error_text}")
+            data = await response.json()
+        return _seconds(data.get("load_duration")) or 0.0
+
+    async def chat(self, prompt: str, images: Optional[List[str]] = None,
+                   choices: Optional[List[str]] = None,
+                   stop_labels: Optional[List[str]] = None) -> str:
         """Generate a response using Ollama model."""
         try:
-            # Check if model exists, pull if not
-            if not await self.check_model_exists():
-                print(f"Model {self.model_name} not found. Attempting to pull...")
-                if not await self.pull_model():
-                    raise RuntimeError(f"Failed to pull model {self.model_name}")
-            
             # Prepare the request payload
             if images:
                 # For vision models, encode images as base64
                 images_data = []
-                for image_path in images:
-                    if not self.validate_image(image_path):
-                        raise ValueError(f"Invalid image: {image_path}")
-                    
-                    image_data = self.encode_image(image_path)
-                    images_data.append(image_data)
+                for image in images:
+                    images_data.append(self.prepare_image(image).data)
                 #if self.model_name == "llama4:scout":
                 #    payload = {
                 #        "model": self.model_name,
@@ -79,11 +175,12 @@ class OllamaModel(BaseModel):
                         "prompt": prompt,
                         "images": images_data,
                         "stream": False,
+                        "keep_alive": self.keep_alive,
                         "options": {"num_ctx": self.num_ctx}
                 }
 
                 # Use generate endpoint for vision models
-                url = self.api_url
+                path = "/api/generate"
             else:
                 # For text-only models, use chat endpoint
                 payload = {
@@ -92,39 +189,134 @@ class OllamaModel(BaseModel):
                         {"role": "user", "content": prompt}
                     ],
                     "stream": False,
+                    "keep_alive": self.keep_alive,
                     "options": {"num_ctx": self.num_ctx}
                 }
-                url = self.chat_url
-            
-            # Make the request
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    url,
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=config.REQUEST_TIMEOUT)
-                ) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        raise RuntimeError(f"Ollama API error: {response.status} - {error_text}")
-                    
-                    data = await response.json()
+                path = "/api/chat"
+
+            if choices:
+                payload["format"] = self.label_schema(choices)
+                payload["options"]["num_predict"] = self.choice_token_budget(choices)
+            payload["stream"] = self.stream
 
-                    if images:
-                        return data.get("response", "No response received")
-                    else:
-                        return data.get("message", {}).get("content", "No response received")
+            return await self._route(path, payload, bool(images), stop_labels)
                         
+        except TransientModelError as e:
+            raise TransientModelError(f"Error calling Ollama API: {e}",
+                                      retry_after=e.retry_after, status=e.status) from e
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            raise TransientModelError(f"Error calling Ollama API: {e!r}") from e
         except Exception as e:
             raise RuntimeError(f"Error calling Ollama API: {e}")
+
+    async def _route(self, path: str, payload: Dict[str, Any], generate: bool,
+                     stop_labels: Optional[List[str]]) -> ChatResult:
+        """
+        Send the request to the best server, failing over to the others.
+
+        A server is charged with a failure (and ejected) only for transient
+        errors; an error in the request itself is raised straight away.
+        """
+        tried = []
+        while True:
+            endpoint = self.pool.pick(exclude=tried)
+            tried.append(endpoint)
+            try:
+                await self.ensure_available(endpoint)
+                result = await self._post(endpoint, path, payload, generate, stop_labels)
+            except (TransientModelError, aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                self.pool.release(endpoint, failed=True)
+                if len(tried) == len(self.pool):
+                    raise
+                continue
+            except BaseException:
+                self.pool.release(endpoint)
+                raise
+            self.pool.release(endpoint, latency=result.client_latency)
+            return result
+
+    async def _post(self, endpoint: Endpoint, path: str, payload: Dict[str, Any],
+                    generate: bool, stop_labels: Optional[List[str]]) -> ChatResult:
+        start = time.perf_counter()
+        session = self.transport.session()
+        async with session.post(
+            f"{endpoint.url}{path}",
+            json=payload,
+            timeout=aiohttp.ClientTimeout(total=config.REQUEST_TIMEOUT)
+        ) as response:
+            if response.status != 200:
+                if response.status == 404:
+                    # The model was removed since it was last seen.
+                    endpoint.available_at = None
+                error_text = await response.text()
+                if is_transient_status(response.status):
+                    raise TransientModelError(
+                        f"Ollama API error: {response.status} - {error_text}",
+                        retry_after=parse_retry_after(response.headers.get("Retry-After")),
+                        status=response.status)
+                raise RuntimeError(f"Ollama API error: {response.status} - {error_text}")
+
+            if self.stream:
+                text, data, stopped_early = await self._read_stream(
+                    response, generate, stop_labels)
+            else:
+                data = await response.json()
+                stopped_early = False
+                if generate:
+                    text = data.get("response", "No response received")
+                else:
+                    text = data.get("message", {}).get("content", "No response received")
+
+        return ChatResult(
+            text,
+            prompt_tokens=data.get("prompt_eval_count"),
+            completion_tokens=data.get("eval_count"),
+            client_latency=time.perf_counter() - start,
+            server_latency=_seconds(data.get("total_duration")),
+            load_latency=_seconds(data.get("load_duration")),
+            prompt_eval_latency=_seconds(data.get("prompt_eval_duration")),
+            eval_latency=_seconds(data.get("eval_duration")),
+            stopped_early=stopped_early,
+        )
+
+    async def _read_stream(self, response, generate: bool, stop_labels: Optional[List[str]]):
+        """
+        Read a streamed reply line by line.
+
+        Returns the text, the final status object (empty if the stream was
+        cut short) and whether it was cut short because a label was found.
+        """
+        parser = LabelStreamParser(stop_labels or [])
+        data = {}
+        async for line in response.content:
+            if not line.strip():
+                continue
+            chunk = json.loads(line)
+            if generate:
+                piece = chunk.get("response", "")
+            else:
+                piece = chunk.get("message", {}).get("content", "")
+            if parser.feed(piece):
+                # Closing the connection makes Ollama abandon the generation.
+                response.close()
+                return parser.text, data, True
+            if chunk.get("done"):
+                data = chunk
+        return parser.text, data, False
     
-    async def list_available_models(self) -> List[str]:
+    async def list_available_models(self, base_url: Optional[str] = None) -> List[str]:
         """List all available models in Ollama."""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.base_url}/api/tags") as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return [model["name"] for model in data.get("models", [])]
-                    return []
+            session = self.transport.session()
+            async with session.get(f"{base_url or self.base_url}/api/tags") as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return [model["name"] for model in data.get("models", [])]
+                return []
         except Exception:
             return []
+
+
+def _seconds(nanoseconds):
+    """Convert an Ollama duration (integer nanoseconds) to seconds."""
+    return nanoseconds / 1e9 if nanoseconds is not None else None
@@ -0,0 +1,70 @@
+"""Create models from ``"<backend>:<model name>"`` strings.
+
+``get_model("ollama:llava")`` or ``get_model("gpt:gpt-4o")`` picks the
+backend class by prefix. Backends are registered as import paths, so a
+backend's module, and the SDK it wraps, is only imported when a model
+from it is first created.
+"""
+import importlib
+from typing import Callable, Dict, List, Union
+
+from .base_model import BaseModel
+
+_BACKENDS: Dict[str, Union[str, Callable[..., BaseModel]]] = {
+    "ollama": "lars.nepho.models.ollama_model:OllamaModel",
+    "gpt": "lars.nepho.models.gpt_model:GPTModel",
+    "openai": "lars.nepho.models.gpt_model:GPTModel",
+    "asksage": "lars.nepho.models.ask_sage_model:AskSageModel",
+}
+
+
+def register_model(backend: str, factory: Union[str, Callable[..., BaseModel]]):
+    """
+    Register a backend for ``get_model``.
+
+    Parameters
+    ----------
+    backend : str
+        Prefix used in model specs, e.g. ``"vllm"`` for ``"vllm:llava"``.
+    factory : str or callable
+        Callable taking ``model_name`` and keyword arguments, or its
+        import path as ``"package.module:attribute"`` to defer the import.
+    """
+    _BACKENDS[backend.lower()] = factory
+
+
+def available_backends() -> List[str]:
+    """Return the registered backend prefixes."""
+    return sorted(_BACKENDS)
+
+
+def _factory(backend: str) -> Callable[..., BaseModel]:
+    factory = _BACKENDS.get(backend.lower())
+    if factory is None:
+        raise ValueError(f"Unknown model backend {backend!r}; "
+                         f"available: {', '.join(available_backends())}")
+    if isinstance(factory, str):
+        module, _, attribute = factory.partition(":")
+        factory = getattr(importlib.import_module(module), attribute)
+        _BACKENDS[backend.lower()] = factory
+    return factory
+
+
+def get_model(spec: str, **kwargs) -> BaseModel:
+    """
+    Create a model from a ``"<backend>:<model name>"`` spec.
+
+    Everything after the first colon is the model name, so Ollama tags
+    work as usual (``"ollama:llama3.2-vision:11b"``). Keyword arguments
+    are passed to the backend class, e.g. ``api_key`` or ``base_url``.
+
+    Raises
+    ------
+    ValueError
+        If the spec is malformed or the backend is not registered.
+    """
+    backend, sep, model_name = spec.partition(":")
+    if not sep or not backend or not model_name:
+        raise ValueError(f"Model spec must look like '<backend>:<model name>', "
+                         f"e.g. 'ollama:llava'; got {spec!r}")
+    return _factory(backend)(model_name=model_name, **kwargs)
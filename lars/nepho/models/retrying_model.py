@@ -0,0 +1,93 @@
+from typing import List, Optional
+from .base_model import BaseModel, ChatResult
+from ..retry import CircuitBreaker, RetryPolicy, TransientModelError
+
+
+class RetryingModel(BaseModel):
+    """
+    Retry transient failures of any other model.
+
+    Calls that fail with ``TransientModelError`` (rate limits, 5xx
+    responses, timeouts) are retried according to ``policy``, and a
+    ``CircuitBreaker`` pauses every request to the wrapped model while it
+    keeps failing. Other errors are raised immediately. Wrap the model once
+    and share the wrapper, so all concurrent calls see the same breaker::
+
+        model = RetryingModel(GPTModel("gpt-4o"))
+        df = await label_radar_data(df, model)
+
+    Parameters
+    ----------
+    model : BaseModel
+        The model whose calls are retried.
+    policy : RetryPolicy, optional
+        Backoff settings. Defaults to ``RetryPolicy()``.
+    breaker : CircuitBreaker, optional
+        Defaults to a new ``CircuitBreaker()`` for this model.
+    """
+
+    def __init__(self, model: BaseModel, policy: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        super().__init__(model.model_name, downscale_factor=model.downscale_factor,
+                         trust_images=model.trust_images)
+        self.model = model
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+
+    def __getattr__(self, name):
+        # Only reached for attributes RetryingModel itself does not define.
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    async def chat(self, prompt: str, images: Optional[List[str]] = None,
+                   choices: Optional[List[str]] = None,
+                   stop_labels: Optional[List[str]] = None) -> str:
+        """Call the wrapped model, retrying transient errors."""
+        kwargs = {}
+        if choices:
+            kwargs["choices"] = choices
+        if stop_labels:
+            kwargs["stop_labels"] = stop_labels
+        self.calls += 1
+        try:
+            response, retries = await self.policy.call(
+                lambda: self.model.chat(prompt, images=images, **kwargs),
+                breaker=self.breaker)
+        except TransientModelError:
+            self.failures += 1
+            self.retries += self.policy.max_attempts - 1
+            raise
+        self.retries += retries
+        return response
+
+    async def score(self, prompt: str, images: Optional[List[str]] = None,
+                    choices: Optional[List[str]] = None) -> ChatResult:
+        """Score with the wrapped model, retrying transient errors."""
+        self.calls += 1
+        try:
+            result, retries = await self.policy.call(
+                lambda: self.model.score(prompt, images=images, choices=choices),
+                breaker=self.breaker)
+        except TransientModelError:
+            self.failures += 1
+            self.retries += self.policy.max_attempts - 1
+            raise
+        self.retries += retries
+        return result
+
+    def stats(self) -> dict:
+        """Return call, retry and circuit-breaker counters."""
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "circuit_opened": self.breaker.opened,
+            "circuit_state": self.breaker.state,
+        }
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}({self.model})"
@@ -0,0 +1,167 @@
+"""Process-wide request and token rate limits for model backends.
+
+Several labelling runs in one process that share an OpenAI or Ask Sage
+account also share its requests-per-minute (RPM) and tokens-per-minute
+(TPM) quotas. Each backend/API-key pair gets one ``RateLimiter`` from
+``get_rate_limiter``, and every model using that key draws from the same
+token buckets. Requests are paced evenly rather than sent in bursts that
+end in a storm of 429 responses.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from typing import Optional
+
+from .config import config
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at ``rate_per_minute``.
+
+    ``reserve`` always succeeds immediately but may leave the bucket in
+    debt; the caller then waits until the debt would have been refilled.
+    Because each reservation sees the debt left by earlier ones, concurrent
+    callers are spaced out evenly instead of all waking at once, and a
+    single request larger than the bucket still gets through.
+
+    Parameters
+    ----------
+    rate_per_minute : float
+        Refill rate.
+    capacity : float, optional
+        Largest burst allowed after an idle period. Defaults to one
+        second's worth of refill (at least 1), which keeps dispatch smooth.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be positive")
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take ``amount`` tokens and return the seconds to wait before using them."""
+        self._refill()
+        self.tokens -= amount
+        return max(0.0, -self.tokens / self.rate)
+
+    def refund(self, amount: float):
+        """Return tokens that were reserved but not used (negative to charge more)."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limits for one account.
+
+    Call ``acquire`` with an estimate of the tokens a request will use
+    before sending it, then ``settle`` with the estimate and the actual
+    count once the backend reports usage.
+
+    Parameters
+    ----------
+    rpm : float, optional
+        Requests per minute; None for no request limit.
+    tpm : float, optional
+        Tokens per minute; None for no token limit.
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = TokenBucket(rpm) if rpm else None
+        self._tokens = TokenBucket(tpm) if tpm else None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.waits = 0
+        self.wait_time = 0.0
+
+    async def acquire(self, tokens: int = 0) -> float:
+        """
+        Wait until a request using about ``tokens`` tokens may be sent.
+
+        Returns
+        -------
+        float
+            Seconds spent waiting.
+        """
+        with self._lock:
+            wait = 0.0
+            if self._requests is not None:
+                wait = max(wait, self._requests.reserve(1))
+            if self._tokens is not None and tokens:
+                wait = max(wait, self._tokens.reserve(tokens))
+            self.requests += 1
+            if wait > 0:
+                self.waits += 1
+                self.wait_time += wait
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def settle(self, estimated: int, actual: Optional[int]):
+        """Correct the token bucket once the real token count is known."""
+        if self._tokens is None or actual is None:
+            return
+        with self._lock:
+            self._tokens.refund(estimated - actual)
+
+    def stats(self) -> dict:
+        """Return request and wait counters."""
+        return {
+            "requests": self.requests,
+            "waits": self.waits,
+            "wait_time_s": self.wait_time,
+        }
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(rpm={self.rpm}, tpm={self.tpm})"
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _key(backend: str, api_key: Optional[str]) -> tuple:
+    # Keep only a digest of the API key in memory.
+    digest = hashlib.sha256(api_key.encode("utf-8")).hexdigest() if api_key else None
+    return backend.lower(), digest
+
+
+def get_rate_limiter(backend: str, api_key: Optional[str] = None) -> RateLimiter:
+    """
+    Return the process-wide rate limiter for ``backend`` and ``api_key``.
+
+    Limits are read from ``config.<BACKEND>_RPM`` and ``config.<BACKEND>_TPM``
+    (e.g. ``OPENAI_RPM``) the first time a pair is seen; unset limits are
+    unlimited.
+    """
+    key = _key(backend, api_key)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            prefix = backend.upper()
+            limiter = RateLimiter(rpm=getattr(config, f"{prefix}_RPM", None),
+                                  tpm=getattr(config, f"{prefix}_TPM", None))
+            _limiters[key] = limiter
+        return limiter
+
+
+def set_rate_limiter(backend: str, api_key: Optional[str], limiter: Optional[RateLimiter]):
+    """Install (or with None, forget) the limiter for ``backend`` and ``api_key``."""
+    key = _key(backend, api_key)
+    with _limiters_lock:
+        if limiter is None:
+            _limiters.pop(key, None)
+        else:
+            _limiters[key] = limiter
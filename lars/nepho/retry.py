@@ -0,0 +1,187 @@
+"""Retries with backoff and a circuit breaker for model backends.
+
+Backends raise ``TransientModelError`` for failures that are worth
+retrying: rate limits (HTTP 429), server errors (5xx), timeouts and
+dropped connections. ``RetryPolicy`` retries those with exponential
+backoff and jitter, honouring any ``Retry-After`` the server sent, and a
+``CircuitBreaker`` stops every caller from hammering a backend that keeps
+failing. ``RetryingModel`` wraps any model with both.
+"""
+import asyncio
+import email.utils
+import random
+import time
+from typing import Optional
+
+from .config import config
+
+
+class TransientModelError(RuntimeError):
+    """
+    A backend failure that may succeed if the request is repeated.
+
+    Parameters
+    ----------
+    message : str
+        Error message.
+    retry_after : float, optional
+        Seconds the server asked the client to wait, if it said.
+    status : int, optional
+        HTTP status code, if there was one.
+    """
+
+    def __init__(self, message, retry_after: Optional[float] = None,
+                 status: Optional[int] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status = status
+
+
+def is_transient_status(status: int) -> bool:
+    """True for HTTP statuses worth retrying (408, 429 and 5xx)."""
+    return status in (408, 429) or status >= 500
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """Parse a ``Retry-After`` header (seconds or an HTTP date) into seconds."""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class CircuitBreaker:
+    """
+    Pause requests to a backend after repeated transient failures.
+
+    After ``failure_threshold`` consecutive transient failures the breaker
+    opens and ``wait`` blocks every caller for ``reset_timeout`` seconds.
+    Then a single trial request is let through (half-open): if it succeeds
+    the breaker closes, if it fails the breaker opens again.
+
+    Parameters
+    ----------
+    failure_threshold : int, optional
+        Defaults to ``config.CIRCUIT_FAILURE_THRESHOLD``.
+    reset_timeout : float, optional
+        Defaults to ``config.CIRCUIT_RESET_TIMEOUT``.
+    """
+
+    def __init__(self, failure_threshold: Optional[int] = None,
+                 reset_timeout: Optional[float] = None):
+        self.failure_threshold = failure_threshold or config.CIRCUIT_FAILURE_THRESHOLD
+        self.reset_timeout = config.CIRCUIT_RESET_TIMEOUT if reset_timeout is None else reset_timeout
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._trial or time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    async def wait(self):
+        """Wait until a request may be sent."""
+        while self._opened_at is not None:
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining <= 0 and not self._trial:
+                self._trial = True
+                return
+            # Either still open, or another caller's trial is in flight.
+            await asyncio.sleep(max(remaining, min(self.reset_timeout, 1.0), 0.01))
+
+    def record_success(self):
+        self.failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial or self.failures >= self.failure_threshold:
+            if self._opened_at is None or self._trial:
+                self.opened += 1
+            self._opened_at = time.monotonic()
+            self._trial = False
+
+    def release(self):
+        """Give up a trial slot without a verdict (e.g. a non-transient error)."""
+        self._trial = False
+
+
+class RetryPolicy:
+    """
+    Retry ``TransientModelError`` with capped exponential backoff.
+
+    The wait before attempt ``n + 1`` is drawn uniformly from
+    ``[0, min(max_delay, base_delay * 2 ** (n - 1))]`` ("full jitter"), or
+    is the server's ``Retry-After`` when it gave one. Any other exception
+    is raised straight away.
+
+    Parameters
+    ----------
+    max_attempts : int, optional
+        Total attempts including the first. Defaults to
+        ``config.RETRY_MAX_ATTEMPTS``.
+    base_delay, max_delay : float, optional
+        Backoff parameters in seconds. Default to ``config.RETRY_BASE_DELAY``
+        and ``config.RETRY_MAX_DELAY``.
+    jitter : bool
+        Randomize the backoff. Default True.
+    """
+
+    def __init__(self, max_attempts: Optional[int] = None,
+                 base_delay: Optional[float] = None,
+                 max_delay: Optional[float] = None, jitter: bool = True):
+        self.max_attempts = max_attempts or config.RETRY_MAX_ATTEMPTS
+        if self.max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.base_delay = config.RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = config.RETRY_MAX_DELAY if max_delay is None else max_delay
+        self.jitter = jitter
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait after failed attempt number ``attempt`` (1-based)."""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, delay) if self.jitter else delay
+
+    async def call(self, fn, breaker: Optional[CircuitBreaker] = None):
+        """
+        Await ``fn()`` until it succeeds, retrying transient errors.
+
+        Returns
+        -------
+        tuple
+            ``(result, retries)``.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            if breaker is not None:
+                await breaker.wait()
+            try:
+                result = await fn()
+            except TransientModelError as e:
+                if breaker is not None:
+                    breaker.record_failure()
+                if attempt == self.max_attempts:
+                    raise
+                await asyncio.sleep(self.delay(attempt, e.retry_after))
+                continue
+            except BaseException:
+                if breaker is not None:
+                    breaker.release()
+                raise
+            if breaker is not None:
+                breaker.record_success()
+            return result, attempt - 1
@@ -216,7 +216,7 @@ def _log_confusion_matrix(mlflow, df, tmpdir, hand_col, llm_col):
 
 
 def log_run_to_mlflow(radar_df, *, experiment, run_name=None,
-                      tracking_uri=None, params=None,
+                      tracking_uri=None, params=None, metrics=None,
                       criteria=None, color_criteria=None,
                       codebook_path=None, model_output_dir=None,
                       hand_label_col="label", llm_label_col="llm_label"):
@@ -244,6 +244,9 @@ def log_run_to_mlflow(radar_df, *, experiment, run_name=None,
     params : dict, optional
         Extra params merged with the standard ``n_rows`` /
         ``codebook_hash`` set.
+    metrics : dict, optional
+        Extra numeric metrics (e.g. token usage and latency totals) logged
+        alongside the validation metrics.
     criteria, color_criteria : dict, optional
         Passed to ``compute_validation_metrics``.
     codebook_path : str, optional
@@ -273,15 +276,17 @@ def log_run_to_mlflow(radar_df, *, experiment, run_name=None,
             k: str(v)[:500] for k, v in all_params.items() if v is not None
         })
 
-        metrics = compute_validation_metrics(
+        validation_metrics = compute_validation_metrics(
             radar_df,
             criteria=criteria,
             color_criteria=color_criteria,
             hand_label_col=hand_label_col,
             llm_label_col=llm_label_col,
         )
+        all_metrics = dict(metrics or {})
+        all_metrics.update(validation_metrics)
         numeric_metrics = {
-            k: float(v) for k, v in metrics.items()
+            k: float(v) for k, v in all_metrics.items()
             if isinstance(v, (int, float))
         }
         if numeric_metrics:
@@ -0,0 +1,165 @@
+"""Shared, pooled HTTP transport for model backends.
+
+Opening a new ``aiohttp.ClientSession`` (or ``AsyncOpenAI`` client) per
+request costs a TCP connection and, for HTTPS, a TLS handshake for every
+image. ``HTTPTransport`` keeps one long-lived connection pool per event
+loop and hands it to every backend, so concurrent labelling runs reuse
+keep-alive connections instead.
+"""
+import asyncio
+from typing import Optional
+
+import aiohttp
+
+from .config import config
+
+
+class HTTPTransport:
+    """
+    Long-lived pooled HTTP connections shared by model backends.
+
+    The transport lazily creates an ``aiohttp.ClientSession`` for
+    aiohttp-based backends (Ollama) and an ``httpx.AsyncClient`` for the
+    OpenAI SDK, both configured with the same connection limits. It can be
+    used as an async context manager to close the pools when a run ends::
+
+        async with HTTPTransport(limit_per_host=16) as transport:
+            model = OllamaModel("llava", transport=transport)
+            await label_radar_data(df, model)
+
+    Backends that are not given a transport use the process-wide one from
+    ``get_transport()``.
+
+    Parameters
+    ----------
+    limit : int, optional
+        Maximum number of open connections in total. Defaults to
+        ``config.HTTP_MAX_CONNECTIONS``.
+    limit_per_host : int, optional
+        Maximum number of open connections to a single host. Defaults to
+        ``config.HTTP_MAX_CONNECTIONS_PER_HOST``.
+    keepalive_timeout : float, optional
+        Seconds an idle connection is kept open for reuse. Defaults to
+        ``config.HTTP_KEEPALIVE_TIMEOUT``.
+    """
+
+    def __init__(self, limit: Optional[int] = None, limit_per_host: Optional[int] = None,
+                 keepalive_timeout: Optional[float] = None):
+        self.limit = limit or config.HTTP_MAX_CONNECTIONS
+        self.limit_per_host = limit_per_host or config.HTTP_MAX_CONNECTIONS_PER_HOST
+        self.keepalive_timeout = keepalive_timeout or config.HTTP_KEEPALIVE_TIMEOUT
+        self._session = None
+        self._session_loop = None
+        self._httpx_client = None
+        self._httpx_loop = None
+        self._closing = set()
+
+    def session(self) -> aiohttp.ClientSession:
+        """
+        Return the pooled ``aiohttp.ClientSession`` for the running event loop.
+
+        A session is bound to the loop it was created on, so a new one is
+        created if the loop has changed (e.g. across ``asyncio.run`` calls)
+        or the previous session was closed. A session left over from an
+        earlier loop is closed.
+        """
+        loop = asyncio.get_running_loop()
+        session = self._session
+        if session is None or session.closed or self._session_loop is not loop:
+            if session is not None and not session.closed:
+                self._discard(session.close, self._session_loop)
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._session_loop = loop
+        return self._session
+
+    def openai_http_client(self):
+        """
+        Return the pooled ``httpx.AsyncClient`` for the running event loop.
+
+        Like ``session``, the client is bound to the loop it was created on,
+        so a new one is created if the loop has changed or the previous
+        client was closed. A client left over from an earlier loop is closed.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._httpx_client
+        if client is None or client.is_closed or self._httpx_loop is not loop:
+            if client is not None and not client.is_closed:
+                self._discard(client.aclose, self._httpx_loop)
+            import httpx
+
+            self._httpx_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.limit,
+                    max_keepalive_connections=self.limit_per_host,
+                    keepalive_expiry=self.keepalive_timeout,
+                ),
+                timeout=httpx.Timeout(config.REQUEST_TIMEOUT),
+            )
+            self._httpx_loop = loop
+        return self._httpx_client
+
+    def _discard(self, close, loop):
+        """Close a session or client created on another event loop."""
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(close(), loop)
+            return
+        task = asyncio.get_running_loop().create_task(_close_quietly(close))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def close(self):
+        """Close any open connection pools."""
+        if self._session is not None and not self._session.closed:
+            if self._session_loop is asyncio.get_running_loop():
+                await self._session.close()
+            else:
+                self._discard(self._session.close, self._session_loop)
+        self._session = None
+        self._session_loop = None
+        if self._httpx_client is not None and not self._httpx_client.is_closed:
+            if self._httpx_loop is asyncio.get_running_loop():
+                await self._httpx_client.aclose()
+            else:
+                self._discard(self._httpx_client.aclose, self._httpx_loop)
+        self._httpx_client = None
+        self._httpx_loop = None
+        if self._closing:
+            await asyncio.gather(*self._closing)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+async def _close_quietly(close):
+    # The connections of a client whose loop has already closed cannot be
+    # shut down cleanly; closing still marks the client closed and drops them
+    # from the pool.
+    try:
+        await close()
+    except RuntimeError:
+        pass
+
+
+_default_transport = None
+
+
+def get_transport() -> HTTPTransport:
+    """Return the process-wide transport, creating it on first use."""
+    global _default_transport
+    if _default_transport is None:
+        _default_transport = HTTPTransport()
+    return _default_transport
+
+
+def set_transport(transport: Optional[HTTPTransport]):
+    """Replace the process-wide transport (None restores the default)."""
+    global _default_transport
+    _default_transport = transport
@@ -1,2 +1,9 @@
-from .radar_preprocessing import preprocess_radar_data # noqa: F401
-from .labels import load_labels, save_labels, change_file_path, copy_labels, apply_criteria_to_labels, combine_labels, standardize_labels # noqa: F401
\ No newline at end of file
+from .._lazy import attach
+
+__getattr__, __dir__, __all__ = attach(__name__, {
+    "preprocess_radar_data": ".radar_preprocessing",
+    **dict.fromkeys(["load_labels", "save_labels", "change_file_path", "copy_labels",
+                     "apply_criteria_to_labels", "reclassify_label", "triage_labels",
+                     "combine_labels", "standardize_labels"], ".labels"),
+    **dict.fromkeys(["image_dhash", "hamming_distance", "find_near_duplicates"], ".image_hash"),
+})
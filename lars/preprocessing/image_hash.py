@@ -0,0 +1,123 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+
+def _data_area(img):
+    """Crop ``img`` to the bounding box of its non-white, non-transparent pixels."""
+    rgba = np.asarray(img.convert("RGBA"), dtype=np.int16)
+    plotted = (rgba[..., 3] > 0) & (rgba[..., :3].min(axis=2) < 245)
+    rows = np.flatnonzero(plotted.any(axis=1))
+    cols = np.flatnonzero(plotted.any(axis=0))
+    if len(rows) == 0:
+        return img
+    return img.crop((cols[0], rows[0], cols[-1] + 1, rows[-1] + 1))
+
+
+def image_dhash(image_path, hash_size=16, crop=True):
+    """
+    Compute the difference hash (dHash) of an image.
+
+    The image is cropped to its data area, converted to grayscale and
+    shrunk to ``(hash_size + 1) x hash_size`` pixels; each bit of the hash
+    records whether a pixel is brighter than its right-hand neighbour.
+    Images that look alike, such as consecutive clear-air PPI scans,
+    produce hashes that differ in only a few bits. Cropping away the white
+    margin around the plot keeps the layout, which every scan shares, from
+    dominating the hash.
+
+    Parameters
+    ----------
+    image_path (str): Path to the image file.
+    hash_size (int): Number of rows (and columns of comparisons) in the
+        hash. The hash has ``hash_size ** 2`` bits. Default 16.
+    crop (bool): Hash only the bounding box of the non-white,
+        non-transparent pixels. Default True.
+
+    Returns
+    -------
+    int
+        The hash as a ``hash_size ** 2``-bit integer.
+    """
+    with Image.open(image_path) as img:
+        if crop:
+            img = _data_area(img)
+        small = img.convert("L").resize((hash_size + 1, hash_size),
+                                        Image.BILINEAR)
+        pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+def hamming_distance(hash_a, hash_b):
+    """Return the number of differing bits between two integer hashes."""
+    return bin(hash_a ^ hash_b).count("1")
+
+
+def find_near_duplicates(file_paths, times, max_distance=12, window="30min",
+                         hash_size=16, stats=None, stats_rtol=0.1, stats_atol=0.01):
+    """
+    Find images that are near-duplicates of an earlier image in the sequence.
+
+    Images are visited in the order given, which should be time order. Each
+    image is compared with the earlier *representative* images whose time
+    lies within ``window`` of its own; if the closest one is within
+    ``max_distance`` bits, and its ``stats`` (if given) match, it is marked
+    as a duplicate of that representative, otherwise it becomes a
+    representative itself. Comparing against representatives rather than
+    the immediately preceding image stops a slowly evolving scene from
+    drifting through a chain of duplicates.
+
+    The default ``max_distance`` is set against the scans in ``examples/``:
+    the four categories there are 68 or more bits apart, while adding
+    speckle to 2% of the gates of one scan moves its hash by at most 6.
+
+    Parameters
+    ----------
+    file_paths (sequence of str): Image paths in time order.
+    times (sequence): Time of each image; anything ``pd.to_datetime``
+        accepts.
+    max_distance (int): Largest Hamming distance between dHashes that
+        still counts as a duplicate. Default 12 (of 256 bits).
+    window (str or pd.Timedelta): Maximum time separation between a
+        duplicate and its representative. Default ``"30min"``.
+    hash_size (int): Passed to ``image_dhash``.
+    stats (array-like, optional): Per-image statistics, one row per image,
+        e.g. the ``pct_gates_*`` columns. An image only duplicates a
+        representative whose statistics all match within ``stats_rtol`` /
+        ``stats_atol``; NaN never matches.
+    stats_rtol (float): Relative tolerance for ``stats``. Default 0.1.
+    stats_atol (float): Absolute tolerance for ``stats``. Default 0.01.
+
+    Returns
+    -------
+    np.ndarray
+        Integer array with, for each position, the position of the
+        representative it duplicates, or -1 for representatives.
+    """
+    window = pd.Timedelta(window)
+    times = pd.to_datetime(pd.Series(times)).to_numpy()
+    if stats is not None:
+        stats = np.asarray(stats, dtype=float).reshape(len(file_paths), -1)
+    duplicate_of = np.full(len(file_paths), -1, dtype=int)
+    recent = deque()
+    for pos, path in enumerate(file_paths):
+        h = image_dhash(path, hash_size=hash_size)
+        while recent and times[pos] - times[recent[0][0]] > window:
+            recent.popleft()
+        best = None
+        for rep_pos, rep_hash in recent:
+            distance = hamming_distance(h, rep_hash)
+            if distance > max_distance or (best is not None and distance >= best[1]):
+                continue
+            if stats is not None and not np.allclose(stats[pos], stats[rep_pos],
+                                                     rtol=stats_rtol, atol=stats_atol):
+                continue
+            best = (rep_pos, distance)
+        if best is not None:
+            duplicate_of[pos] = best[0]
+        else:
+            recent.append((pos, h))
+    return duplicate_of
@@ -1,6 +1,8 @@
 import pandas as pd
 import os
 
+from ..nepho.config import config
+
 # Maps non-canonical label spellings (matched case- and whitespace-
 # insensitively) to their canonical codebook form.
 STANDARD_LABEL_MAP = {
@@ -191,6 +193,204 @@ def apply_criteria_to_labels(df, criteria, label_column='label',
     return df
 
 
+def reclassify_label(label, values, criteria):
+    """
+    Apply hard codebook criteria to a single label.
+
+    This is the per-row counterpart of ``apply_criteria_to_labels`` and
+    follows the same rules: the criteria are visited in order, the first
+    violated rule for the current label reassigns it to the rule's
+    ``reclassify_as`` target, and the new label is then checked against any
+    later entries in ``criteria``.
+
+    Parameters
+    ----------
+    label : str
+        Label to check.
+    values : mapping
+        Mapping of field name → value for the row, e.g. ``{"pct_gates_50dbz":
+        0.1}`` or a row of a DataFrame. Rules whose field is missing or NaN
+        are skipped.
+    criteria : dict
+        Mapping of label → list of criterion dicts as returned by
+        ``lars.nepho.inference.criteria_from_codebook``.
+
+    Returns
+    -------
+    tuple
+        ``(label, original, note)`` where ``original`` is the label before
+        the first override and ``note`` describes the last rule that fired.
+        Both are None when no rule fired.
+    """
+    original = None
+    note = None
+    for rule_label, rules in criteria.items():
+        if label != rule_label:
+            continue
+        for rule in rules:
+            field = rule["field"]
+            if field not in values:
+                continue
+            value = values[field]
+            if pd.isna(value) or not value > rule["max_value"]:
+                continue
+            new_label = rule["reclassify_as"] or rule_label
+            unit = "percent" if rule["kind"] == "pct" else "gates"
+            note = (f"{rule_label}: {field} > {rule['max_value']} {unit}"
+                    f" -> {new_label}")
+            if original is None:
+                original = rule_label
+            label = new_label
+            break
+    return label, original, note
+
+
+def _label_key(label):
+    """Normalized spelling of a label, for matching it against categories."""
+    return label.strip().rstrip(".").lower()
+
+
+def triage_labels(df, criteria=None, color_criteria=None, labels=None,
+                  categories=None, clear_air_label="No Precipitation",
+                  clear_air_max_pct=None, use_color_criteria=False):
+    """
+    Assign labels that the gate statistics alone decide unambiguously.
+
+    Triage is conservative: a row is only decided on positive evidence and
+    everything else is left for the model. Two kinds of evidence count:
+
+    * Clear air. A row whose ``pct_gates_10dbz`` is at most
+      ``clear_air_max_pct`` and that satisfies every reflectivity criterion
+      of ``clear_air_label`` is assigned ``clear_air_label``.
+    * Exclusion. A row is assigned label ``L`` when all of ``L``'s rules are
+      satisfied and every other category has a rule that the row definitely
+      violates. A category without rules (e.g. an "Ambiguous" catch-all or
+      a category the thresholds say nothing about) cannot be ruled out, so
+      when ``categories`` contains one, exclusion never decides a row.
+
+    Label names in ``criteria``, ``labels`` and ``clear_air_label`` are
+    matched to ``categories`` ignoring case and a trailing period (so "No
+    Precipitation" matches "No precipitation"), and the decided labels are
+    spelled as in ``categories``.
+
+    Rules whose column is missing or NaN can neither confirm nor rule out a
+    label, so such rows are left undecided. Reflectivity criteria require
+    ``field <= max_value``. Color heuristics are rough guides for checking
+    labels, not hard evidence, so ``color_criteria`` is only used when
+    ``use_color_criteria`` is set; color rules of kind ``"max_pct_above"``
+    then require ``field <= value`` and ``"min_pct_above"`` require
+    ``field >= value``.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Must contain the ``pct_gates_*`` / ``n_gates_*`` columns referenced
+        by the rules, e.g. as produced by ``preprocess_radar_data``.
+    criteria : dict, optional
+        Reflectivity criteria as returned by
+        ``lars.nepho.inference.criteria_from_codebook``.
+    color_criteria : dict, optional
+        Color criteria as returned by
+        ``lars.nepho.inference.color_criteria_from_codebook``. Ignored unless
+        ``use_color_criteria`` is True.
+    labels : list of str, optional
+        Restrict triage to these labels (e.g. ``["No Precipitation"]``).
+        Defaults to every label.
+    categories : list of str, optional
+        Every category a row could belong to. Defaults to the labels that
+        have rules, plus ``clear_air_label``.
+    clear_air_label : str or None
+        Label assigned to clear-air rows. Default "No Precipitation"; None
+        turns the clear-air check off.
+    clear_air_max_pct : float, optional
+        Largest ``pct_gates_10dbz`` of a clear-air row. Defaults to
+        ``config.TRIAGE_CLEAR_AIR_MAX_PCT``.
+    use_color_criteria : bool
+        Also use ``color_criteria`` as rules. Default False.
+
+    Returns
+    -------
+    pd.Series
+        Object series indexed like ``df`` holding the decided label, or NA
+        for rows that need a closer look.
+    """
+    if clear_air_max_pct is None:
+        clear_air_max_pct = config.TRIAGE_CLEAR_AIR_MAX_PCT
+    canonical = {_label_key(c): c for c in categories} if categories is not None else {}
+
+    def resolve(label):
+        return canonical.get(_label_key(label), label)
+
+    rules_by_label = {}
+    for label, rules in (criteria or {}).items():
+        for rule in rules:
+            rules_by_label.setdefault(resolve(label), []).append(
+                (rule["field"], "max", rule["max_value"]))
+    if use_color_criteria:
+        for label, rules in (color_criteria or {}).items():
+            for rule in rules:
+                if rule["kind"] == "max_pct_above":
+                    op = "max"
+                elif rule["kind"] == "min_pct_above":
+                    op = "min"
+                else:
+                    continue
+                rules_by_label.setdefault(resolve(label), []).append(
+                    (rule["field"], op, rule["value"]))
+    if clear_air_label is not None:
+        clear_air_label = resolve(clear_air_label)
+    if categories is None:
+        categories = list(rules_by_label)
+        if clear_air_label is not None and clear_air_label not in categories:
+            categories.append(clear_air_label)
+    categories = list(categories)
+
+    satisfied = {}
+    violated = {}
+    for label, rules in rules_by_label.items():
+        ok = pd.Series(True, index=df.index)
+        bad = pd.Series(False, index=df.index)
+        for field, op, value in rules:
+            if field not in df.columns:
+                ok &= False
+                continue
+            col = pd.to_numeric(df[field], errors="coerce")
+            known = col.notna()
+            passed = col <= value if op == "max" else col >= value
+            ok &= known & passed
+            bad |= known & ~passed
+        satisfied[label] = ok
+        violated[label] = bad
+
+    decided = pd.Series(pd.NA, index=df.index, dtype=object)
+    allowed = [resolve(label) for label in labels] if labels is not None else categories
+    for label in allowed:
+        if label not in rules_by_label or label not in categories:
+            continue
+        mask = satisfied[label]
+        for other in categories:
+            if other == label:
+                continue
+            if other not in rules_by_label:
+                # Nothing rules this category out.
+                mask = mask & False
+                break
+            mask = mask & violated[other]
+        decided[mask] = label
+
+    if (clear_air_label is not None and clear_air_label in allowed
+            and clear_air_label in categories and "pct_gates_10dbz" in df.columns):
+        pct = pd.to_numeric(df["pct_gates_10dbz"], errors="coerce")
+        mask = pct.notna() & (pct <= clear_air_max_pct) & decided.isna()
+        for field, op, value in rules_by_label.get(clear_air_label, []):
+            if op != "max" or field not in df.columns:
+                continue
+            col = pd.to_numeric(df[field], errors="coerce")
+            mask &= col.notna() & (col <= value)
+        decided[mask] = clear_air_label
+    return decided
+
+
 def combine_labels(csv_files, source_names, label_column='label', match_on='file_path'):
     """
     Combine labels from multiple CSV files (human or AI) into one long-format
@@ -1,7 +1,14 @@
-from .confusion_matrix import plot_confusion_matrix, calculate_cohen_kappa # noqa: F401
-from .image_grid import plot_label_images # noqa: F401
-from .label_timeseries import plot_label_timeseries # noqa: F401
-from .kappa_matrix import plot_kappa_matrix, calculate_kappa_matrix # noqa: F401
-from .label_rate_matrix import plot_label_rate_diff_matrix, calculate_label_rate_diff_matrix # noqa: F401
-from .label_disagreement_matrix import plot_label_disagreement_matrix, calculate_label_disagreement_matrix # noqa: F401
-from .dawid_skene import fit_dawid_skene, score_against_consensus, plot_dawid_skene_confusion # noqa: F401
+from .._lazy import attach
+
+__getattr__, __dir__, __all__ = attach(__name__, {
+    **dict.fromkeys(["plot_confusion_matrix", "calculate_cohen_kappa"], ".confusion_matrix"),
+    "plot_label_images": ".image_grid",
+    "plot_label_timeseries": ".label_timeseries",
+    **dict.fromkeys(["plot_kappa_matrix", "calculate_kappa_matrix"], ".kappa_matrix"),
+    **dict.fromkeys(["plot_label_rate_diff_matrix", "calculate_label_rate_diff_matrix"],
+                    ".label_rate_matrix"),
+    **dict.fromkeys(["plot_label_disagreement_matrix", "calculate_label_disagreement_matrix"],
+                    ".label_disagreement_matrix"),
+    **dict.fromkeys(["fit_dawid_skene", "score_against_consensus", "plot_dawid_skene_confusion"],
+                    ".dawid_skene"),
+})
@@ -11,7 +11,8 @@ def _log_sum_exp(log_values, axis):
     return (max_val + np.log(summed)).squeeze(axis)
 
 
-def fit_dawid_skene(df, columns=None, max_iter=100, tol=1e-4, smoothing=0.1):
+def fit_dawid_skene(df, columns=None, max_iter=100, tol=1e-4, smoothing=0.1,
+                    soft_columns=None):
     """
     Fit a Dawid-Skene model to estimate a consensus label per item and a
     confusion matrix per rater, without requiring any rater's labels to be
@@ -36,6 +37,14 @@ def fit_dawid_skene(df, columns=None, max_iter=100, tol=1e-4, smoothing=0.1):
         item posterior between iterations.
     smoothing (float): Additive (Laplace) smoothing applied to each rater's
         confusion matrix during the M-step, to avoid zero probabilities.
+    soft_columns (dict or None): Raters that give a probability per class
+        instead of a single label, as ``{rater: {class: column}}`` -- e.g.
+        ``{"gpt": probability_columns(categories)}`` for the
+        ``llm_prob_*`` columns written by ``label_radar_data(...,
+        score=True)``. Each item's probabilities are renormalized to sum to
+        1 and count as fractional votes; rows where they are all missing
+        are treated as unlabelled. These columns are excluded from the
+        default ``columns``.
 
     Returns
     -------
@@ -46,45 +55,53 @@ def fit_dawid_skene(df, columns=None, max_iter=100, tol=1e-4, smoothing=0.1):
         item_entropy (pd.Series): Shannon entropy (bits) of each item's
             posterior -- the per-item uncertainty estimate.
         confusion_matrices (dict[str, pd.DataFrame]): Per-rater confusion
-            matrix, indexed by true class and labeled by observed class.
-            Each row sums to 1.
+            matrix (including ``soft_columns`` raters), indexed by true
+            class and labeled by observed class. Each row sums to 1.
         class_prior (pd.Series): Estimated prevalence of each true class.
         columns (list of str): Columns used to fit the model.
         n_iter (int): Number of EM iterations actually run.
         log_likelihood (list of float): Observed-data log-likelihood at each
             iteration (should increase monotonically).
     """
+    soft_columns = soft_columns or {}
     if columns is None:
-        columns = list(df.columns)
+        soft = {column for spec in soft_columns.values() for column in spec.values()}
+        columns = [column for column in df.columns if column not in soft]
 
     labels = df[columns].apply(lambda s: s.astype(str).str.lower())
     labels = labels.where(df[columns].notna())
 
-    classes = sorted(set(labels.values.flatten()) - {None, np.nan})
-    classes = [c for c in classes if isinstance(c, str)]
+    classes = set(labels.values.flatten()) - {None, np.nan}
+    classes |= {str(c).lower() for spec in soft_columns.values() for c in spec}
+    classes = sorted(c for c in classes if isinstance(c, str))
     n_classes = len(classes)
     class_index = {c: k for k, c in enumerate(classes)}
 
     n_items = len(df)
-    n_raters = len(columns)
+    raters = list(columns) + list(soft_columns)
+    n_raters = len(raters)
 
-    observed = np.full((n_items, n_raters), -1, dtype=int)
+    # observed[j, i] is rater j's distribution over classes for item i:
+    # one-hot for a label, the normalized probabilities for a soft rater,
+    # all zero when the rater did not label the item.
+    observed = np.zeros((n_raters, n_items, n_classes))
     for j, col in enumerate(columns):
         for i, value in enumerate(labels[col].values):
             if isinstance(value, str):
-                observed[i, j] = class_index[value]
+                observed[j, i, class_index[value]] = 1.0
+    for j, spec in enumerate(soft_columns.values(), start=len(columns)):
+        for label, column in spec.items():
+            observed[j, :, class_index[str(label).lower()]] = (
+                df[column].fillna(0.0).to_numpy(dtype=float))
+        totals = observed[j].sum(axis=1, keepdims=True)
+        observed[j] = np.divide(observed[j], totals, out=np.zeros_like(observed[j]),
+                                where=totals > 0)
 
-    has_any_label = (observed >= 0).any(axis=1)
+    has_any_label = (observed.sum(axis=2) > 0).any(axis=0)
 
     q = np.full((n_items, n_classes), 1.0 / n_classes)
-    for i in range(n_items):
-        if not has_any_label[i]:
-            continue
-        votes = np.zeros(n_classes)
-        for j in range(n_raters):
-            if observed[i, j] >= 0:
-                votes[observed[i, j]] += 1
-        q[i] = votes / votes.sum()
+    votes = observed.sum(axis=0)
+    q[has_any_label] = votes[has_any_label] / votes[has_any_label].sum(axis=1, keepdims=True)
 
     log_likelihood_history = []
     n_iter = 0
@@ -94,23 +111,15 @@ def fit_dawid_skene(df, columns=None, max_iter=100, tol=1e-4, smoothing=0.1):
         class_prior = q[has_any_label].mean(axis=0)
         confusion = np.zeros((n_raters, n_classes, n_classes))
         for j in range(n_raters):
-            mask = observed[:, j] >= 0
-            numer = np.full((n_classes, n_classes), smoothing)
-            denom = np.full(n_classes, smoothing * n_classes)
-            for k in range(n_classes):
-                weight = q[mask, k]
-                denom[k] += weight.sum()
-                for l in range(n_classes):
-                    numer[k, l] += weight[observed[mask, j] == l].sum()
-            confusion[j] = numer / denom[:, None]
+            numer = smoothing + q.T @ observed[j]
+            confusion[j] = numer / numer.sum(axis=1, keepdims=True)
 
         # E-step
         log_confusion = np.log(confusion)
         log_prior = np.log(class_prior)
         log_q_unnorm = np.tile(log_prior, (n_items, 1))
         for j in range(n_raters):
-            mask = observed[:, j] >= 0
-            log_q_unnorm[mask] += log_confusion[j, :, observed[mask, j]]
+            log_q_unnorm += observed[j] @ log_confusion[j].T
 
         log_norm = _log_sum_exp(log_q_unnorm, axis=1)
         log_likelihood_history.append(log_norm[has_any_label].sum())
@@ -139,7 +148,7 @@ def fit_dawid_skene(df, columns=None, max_iter=100, tol=1e-4, smoothing=0.1):
 
     confusion_matrices = {
         col: pd.DataFrame(confusion[j], index=classes, columns=classes)
-        for j, col in enumerate(columns)
+        for j, col in enumerate(raters)
     }
 
     return {
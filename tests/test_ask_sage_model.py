@@ -0,0 +1,101 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+
+class _BlockingClient:
+    """Stand-in for AskSageClient that records which thread served each call."""
+
+    def __init__(self, *args, **kwargs):
+        self.threads = []
+        self.files = []
+
+    def query(self, message, model):
+        self.threads.append(threading.current_thread().name)
+        return {"message": "Clear Air"}
+
+    def query_with_file(self, message, file, model):
+        self.threads.append(threading.current_thread().name)
+        self.files.append(file)
+        with Image.open(file) as img:
+            return {"message": f"{img.size[0]}x{img.size[1]}"}
+
+    def get_models(self):
+        self.threads.append(threading.current_thread().name)
+        return ["gpt-4o"]
+
+
+@pytest.fixture
+def credentials(tmp_path):
+    path = tmp_path / "credentials.json"
+    path.write_text(json.dumps({"credentials": {
+        "api_key": "key", "Ask_sage_user_info": {"username": "user@example.com"}}}))
+    return str(path)
+
+
+@pytest.mark.asyncio
+async def test_calls_run_on_dedicated_executor(credentials, tmp_path):
+    from lars.nepho.models.ask_sage_model import AskSageModel
+
+    image_path = tmp_path / "scan.png"
+    Image.new("RGB", (40, 20)).save(image_path)
+    with patch("lars.nepho.models.ask_sage_model.AskSageClient", _BlockingClient):
+        model = AskSageModel("gpt-4o", credentials, downscale_factor=2)
+
+    assert await model.chat("Hello") == "Clear Air"
+    assert await model.chat("Classify", images=[str(image_path)]) == "20x10"
+    assert await model.list_available_models() == ["gpt-4o"]
+    assert all(name.startswith("asksage") for name in model.client.threads)
+
+
+@pytest.mark.asyncio
+async def test_custom_executor_runs_requests_concurrently(credentials):
+    from lars.nepho.models.ask_sage_model import AskSageModel
+
+    barrier = threading.Barrier(8, timeout=5)
+
+    class _SlowClient(_BlockingClient):
+        def query(self, message, model):
+            barrier.wait()
+            return super().query(message, model)
+
+    executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="custom")
+    with patch("lars.nepho.models.ask_sage_model.AskSageClient", _SlowClient):
+        model = AskSageModel("gpt-4o", credentials, executor=executor)
+    try:
+        replies = await asyncio.gather(*(model.chat("Hello") for _ in range(8)))
+    finally:
+        executor.shutdown()
+
+    assert replies == ["Clear Air"] * 8
+    assert all(name.startswith("custom") for name in model.client.threads)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status, transient", [(429, True), (503, True), (400, False)])
+async def test_http_errors_are_transient_only_when_retryable(credentials, status, transient):
+    import requests
+    from lars.nepho.models.ask_sage_model import AskSageModel
+    from lars.nepho.retry import TransientModelError
+
+    class _FailingClient(_BlockingClient):
+        def query(self, message, model):
+            response = requests.Response()
+            response.status_code = status
+            response.headers["Retry-After"] = "7"
+            raise requests.HTTPError(f"{status} error", response=response)
+
+    with patch("lars.nepho.models.ask_sage_model.AskSageClient", _FailingClient):
+        model = AskSageModel("gpt-4o", credentials)
+
+    with pytest.raises(RuntimeError, match="Error calling Ask Sage API") as excinfo:
+        await model.chat("Hello")
+    assert isinstance(excinfo.value, TransientModelError) == transient
+    if transient:
+        assert excinfo.value.status == status
+        assert excinfo.value.retry_after == 7.0
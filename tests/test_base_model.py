@@ -43,3 +43,202 @@ def test_encode_image_downscales_by_integer_factor(tmp_path):
 
     decoded_image = Image.open(io.BytesIO(base64.b64decode(encoded)))
     assert decoded_image.size == (10, 5)
+
+
+def test_downscale_does_not_touch_disk(tmp_path, monkeypatch):
+    import tempfile
+
+    image_path = tmp_path / "test.png"
+    _make_test_image(image_path, size=(40, 20))
+
+    def _no_temp_files(*args, **kwargs):
+        raise AssertionError("temporary file created")
+
+    monkeypatch.setattr(tempfile, "NamedTemporaryFile", _no_temp_files)
+    model = GPTModel(model_name="gpt-4", api_key="test-key", downscale_factor=2)
+    encoded = model.encode_image(str(image_path))
+
+    assert Image.open(io.BytesIO(base64.b64decode(encoded))).size == (20, 10)
+
+
+def test_encoded_payloads_are_shared_between_models(tmp_path, monkeypatch):
+    from lars.nepho.models.base_model import PayloadCache
+
+    monkeypatch.setattr(GPTModel, "payload_cache", PayloadCache(max_size_mb=1))
+    image_path = str(tmp_path / "test.png")
+    _make_test_image(image_path)
+
+    first = GPTModel(model_name="gpt-4", api_key="test-key", downscale_factor=2)
+    second = GPTModel(model_name="gpt-4o", api_key="test-key", downscale_factor=2)
+    assert first.encode_image(image_path) == second.encode_image(image_path)
+    assert GPTModel.payload_cache.stats()["hits"] == 1
+
+    # A different factor is a different payload.
+    GPTModel(model_name="gpt-4", api_key="test-key").encode_image(image_path)
+    assert len(GPTModel.payload_cache) == 2
+
+
+def test_payload_cache_invalidated_when_file_changes(tmp_path, monkeypatch):
+    import os
+    from lars.nepho.models.base_model import PayloadCache
+
+    monkeypatch.setattr(GPTModel, "payload_cache", PayloadCache(max_size_mb=1))
+    image_path = tmp_path / "test.png"
+    _make_test_image(image_path, size=(40, 20))
+    model = GPTModel(model_name="gpt-4", api_key="test-key")
+    before = model.encode_image(str(image_path))
+
+    _make_test_image(image_path, size=(80, 20))
+    os.utime(image_path, ns=(0, os.stat(image_path).st_mtime_ns + 10**9))
+    after = model.encode_image(str(image_path))
+
+    assert after != before
+    assert base64.b64decode(after) == image_path.read_bytes()
+
+
+def test_payload_cache_evicts_least_recently_used():
+    from lars.nepho.models.base_model import PayloadCache
+
+    cache = PayloadCache(max_size_mb=10 / (1024 * 1024))
+    cache.put("a", "xxxx")
+    cache.put("b", "yyyy")
+    assert cache.get("a") == "xxxx"
+    cache.put("c", "zzzz")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "xxxx"
+    assert cache.get("c") == "zzzz"
+    assert cache.stats()["size_bytes"] == 8
+
+
+def test_prepare_image_reads_file_once(tmp_path, monkeypatch):
+    import builtins
+    from lars.nepho.models.base_model import PayloadCache
+
+    monkeypatch.setattr(GPTModel, "payload_cache", PayloadCache(max_size_mb=1))
+    image_path = str(tmp_path / "test.png")
+    _make_test_image(image_path, size=(40, 20))
+
+    opened = []
+    real_open = builtins.open
+
+    def _counting_open(file, *args, **kwargs):
+        opened.append(str(file))
+        return real_open(file, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "open", _counting_open)
+    model = GPTModel(model_name="gpt-4", api_key="test-key", downscale_factor=2)
+    prepared = model.prepare_image(image_path)
+
+    assert opened.count(image_path) == 1
+    assert Image.open(io.BytesIO(base64.b64decode(prepared.data))).size == (20, 10)
+
+
+def test_prepare_image_rejects_corrupt_file(tmp_path):
+    image_path = tmp_path / "corrupt.png"
+    image_path.write_bytes(b"not really a png")
+    model = GPTModel(model_name="gpt-4", api_key="test-key")
+
+    with pytest.raises(ValueError, match="Invalid image"):
+        model.prepare_image(str(image_path))
+    assert not model.validate_image(str(image_path))
+
+
+def test_trusted_mode_skips_decoding(tmp_path):
+    image_path = tmp_path / "trusted.png"
+    image_path.write_bytes(b"not really a png")
+    model = GPTModel(model_name="gpt-4", api_key="test-key", trust_images=True)
+
+    prepared = model.prepare_image(str(image_path))
+
+    assert base64.b64decode(prepared.data) == b"not really a png"
+
+
+def test_trusted_payloads_are_not_reused_by_validating_models(tmp_path, monkeypatch):
+    from lars.nepho.models.base_model import PayloadCache
+
+    monkeypatch.setattr(GPTModel, "payload_cache", PayloadCache(max_size_mb=1))
+    image_path = tmp_path / "trusted.png"
+    image_path.write_bytes(b"not really a png")
+    trusting = GPTModel(model_name="gpt-4", api_key="test-key", trust_images=True)
+    checking = GPTModel(model_name="gpt-4", api_key="test-key", trust_images=False)
+
+    prepared = trusting.prepare_image(str(image_path))
+
+    with pytest.raises(ValueError, match="Invalid image"):
+        checking.encode_image(str(image_path))
+    with pytest.raises(ValueError, match="Invalid image"):
+        checking.prepare_image(prepared)
+
+
+def test_validated_payloads_are_reused_by_trusting_models(tmp_path, monkeypatch):
+    from lars.nepho.models.base_model import PayloadCache
+
+    monkeypatch.setattr(GPTModel, "payload_cache", PayloadCache(max_size_mb=1))
+    image_path = tmp_path / "scan.png"
+    _make_test_image(image_path)
+    GPTModel(model_name="gpt-4", api_key="test-key").encode_image(str(image_path))
+
+    GPTModel(model_name="gpt-4", api_key="test-key",
+             trust_images=True).encode_image(str(image_path))
+
+    assert GPTModel.payload_cache.stats()["hits"] == 1
+    assert len(GPTModel.payload_cache) == 1
+
+
+@pytest.mark.parametrize("chunks, text", [
+    (["Radar shows light echoes.\nStrat", "iform Precipitation.\n", "Because..."],
+     "Radar shows light echoes.\nStratiform Precipitation."),
+    (['{"label": "No Precip', 'itation"}'], '{"label": "No Precipitation"}'),
+])
+def test_label_stream_parser_stops_on_label(chunks, text):
+    from lars.nepho.inference import _parse_label
+    from lars.nepho.models.base_model import LabelStreamParser
+
+    categories = ["No Precipitation", "Stratiform Precipitation"]
+    parser = LabelStreamParser(categories)
+    for chunk in chunks:
+        if parser.feed(chunk):
+            break
+
+    assert parser.label_found
+    assert parser.text == text
+    assert _parse_label(parser.text, categories) == _parse_label(text, categories)
+
+
+def test_label_stream_parser_ignores_mentions():
+    from lars.nepho.models.base_model import LabelStreamParser
+
+    parser = LabelStreamParser(["No Precipitation", "Stratiform Precipitation"])
+    assert not parser.feed("This is not No Precipitation but could be\n")
+    assert not parser.feed("Stratiform Precipitation")
+    assert parser.text == ("This is not No Precipitation but could be\n"
+                           "Stratiform Precipitation")
+
+
+def test_choice_probabilities_and_key_limits():
+    import math
+
+    from lars.nepho.models.base_model import BaseModel
+
+    probabilities = BaseModel.choice_probabilities(
+        {"A": math.log(0.5), "a.": math.log(0.25), "C": math.log(0.25), "Z": 0.0},
+        ["Clear Air", "Stratiform", "Convection"])
+    assert probabilities == pytest.approx({"Clear Air": 0.75, "Stratiform": 0.0,
+                                           "Convection": 0.25})
+    with pytest.raises(ValueError, match="top log-probabilities"):
+        BaseModel.choice_probabilities({"Hello": 0.0}, ["Clear Air"])
+    with pytest.raises(ValueError, match="26"):
+        BaseModel.score_keys(27)
+
+
+@pytest.mark.asyncio
+async def test_score_unsupported_by_default():
+    from lars.nepho.models.base_model import BaseModel
+
+    class _Plain(BaseModel):
+        async def chat(self, prompt, images=None):
+            return "Clear Air"
+
+    with pytest.raises(NotImplementedError, match="_Plain"):
+        await _Plain("plain").score("Classify", choices=["Clear Air"])
@@ -0,0 +1,235 @@
+import json
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from PIL import Image
+
+
+CATEGORIES = {
+    "No Precipitation": "No echoes.",
+    "Stratiform Precipitation": "Widespread echoes.",
+    "Isolated Convection": "Isolated cells.",
+}
+
+
+class _FakeBatchAPI:
+    """Stand-in for the OpenAI Files and Batches APIs.
+
+    Jobs complete after ``polls_to_finish`` status checks; each request is
+    answered by ``answer(body)``, which may return an error dict instead of
+    a reply.
+    """
+
+    def __init__(self, answer, polls_to_finish=2):
+        self.answer = answer
+        self.polls_to_finish = polls_to_finish
+        self.uploaded = {}
+        self.jobs = {}
+        self.outputs = {}
+        self.created = 0
+        self.files = SimpleNamespace(create=self._create_file, content=self._content)
+        self.batches = SimpleNamespace(create=self._create_batch, retrieve=self._retrieve)
+
+    async def _create_file(self, file, purpose):
+        assert purpose == "batch"
+        file_id = f"file-{len(self.uploaded)}"
+        self.uploaded[file_id] = [json.loads(line) for line in file.read().decode().splitlines()]
+        return SimpleNamespace(id=file_id)
+
+    async def _create_batch(self, input_file_id, endpoint, completion_window):
+        self.created += 1
+        batch_id = f"batch-{self.created}"
+        self.jobs[batch_id] = {"input": input_file_id, "polls": 0}
+        return self._batch(batch_id, "validating")
+
+    def _batch(self, batch_id, status, output_file_id=None):
+        return SimpleNamespace(id=batch_id, status=status,
+                               input_file_id=self.jobs[batch_id]["input"],
+                               output_file_id=output_file_id, error_file_id=None)
+
+    async def _retrieve(self, batch_id):
+        job = self.jobs[batch_id]
+        job["polls"] += 1
+        if job["polls"] < self.polls_to_finish:
+            return self._batch(batch_id, "in_progress")
+        lines = []
+        for request in reversed(self.uploaded[job["input"]]):
+            reply = self.answer(request["body"])
+            if isinstance(reply, dict):
+                lines.append({"custom_id": request["custom_id"], "response": None,
+                              "error": reply})
+                continue
+            lines.append({"custom_id": request["custom_id"], "error": None, "response": {
+                "status_code": 200,
+                "body": {"choices": [{"message": {"content": reply}}],
+                         "usage": {"prompt_tokens": 100, "completion_tokens": 3}},
+            }})
+        output_id = f"output-{batch_id}"
+        self.outputs[output_id] = "\n".join(json.dumps(line) for line in lines)
+        return self._batch(batch_id, "completed", output_file_id=output_id)
+
+    async def _content(self, file_id):
+        return SimpleNamespace(text=self.outputs[file_id])
+
+
+def _model(api, **kwargs):
+    from lars.nepho.models.gpt_model import GPTModel
+
+    model = GPTModel(model_name="gpt-4o", api_key="test-key", **kwargs)
+    model.client = api
+    return model
+
+
+def _radar_df(tmp_path, n):
+    paths = []
+    for i in range(n):
+        path = tmp_path / f"scan_{i}.png"
+        Image.new("RGB", (8, 8), color=(i * 40, 0, 0)).save(path)
+        paths.append(str(path))
+    return pd.DataFrame({
+        "file_path": paths,
+        "time": [f"2025-05-27 00:{i:02d}:00" for i in range(n)],
+        "label": ["UNKNOWN"] * n,
+    })
+
+
+def _answer_by_time(body):
+    prompt = body["messages"][0]["content"][0]["text"]
+    return "Isolated Convection" if "00:01:00" in prompt else "No Precipitation"
+
+
+def test_write_batch_requests(tmp_path):
+    from lars.nepho.batch import write_batch_requests
+
+    df = _radar_df(tmp_path, 2)
+    path = tmp_path / "requests.jsonl"
+    n = write_batch_requests(df, _model(None), str(path), categories=CATEGORIES,
+                             constrained_output=True)
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert n == 2
+    assert [line["custom_id"] for line in lines] == ["row-0", "row-1"]
+    assert lines[0]["url"] == "/v1/chat/completions"
+    assert lines[0]["body"]["model"] == "gpt-4o"
+    assert lines[0]["body"]["response_format"]["type"] == "json_schema"
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_batch_maps_results_by_custom_id(tmp_path):
+    from lars.nepho.batch import label_radar_data_batch
+
+    api = _FakeBatchAPI(_answer_by_time)
+    out = await label_radar_data_batch(_radar_df(tmp_path, 3), _model(api),
+                                       categories=CATEGORIES, poll_interval=0)
+
+    assert list(out["llm_label"]) == ["No Precipitation", "Isolated Convection",
+                                      "No Precipitation"]
+    assert list(out["llm_completion_tokens"]) == [3, 3, 3]
+    assert (out["llm_label_source"] == "batch").all()
+    assert out["llm_error"].isna().all()
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_batch_resumes_submitted_job(tmp_path):
+    from lars.nepho.batch import label_radar_data_batch
+
+    df = _radar_df(tmp_path, 2)
+    state_path = str(tmp_path / "state" / "backfill.json")
+    api = _FakeBatchAPI(_answer_by_time, polls_to_finish=3)
+
+    with pytest.raises(TimeoutError):
+        await label_radar_data_batch(df.copy(), _model(api), categories=CATEGORIES,
+                                     state_path=state_path, poll_interval=0,
+                                     timeout=0)
+    with open(state_path) as f:
+        assert [job["batch_id"] for job in json.load(f)["jobs"]] == ["batch-1"]
+
+    out = await label_radar_data_batch(df.copy(), _model(api), categories=CATEGORIES,
+                                       state_path=state_path, poll_interval=0)
+
+    assert api.created == 1
+    assert list(out["llm_label"]) == ["No Precipitation", "Isolated Convection"]
+    with open(state_path) as f:
+        assert json.load(f)["jobs"][0]["status"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_batch_records_failed_requests(tmp_path):
+    from lars.nepho.batch import label_radar_data_batch
+
+    def _answer(body):
+        if "00:01:00" in body["messages"][0]["content"][0]["text"]:
+            return {"code": "invalid_image", "message": "bad image"}
+        return "No Precipitation"
+
+    out = await label_radar_data_batch(_radar_df(tmp_path, 2), _model(_FakeBatchAPI(_answer)),
+                                       categories=CATEGORIES, poll_interval=0)
+
+    assert list(out["llm_label"]) == ["No Precipitation", "Unknown"]
+    assert out["llm_error"][1] == "bad image"
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_batch_splits_jobs_under_limits(tmp_path):
+    from lars.nepho.batch import label_radar_data_batch
+
+    df = _radar_df(tmp_path, 5)
+    state_path = str(tmp_path / "backfill.json")
+    api = _FakeBatchAPI(_answer_by_time)
+
+    out = await label_radar_data_batch(df, _model(api), categories=CATEGORIES,
+                                       state_path=state_path, poll_interval=0,
+                                       max_requests=2)
+
+    assert api.created == 3
+    assert [len(lines) for lines in api.uploaded.values()] == [2, 2, 1]
+    assert list(out["llm_label"]) == ["No Precipitation", "Isolated Convection",
+                                      "No Precipitation", "No Precipitation",
+                                      "No Precipitation"]
+    with open(state_path) as f:
+        jobs = json.load(f)["jobs"]
+    assert [(job["start"], job["stop"]) for job in jobs] == [(0, 2), (2, 4), (4, 5)]
+    assert [job["batch_id"] for job in jobs] == ["batch-1", "batch-2", "batch-3"]
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_batch_splits_by_file_size(tmp_path):
+    from lars.nepho.batch import label_radar_data_batch, write_batch_requests
+
+    df = _radar_df(tmp_path, 3)
+    path = tmp_path / "requests.jsonl"
+    write_batch_requests(df, _model(None), str(path), categories=CATEGORIES)
+    line_bytes = max(len(line) + 1 for line in path.read_bytes().splitlines())
+    api = _FakeBatchAPI(_answer_by_time)
+
+    out = await label_radar_data_batch(df, _model(api), categories=CATEGORIES,
+                                       poll_interval=0, max_bytes=line_bytes + 1)
+
+    assert api.created == 3
+    assert list(out["llm_label"]) == ["No Precipitation", "Isolated Convection",
+                                      "No Precipitation"]
+    with pytest.raises(ValueError, match="batch file limit"):
+        await label_radar_data_batch(df, _model(api), categories=CATEGORIES,
+                                     poll_interval=0, max_bytes=10)
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_batch_resumes_partly_submitted_run(tmp_path):
+    from lars.nepho.batch import label_radar_data_batch
+
+    df = _radar_df(tmp_path, 3)
+    state_path = str(tmp_path / "backfill.json")
+    with open(state_path, "w") as f:
+        json.dump({"n_rows": 3, "jobs": [
+            {"batch_id": None, "input_file_id": None, "start": 0, "stop": 2, "status": None},
+            {"batch_id": None, "input_file_id": None, "start": 2, "stop": 3, "status": None},
+        ]}, f)
+    api = _FakeBatchAPI(_answer_by_time)
+
+    out = await label_radar_data_batch(df, _model(api), categories=CATEGORIES,
+                                       state_path=state_path, poll_interval=0)
+
+    assert [len(lines) for lines in api.uploaded.values()] == [2, 1]
+    assert list(out["llm_label"]) == ["No Precipitation", "Isolated Convection",
+                                      "No Precipitation"]
@@ -0,0 +1,117 @@
+import pytest
+from PIL import Image
+
+from lars.nepho.models.base_model import BaseModel
+from lars.nepho.models.cached_model import CachedModel
+
+
+class _CountingModel(BaseModel):
+    def __init__(self, model_name="counting"):
+        super().__init__(model_name)
+        self.calls = 0
+
+    async def chat(self, prompt, images=None):
+        self.calls += 1
+        return f"response {self.calls}"
+
+
+def _make_image(path, color="red"):
+    Image.new("RGB", (8, 8), color=color).save(path, format="PNG")
+    return str(path)
+
+
+@pytest.mark.asyncio
+async def test_repeated_request_is_served_from_cache(tmp_path):
+    image = _make_image(tmp_path / "a.png")
+    inner = _CountingModel()
+    model = CachedModel(inner, cache_dir=str(tmp_path / "cache"))
+
+    first = await model.chat("classify", images=[image])
+    second = await model.chat("classify", images=[image])
+
+    assert first == second == "response 1"
+    assert inner.calls == 1
+    assert model.stats()["hits"] == 1
+    assert model.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_persists_across_instances(tmp_path):
+    image = _make_image(tmp_path / "a.png")
+    cache_dir = str(tmp_path / "cache")
+    await CachedModel(_CountingModel(), cache_dir=cache_dir).chat("p", images=[image])
+
+    inner = _CountingModel()
+    result = await CachedModel(inner, cache_dir=cache_dir).chat("p", images=[image])
+
+    assert result == "response 1"
+    assert inner.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_key_depends_on_prompt_image_content_and_model(tmp_path):
+    image = _make_image(tmp_path / "a.png")
+    cache_dir = str(tmp_path / "cache")
+    inner = _CountingModel()
+    model = CachedModel(inner, cache_dir=cache_dir)
+
+    await model.chat("p", images=[image])
+    await model.chat("other prompt", images=[image])
+    _make_image(tmp_path / "a.png", color="blue")
+    await model.chat("p", images=[image])
+    other = _CountingModel(model_name="other-model")
+    await CachedModel(other, cache_dir=cache_dir).chat("p", images=[image])
+
+    assert inner.calls == 3
+    assert other.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_entries_are_evicted(tmp_path):
+    model = CachedModel(_CountingModel(), cache_dir=str(tmp_path / "cache"),
+                        max_size_mb=25 / (1024 * 1024))
+
+    await model.chat("a")
+    await model.chat("b")
+    await model.chat("a")
+    await model.chat("c")
+
+    assert model.stats()["entries"] == 2
+    assert model.model.calls == 3
+    await model.chat("a")
+    assert model.model.calls == 3
+    await model.chat("b")
+    assert model.model.calls == 4
+
+
+def test_unknown_attributes_delegate_to_wrapped_model(tmp_path):
+    from lars.nepho.models.gpt_model import GPTModel
+
+    model = CachedModel(GPTModel(model_name="gpt-4o", api_key="test-key"),
+                        cache_dir=str(tmp_path))
+    assert model.supports_vision()
+    assert model.model_name == "gpt-4o"
+
+
+@pytest.mark.asyncio
+async def test_scores_are_cached(tmp_path):
+    from lars.nepho.models.base_model import ChatResult
+
+    class _ScoringModel(_CountingModel):
+        async def score(self, prompt, images=None, choices=None):
+            self.calls += 1
+            return ChatResult("Clear Air", probabilities={"Clear Air": 0.9, "Stratiform": 0.1})
+
+    image = _make_image(tmp_path / "a.png")
+    inner = _ScoringModel()
+    model = CachedModel(inner, cache_dir=str(tmp_path / "cache"))
+
+    await model.score("classify", images=[image], choices=["Clear Air", "Stratiform"])
+    cached = await model.score("classify", images=[image], choices=["Clear Air", "Stratiform"])
+    chatted = await model.chat("classify", images=[image])
+
+    assert cached == "Clear Air"
+    assert cached.cached
+    assert cached.probabilities == {"Clear Air": 0.9, "Stratiform": 0.1}
+    assert chatted == "response 2"
+    assert inner.calls == 2
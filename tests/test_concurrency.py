@@ -0,0 +1,142 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from lars.nepho.concurrency import AdaptiveConcurrency
+from lars.nepho.models.base_model import BaseModel
+from lars.nepho.retry import TransientModelError
+
+
+def test_limit_grows_additively_while_healthy():
+    controller = AdaptiveConcurrency(initial=2, max_limit=10)
+    for _ in range(2 + 3 + 1):
+        controller.record(0.1)
+    assert controller.limit == 4
+    for _ in range(200):
+        controller.record(0.1)
+    assert controller.limit == 10
+
+
+def test_overload_halves_limit_once_per_window():
+    controller = AdaptiveConcurrency(initial=8)
+    controller.record(overloaded=True)
+    assert controller.limit == 4
+    # The other requests in flight at the time report the same overload.
+    for _ in range(3):
+        controller.record(overloaded=True)
+    assert controller.limit == 4
+    controller.record(overloaded=True)
+    assert controller.limit == 2
+    assert controller.metrics()["concurrency/limit_min"] == 2
+    assert controller.metrics()["concurrency/overloads"] == 5
+
+
+def test_latency_rise_backs_off():
+    controller = AdaptiveConcurrency(initial=4, window=10)
+    for _ in range(10):
+        controller.record(0.1)
+    before = controller.limit
+    for _ in range(10):
+        controller.record(1.0)
+    assert controller.limit < before
+    assert controller.decreases >= 1
+
+
+def test_lasting_latency_step_relearns_baseline():
+    controller = AdaptiveConcurrency(initial=8, max_limit=64)
+    for _ in range(100):
+        controller.record(1.0)
+    # Every request gets slower for a reason unrelated to load.
+    for _ in range(500):
+        controller.record(2.5)
+
+    assert controller.decreases == 1
+    assert controller.baseline_p95 == pytest.approx(2.5)
+    assert controller.limit > 8
+
+
+def test_latency_cut_that_helps_keeps_baseline():
+    controller = AdaptiveConcurrency(initial=8, window=10)
+    for _ in range(10):
+        controller.record(0.1)
+    controller.record(1.0)
+    assert controller.decreases == 1
+    # Fewer requests in flight bring the latency back down.
+    for _ in range(10):
+        controller.record(0.1)
+
+    assert controller.baseline_p95 < 0.2
+    controller.record(1.0)
+    assert controller.decreases == 2
+
+
+def test_rejects_bad_settings():
+    with pytest.raises(ValueError):
+        AdaptiveConcurrency(initial=0)
+    with pytest.raises(ValueError, match="backoff"):
+        AdaptiveConcurrency(initial=2, backoff=1.5)
+
+
+class _CapacityModel(BaseModel):
+    """Rejects requests beyond ``capacity`` in flight, like a rate limit."""
+
+    def __init__(self, capacity):
+        super().__init__("capacity")
+        self.capacity = capacity
+        self.in_flight = 0
+        self.rejected = 0
+
+    async def chat(self, prompt, images=None):
+        self.in_flight += 1
+        try:
+            if self.in_flight > self.capacity:
+                self.rejected += 1
+                raise TransientModelError("429 Too Many Requests")
+            await asyncio.sleep(0.001)
+            return "No Precipitation"
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_adapts_to_backend_capacity():
+    from lars.nepho.inference import label_radar_data
+
+    n = 120
+    df = pd.DataFrame({
+        "file_path": [f"/data/scan_{i}.png" for i in range(n)],
+        "time": [f"2025-05-27 {i // 60:02d}:{i % 60:02d}:00" for i in range(n)],
+    })
+    model = _CapacityModel(capacity=4)
+    controller = AdaptiveConcurrency(initial=2, max_limit=32)
+    out = await label_radar_data(df, model, categories={"No Precipitation": ""},
+                                 verbose=False, max_concurrent=controller)
+
+    assert controller.limit_max > 4
+    assert controller.decreases >= 1
+    assert controller.limit <= 8
+    assert out["llm_error"].notna().sum() == model.rejected
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_does_not_count_errors_as_healthy():
+    from lars.nepho.inference import label_radar_data
+
+    class _BrokenModel(BaseModel):
+        async def chat(self, prompt, images=None):
+            raise RuntimeError("bad request")
+
+    n = 40
+    df = pd.DataFrame({
+        "file_path": [f"/data/scan_{i}.png" for i in range(n)],
+        "time": [f"2025-05-27 00:{i:02d}:00" for i in range(n)],
+    })
+    controller = AdaptiveConcurrency(initial=2, max_limit=32)
+    out = await label_radar_data(df, _BrokenModel("broken"),
+                                 categories={"No Precipitation": ""},
+                                 verbose=False, max_concurrent=controller)
+
+    assert out["llm_error"].notna().all()
+    assert controller.limit == 2
+    assert controller.completions == 0
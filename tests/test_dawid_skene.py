@@ -121,3 +121,35 @@ def test_plot_tick_labels_match_classes(fitted):
     plot_dawid_skene_confusion(fitted, "rater_a", ax=ax)
     labels = set(t.get_text() for t in ax.get_xticklabels())
     assert labels == {"convective", "stratiform", "anvil"}
+
+
+def test_one_hot_soft_rater_matches_hard_labels(sample_df, fitted):
+    from lars.util.dawid_skene import fit_dawid_skene
+
+    df = sample_df.copy()
+    classes = ["anvil", "convective", "stratiform"]
+    soft = {}
+    for label in classes:
+        df[f"c_{label}"] = (df["rater_c"] == label).astype(float)
+        soft[label] = f"c_{label}"
+    result = fit_dawid_skene(df, columns=["rater_a", "rater_b"], soft_columns={"rater_c": soft})
+
+    np.testing.assert_allclose(result["consensus_proba"].values,
+                               fitted["consensus_proba"].values, atol=1e-8)
+    np.testing.assert_allclose(result["confusion_matrices"]["rater_c"].values,
+                               fitted["confusion_matrices"]["rater_c"].values, atol=1e-8)
+
+
+def test_soft_rater_with_missing_rows(sample_df):
+    from lars.util.dawid_skene import fit_dawid_skene
+
+    df = sample_df[["rater_a"]].copy()
+    df["p_anvil"] = 0.2
+    df["p_convective"] = 0.8
+    df.loc[0, ["p_anvil", "p_convective"]] = np.nan
+    result = fit_dawid_skene(df, soft_columns={"llm": {"anvil": "p_anvil",
+                                                      "convective": "p_convective"}})
+
+    assert result["columns"] == ["rater_a"]
+    assert set(result["confusion_matrices"]) == {"rater_a", "llm"}
+    np.testing.assert_allclose(result["consensus_proba"].sum(axis=1), 1.0)
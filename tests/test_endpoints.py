@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+from lars.nepho.endpoints import EndpointPool
+
+
+def test_pick_prefers_idle_and_fast_hosts():
+    pool = EndpointPool(["http://a", "http://b"])
+    a, b = pool.endpoints
+    first = pool.pick()
+    second = pool.pick()
+    assert {first, second} == {a, b}
+    pool.release(a, latency=0.1)
+    pool.release(b, latency=1.0)
+
+    # b is ten times slower, so a takes up to ten requests before b is used.
+    picks = [pool.pick() for _ in range(10)]
+    assert picks.count(a) == 9
+    assert picks.count(b) == 1
+
+
+def test_latency_is_moving_average():
+    pool = EndpointPool(["http://a"], alpha=0.5)
+    endpoint = pool.pick()
+    pool.release(endpoint, latency=1.0)
+    pool.release(pool.pick(), latency=3.0)
+    assert endpoint.latency == pytest.approx(2.0)
+
+
+def test_failed_host_is_ejected_with_growing_backoff():
+    pool = EndpointPool(["http://a", "http://b"], eject_time=1, max_eject_time=3)
+    a, b = pool.endpoints
+    pool.release(pool.pick(), failed=True)
+    assert a.ejected() and not b.ejected()
+    assert all(pool.pick() is b for _ in range(3))
+    assert [e.url for e in pool.healthy()] == ["http://b"]
+
+    # Each probe sent once the ejection has run out fails again.
+    a.ejected_until = 0.0
+    pool.release(a, failed=True)
+    assert a.ejected_until - time.monotonic() == pytest.approx(2, abs=0.1)
+    a.ejected_until = 0.0
+    pool.release(a, failed=True)
+    assert a.ejected_until - time.monotonic() == pytest.approx(3, abs=0.1)
+    assert pool.stats()["http://a"]["ejections"] == 3
+
+
+def test_in_flight_failures_count_as_one_ejection():
+    pool = EndpointPool(["http://a"], eject_time=1, max_eject_time=60)
+    a, = pool.endpoints
+    for _ in range(5):
+        pool.pick()
+    for _ in range(5):
+        pool.release(a, failed=True)
+    assert a.ejected_until - time.monotonic() == pytest.approx(1, abs=0.1)
+    assert a.failures == 1
+    stats = pool.stats()["http://a"]
+    assert stats["ejections"] == 1
+    assert stats["errors"] == 5
+
+
+def test_only_one_probe_after_ejection():
+    pool = EndpointPool(["http://a", "http://b"], eject_time=0)
+    a, b = pool.endpoints
+    pool.release(pool.pick(), failed=True)
+    probe = pool.pick(exclude=[b])
+    assert probe is a
+    # While the probe is outstanding a takes no more traffic.
+    assert pool.pick() is b
+    assert pool.pick() is b
+    pool.release(a, latency=0.1)
+    assert not a.ejected()
+
+
+def test_all_ejected_uses_host_due_back_first():
+    pool = EndpointPool(["http://a", "http://b"], eject_time=5)
+    a, b = pool.endpoints
+    pool.release(pool.pick(), failed=True)
+    pool.release(pool.pick(), failed=True)
+    assert pool.pick() is a
+    assert pool.pick(exclude=[a]) is b
+    assert pool.pick(exclude=[a, b]) is None
+
+
+def test_rejects_empty_pool():
+    with pytest.raises(ValueError):
+        EndpointPool([])
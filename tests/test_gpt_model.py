@@ -49,3 +49,188 @@ async def test_chat_raises_on_api_error(mock_openai):
 
     with pytest.raises(RuntimeError, match="Error calling GPT API"):
         await model.chat("Hello")
+
+
+@pytest.mark.asyncio
+async def test_chat_with_choices_requests_enum_schema(mock_openai):
+    from lars.nepho.models.gpt_model import GPTModel
+
+    mock_response = MagicMock()
+    mock_response.choices[0].message.content = '{"label": "Isolated Convection"}'
+    mock_openai.chat.completions.create = AsyncMock(return_value=mock_response)
+
+    choices = ["No Precipitation", "Isolated Convection"]
+    model = GPTModel(model_name="gpt-4o", api_key="test-key")
+    await model.chat("Hello", choices=choices)
+
+    call_kwargs = mock_openai.chat.completions.create.call_args.kwargs
+    schema = call_kwargs["response_format"]["json_schema"]["schema"]
+    assert schema["properties"]["label"]["enum"] == choices
+    assert call_kwargs["max_tokens"] == model.choice_token_budget(choices)
+    assert call_kwargs["max_tokens"] < 50
+
+
+@pytest.mark.asyncio
+async def test_chat_returns_usage_metadata(mock_openai):
+    from lars.nepho.models.gpt_model import GPTModel
+
+    mock_response = MagicMock()
+    mock_response.choices[0].message.content = "Response"
+    mock_response.usage.prompt_tokens = 812
+    mock_response.usage.completion_tokens = 6
+    mock_openai.chat.completions.create = AsyncMock(return_value=mock_response)
+
+    model = GPTModel(model_name="gpt-4", api_key="test-key")
+    result = await model.chat("Hello")
+
+    assert result.prompt_tokens == 812
+    assert result.completion_tokens == 6
+    assert result.total_tokens == 818
+    assert result.client_latency >= 0
+
+
+class _FakeStream:
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.sent = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.sent == len(self.pieces):
+            raise StopAsyncIteration
+        piece = self.pieces[self.sent]
+        self.sent += 1
+        chunk = MagicMock()
+        chunk.usage = None
+        chunk.choices[0].delta.content = piece
+        return chunk
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_streaming_stops_once_label_recognized(mock_openai):
+    from lars.nepho.models.gpt_model import GPTModel
+
+    stream = _FakeStream(["No Precip", "itation\n", "The image shows", " nothing."])
+    mock_openai.chat.completions.create = AsyncMock(return_value=stream)
+
+    model = GPTModel(model_name="gpt-4", api_key="test-key", stream=True)
+    result = await model.chat("Hello", stop_labels=["No Precipitation", "Clear Air"])
+
+    call_kwargs = mock_openai.chat.completions.create.call_args.kwargs
+    assert call_kwargs["stream"] is True
+    assert result == "No Precipitation"
+    assert result.stopped_early
+    assert stream.sent == 2
+    assert stream.closed
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_raises_transient_error(mock_openai):
+    from lars.nepho.models.gpt_model import GPTModel
+    from lars.nepho.retry import TransientModelError
+
+    class _RateLimited(Exception):
+        status_code = 429
+        response = MagicMock(headers={"retry-after": "4"})
+
+    mock_openai.chat.completions.create = AsyncMock(side_effect=_RateLimited("slow down"))
+
+    model = GPTModel(model_name="gpt-4", api_key="test-key")
+    with pytest.raises(TransientModelError, match="Error calling GPT API") as excinfo:
+        await model.chat("Hello")
+    assert excinfo.value.retry_after == 4.0
+
+
+def _logprob_response(top):
+    from types import SimpleNamespace
+
+    entries = [SimpleNamespace(token=token, logprob=logprob) for token, logprob in top.items()]
+    response = MagicMock()
+    response.choices[0].logprobs.content = [SimpleNamespace(token=entries[0].token,
+                                                            top_logprobs=entries)]
+    response.usage.prompt_tokens = 120
+    response.usage.completion_tokens = 1
+    return response
+
+
+@pytest.mark.asyncio
+async def test_score_reads_probabilities_from_one_token(mock_openai):
+    import math
+
+    from lars.nepho.models.gpt_model import GPTModel
+
+    mock_openai.chat.completions.create = AsyncMock(return_value=_logprob_response(
+        {"B": math.log(0.6), " B": math.log(0.1), "A": math.log(0.2), "The": math.log(0.1)}))
+    model = GPTModel(model_name="gpt-4o", api_key="test-key")
+    result = await model.score("Classify", choices=["Clear Air", "Isolated Convection", "Stratiform"])
+
+    request = mock_openai.chat.completions.create.call_args.kwargs
+    assert request["max_tokens"] == 1
+    assert request["logprobs"] is True
+    assert request["top_logprobs"] == 8
+    assert "B. Isolated Convection" in request["messages"][0]["content"]
+    assert result == "Isolated Convection"
+    assert result.probabilities == pytest.approx(
+        {"Clear Air": 2 / 9, "Isolated Convection": 7 / 9, "Stratiform": 0.0})
+    assert result.total_tokens == 121
+
+
+@pytest.mark.asyncio
+async def test_score_without_logprobs_raises(mock_openai):
+    from lars.nepho.models.gpt_model import GPTModel
+
+    response = MagicMock()
+    response.choices[0].logprobs = None
+    mock_openai.chat.completions.create = AsyncMock(return_value=response)
+    model = GPTModel(model_name="gpt-4o", api_key="test-key")
+
+    with pytest.raises(RuntimeError, match="log-probabilities"):
+        await model.score("Classify", choices=["Clear Air", "Stratiform"])
+
+
+def test_chat_works_across_event_loops():
+    import asyncio
+    from aiohttp import web
+    from lars.nepho.models.gpt_model import GPTModel
+    from lars.nepho.transport import HTTPTransport
+
+    async def completions(request):
+        return web.json_response({
+            "id": "chatcmpl-1", "object": "chat.completion", "created": 0,
+            "model": "gpt-4",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "Hi"}}],
+        })
+
+    transport = HTTPTransport()
+    model = GPTModel(model_name="gpt-4", api_key="test-key",
+                     base_url="http://127.0.0.1:1/v1", transport=transport)
+    clients = []
+
+    async def run():
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", completions)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        model.base_url = f"http://127.0.0.1:{port}/v1"
+        try:
+            assert await model.chat("Hello") == "Hi"
+            clients.append(transport.openai_http_client())
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(run())
+    asyncio.run(run())
+    asyncio.run(transport.close())
+
+    assert clients[0] is not clients[1]
+    assert all(client.is_closed for client in clients)
@@ -0,0 +1,115 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from lars.nepho.models.base_model import BaseModel, ChatResult
+from lars.nepho.models.hedged_model import HedgedModel
+
+
+class _SlowModel(BaseModel):
+    """Answers after the queued delays, then after ``default`` seconds."""
+
+    def __init__(self, delays=(), default=0.001, answer="Clear Air"):
+        super().__init__("slow")
+        self.delays = list(delays)
+        self.default = default
+        self.answer = answer
+        self.calls = 0
+        self.cancelled = 0
+
+    async def chat(self, prompt, images=None):
+        self.calls += 1
+        delay = self.delays.pop(0) if self.delays else self.default
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return self.answer
+
+
+async def _warm_up(model, n):
+    for _ in range(n):
+        await model.chat("Hello")
+
+
+@pytest.mark.asyncio
+async def test_slow_call_is_hedged_and_loser_cancelled():
+    primary = _SlowModel(delays=[0.001] * 10 + [0.5])
+    replica = _SlowModel(answer="Clear Air (replica)")
+    model = HedgedModel(primary, replicas=[replica], min_samples=10, max_hedge_rate=0.5)
+    await _warm_up(model, 10)
+    assert model.hedge_delay() is not None
+
+    result = await model.chat("Hello")
+    await asyncio.sleep(0)
+
+    assert result == "Clear Air (replica)"
+    assert result.hedged
+    assert result.hedge_saved is not None
+    assert primary.cancelled == 1
+    stats = model.stats()
+    assert stats["hedges"] == stats["hedge_wins"] == 1
+    assert stats["hedge_rate"] == pytest.approx(1 / 11)
+
+
+@pytest.mark.asyncio
+async def test_no_hedging_until_enough_samples():
+    inner = _SlowModel(delays=[0.05])
+    model = HedgedModel(inner, min_samples=5)
+    result = await model.chat("Hello")
+    assert result == "Clear Air"
+    assert inner.calls == 1
+    assert model.stats()["hedges"] == 0
+
+
+@pytest.mark.asyncio
+async def test_hedge_rate_is_capped():
+    inner = _SlowModel()
+    model = HedgedModel(inner, min_samples=5, max_hedge_rate=0.1)
+    await _warm_up(model, 5)
+    inner.delays = [0.02] * 20
+    inner.default = 0.02
+    for _ in range(5):
+        await model.chat("Hello")
+    assert model.hedges <= 0.1 * model.calls
+
+
+@pytest.mark.asyncio
+async def test_primary_still_answers_when_hedge_fails():
+    class _BrokenReplica(BaseModel):
+        async def chat(self, prompt, images=None):
+            raise RuntimeError("replica down")
+
+    primary = _SlowModel(delays=[0.001] * 5 + [0.05])
+    model = HedgedModel(primary, replicas=[_BrokenReplica("broken")], min_samples=5,
+                        max_hedge_rate=1)
+    await _warm_up(model, 5)
+    result = await model.chat("Hello")
+
+    assert result == "Clear Air"
+    assert result.hedged
+    assert result.hedge_saved is None
+    assert model.hedge_wins == 0
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_reports_hedges():
+    from lars.nepho.inference import _usage_metrics, _UsageBudget, label_radar_data
+
+    primary = _SlowModel(delays=[0.001] * 4 + [0.5], answer="No Precipitation")
+    replica = _SlowModel(answer="No Precipitation")
+    model = HedgedModel(primary, replicas=[replica], min_samples=4, max_hedge_rate=1)
+    n = 5
+    df = pd.DataFrame({"file_path": [f"/data/scan_{i}.png" for i in range(n)],
+                       "time": [f"2025-05-27 00:0{i}:00" for i in range(n)]})
+    out = await label_radar_data(df, model, categories={"No Precipitation": ""},
+                                 verbose=False, max_concurrent=1)
+
+    assert list(out["llm_hedged"]) == [False] * 4 + [True]
+    assert out["llm_hedge_saved"].notna().sum() == 1
+    metrics = _usage_metrics(out, _UsageBudget())
+    assert metrics["usage/hedge_rate"] == pytest.approx(0.2)
+    assert metrics["usage/hedge_wins"] == 1
+    assert out["llm_latency"].max() < 0.4
@@ -0,0 +1,86 @@
+import itertools
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from lars.preprocessing.image_hash import (find_near_duplicates,
+                                           hamming_distance, image_dhash)
+
+
+def _scene(path, blobs=(), noise_pixel=None):
+    img = Image.new("RGB", (64, 64), color="white")
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((2, 2, 61, 61), fill="navy")
+    for x, y in blobs:
+        draw.ellipse((x, y, x + 20, y + 20), fill="red")
+    if noise_pixel is not None:
+        img.putpixel(noise_pixel, (0, 0, 255))
+    img.save(path, format="PNG")
+    return str(path)
+
+
+def test_dhash_ignores_tiny_changes_and_sees_large_ones(tmp_path):
+    base = image_dhash(_scene(tmp_path / "a.png", blobs=[(5, 5)]))
+    noisy = image_dhash(_scene(tmp_path / "b.png", blobs=[(5, 5)],
+                               noise_pixel=(60, 60)))
+    moved = image_dhash(_scene(tmp_path / "c.png", blobs=[(40, 40)]))
+
+    assert hamming_distance(base, noisy) <= 2
+    assert hamming_distance(base, moved) > 8
+
+
+def test_hamming_distance():
+    assert hamming_distance(0b1010, 0b1010) == 0
+    assert hamming_distance(0b1010, 0b0101) == 4
+
+
+def test_find_near_duplicates_respects_distance_and_window(tmp_path):
+    paths = [
+        _scene(tmp_path / "0.png"),
+        _scene(tmp_path / "1.png", noise_pixel=(1, 1)),
+        _scene(tmp_path / "2.png", blobs=[(20, 20)]),
+        _scene(tmp_path / "3.png"),
+    ]
+    times = ["2025-05-27 00:00", "2025-05-27 00:10",
+             "2025-05-27 00:20", "2025-05-27 01:00"]
+
+    duplicate_of = find_near_duplicates(paths, times, max_distance=2,
+                                        window="30min")
+
+    np.testing.assert_array_equal(duplicate_of, [-1, 0, -1, -1])
+
+
+def test_dhash_ignores_the_margin_around_the_plot(tmp_path):
+    small = Image.new("RGB", (64, 64), color="white")
+    ImageDraw.Draw(small).rectangle((10, 10, 40, 40), fill="navy")
+    ImageDraw.Draw(small).ellipse((15, 15, 25, 25), fill="red")
+    small.save(tmp_path / "a.png")
+    small.crop((10, 10, 41, 41)).resize((62, 62)).save(tmp_path / "b.png")
+
+    assert hamming_distance(image_dhash(tmp_path / "a.png"),
+                            image_dhash(tmp_path / "b.png")) <= 4
+
+
+def test_example_scans_are_not_duplicates_of_each_other():
+    examples = sorted((Path(__file__).parent.parent / "examples").glob("01_*.png"))
+    assert len(examples) == 4
+    hashes = [image_dhash(path) for path in examples]
+
+    for a, b in itertools.combinations(hashes, 2):
+        assert hamming_distance(a, b) > 12
+
+    times = ["2025-05-27 00:00"] * len(examples)
+    duplicate_of = find_near_duplicates([str(p) for p in examples], times)
+    np.testing.assert_array_equal(duplicate_of, [-1] * len(examples))
+
+
+def test_find_near_duplicates_requires_matching_stats(tmp_path):
+    paths = [_scene(tmp_path / "0.png"), _scene(tmp_path / "1.png")]
+    times = ["2025-05-27 00:00", "2025-05-27 00:10"]
+
+    same = find_near_duplicates(paths, times, stats=[[0.0, 0.0], [0.0, 0.005]])
+    different = find_near_duplicates(paths, times, stats=[[0.0, 0.0], [45.0, 5.0]])
+
+    np.testing.assert_array_equal(same, [-1, 0])
+    np.testing.assert_array_equal(different, [-1, -1])
@@ -0,0 +1,88 @@
+"""Import-time benchmarks, run in fresh interpreters so nothing is cached."""
+import json
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+# Modules that cost most of lars's former startup time.
+HEAVY = ["openai", "aiohttp", "asksageclient", "matplotlib", "sklearn", "xradar"]
+
+# Generous budgets (seconds): a fresh "import lars" used to take over 3 s.
+PACKAGE_BUDGET = 0.5
+INFERENCE_BUDGET = 2.0
+
+
+def _run(code):
+    script = textwrap.dedent("""
+        import json, sys, time
+        start = time.perf_counter()
+    """) + textwrap.dedent(code) + textwrap.dedent("""
+        elapsed = time.perf_counter() - start
+        print(json.dumps({"elapsed": elapsed,
+                          "loaded": [m for m in HEAVY if m in sys.modules],
+                          "extra": extra}))
+    """)
+    out = subprocess.run([sys.executable, "-c", f"HEAVY = {HEAVY!r}\n" + script],
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_import_lars_is_fast_and_lazy():
+    result = _run("""
+        import lars, lars.nepho, lars.nepho.models
+        extra = None
+    """)
+    assert result["loaded"] == []
+    assert result["elapsed"] < PACKAGE_BUDGET
+
+
+def test_inference_does_not_load_backends_or_codebook():
+    result = _run("""
+        from lars.nepho import inference
+        extra = "CODEBOOK_CATEGORIES" in vars(inference)
+    """)
+    assert result["loaded"] == []
+    assert result["extra"] is False
+    assert result["elapsed"] < INFERENCE_BUDGET
+
+
+def test_get_model_imports_only_its_backend():
+    result = _run("""
+        from lars.nepho.models import get_model
+        extra = type(get_model("ollama:llava:7b")).__name__
+    """)
+    assert result["extra"] == "OllamaModel"
+    assert result["loaded"] == ["aiohttp"]
+
+
+def test_lazy_names_resolve():
+    import lars
+    from lars.nepho import CODEBOOK_CATEGORIES, label_radar_data  # noqa: F401
+    from lars.nepho.models import GPTModel, get_model
+
+    assert lars.util.fit_dawid_skene.__name__ == "fit_dawid_skene"
+    assert "OllamaModel" in dir(lars.nepho.models)
+    assert get_model.__module__ == "lars.nepho.models.registry"
+    assert GPTModel.__name__ == "GPTModel"
+    with pytest.raises(AttributeError):
+        lars.nepho.models.NoSuchModel
+
+
+def test_get_model_rejects_bad_specs():
+    from lars.nepho.models import available_backends, get_model, register_model
+
+    with pytest.raises(ValueError, match="backend"):
+        get_model("llava")
+    with pytest.raises(ValueError, match="Unknown model backend"):
+        get_model("nope:llava")
+
+    from lars.nepho.models.registry import _BACKENDS
+
+    register_model("echo", lambda model_name, **kwargs: (model_name, kwargs))
+    try:
+        assert "echo" in available_backends()
+        assert get_model("echo:tiny", temperature=0) == ("tiny", {"temperature": 0})
+    finally:
+        _BACKENDS.pop("echo")
@@ -0,0 +1,643 @@
+import asyncio
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from lars.nepho.models.base_model import BaseModel
+
+
+CATEGORIES = {
+    "No Precipitation": "No echoes.",
+    "Stratiform Precipitation": "Widespread echoes.",
+    "Isolated Convection": "Isolated cells.",
+}
+
+
+class _FakeModel(BaseModel):
+    """Returns a canned answer per image, optionally after a delay."""
+
+    def __init__(self, answers, delay=0.0, fail=()):
+        super().__init__("fake")
+        self.answers = answers
+        self.delay = delay
+        self.fail = set(fail)
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def chat(self, prompt, images=None):
+        self.calls.append((prompt, list(images or [])))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            image = os.fspath(images[0])
+            if image in self.fail:
+                raise RuntimeError(f"backend failed on {image}")
+            return self.answers[image]
+        finally:
+            self.in_flight -= 1
+
+
+def _radar_df(n):
+    return pd.DataFrame({
+        "file_path": [f"/data/scan_{i}.png" for i in range(n)],
+        "time": [f"2025-05-27 00:{i:02d}:00" for i in range(n)],
+        "label": ["UNKNOWN"] * n,
+    })
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_keeps_requests_in_flight():
+    from lars.nepho.inference import label_radar_data
+
+    df = _radar_df(8)
+    answers = {fp: "Isolated Convection" for fp in df["file_path"]}
+    model = _FakeModel(answers, delay=0.01)
+
+    out = await label_radar_data(df, model, categories=CATEGORIES,
+                                 verbose=False, max_concurrent=4)
+
+    assert model.max_in_flight == 4
+    assert (out["llm_label"] == "Isolated Convection").all()
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_writes_results_to_matching_rows():
+    from lars.nepho.inference import label_radar_data
+
+    df = _radar_df(3)
+    labels = ["No Precipitation", "Stratiform Precipitation",
+              "Isolated Convection"]
+    answers = dict(zip(df["file_path"], labels))
+    model = _FakeModel(answers)
+
+    out = await label_radar_data(df, model, categories=CATEGORIES,
+                                 verbose=False, max_concurrent=3)
+
+    assert list(out["llm_label"]) == labels
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_row_error_does_not_cancel_batch():
+    from lars.nepho.inference import label_radar_data
+
+    df = _radar_df(3)
+    answers = {fp: "Stratiform Precipitation" for fp in df["file_path"]}
+    model = _FakeModel(answers, fail={df["file_path"][1]})
+
+    out = await label_radar_data(df, model, categories=CATEGORIES,
+                                 verbose=False, max_concurrent=2)
+
+    assert list(out["llm_label"]) == ["Stratiform Precipitation", "Unknown",
+                                      "Stratiform Precipitation"]
+    assert out["llm_error"].isna().tolist() == [True, False, True]
+    assert "backend failed" in out["llm_error"][1]
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_rejects_invalid_concurrency():
+    from lars.nepho.inference import label_radar_data
+
+    with pytest.raises(ValueError, match="max_concurrent"):
+        await label_radar_data(_radar_df(1), _FakeModel({}),
+                               categories=CATEGORIES, max_concurrent=0)
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_previous_labels_use_row_positions():
+    from lars.nepho.inference import label_radar_data
+
+    df = _radar_df(3)
+    df["label"] = ["No Precipitation", "Stratiform Precipitation", "UNKNOWN"]
+    df.index = [30, 10, 20]
+    answers = {fp: "Isolated Convection" for fp in df["file_path"]}
+    model = _FakeModel(answers)
+
+    await label_radar_data(df, model, categories=CATEGORIES, verbose=False,
+                           use_previous_labels=2, max_concurrent=1)
+
+    last_prompt = model.calls[2][0]
+    assert "00:00:00 is No Precipitation" in last_prompt
+    assert "00:01:00 is Stratiform Precipitation" in last_prompt
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_reads_time_from_index():
+    from lars.nepho.inference import label_radar_data
+
+    df = _radar_df(2).set_index("time")
+    answers = {fp: "No Precipitation" for fp in df["file_path"]}
+    model = _FakeModel(answers)
+
+    out = await label_radar_data(df, model, categories=CATEGORIES,
+                                 verbose=False, max_concurrent=1)
+
+    assert "taken at time 2025-05-27 00:01:00" in model.calls[1][0]
+    assert list(out["llm_label"]) == ["No Precipitation"] * 2
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_resume_skips_journalled_rows(tmp_path):
+    from lars.nepho.inference import label_radar_data
+    from lars.nepho.journal import LabelJournal
+
+    df = _radar_df(3)
+    journal_path = str(tmp_path / "journal.jsonl")
+    LabelJournal(journal_path).record(df["file_path"][0], "No Precipitation",
+                                      "No Precipitation")
+    answers = {fp: "Stratiform Precipitation" for fp in df["file_path"]}
+    model = _FakeModel(answers)
+
+    out = await label_radar_data(df, model, categories=CATEGORIES,
+                                 verbose=False, journal_path=journal_path,
+                                 resume=True)
+
+    assert [c[1][0] for c in model.calls] == list(df["file_path"][1:])
+    assert list(out["llm_label"]) == ["No Precipitation",
+                                      "Stratiform Precipitation",
+                                      "Stratiform Precipitation"]
+    assert len(LabelJournal(journal_path)) == 3
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_does_not_journal_failed_rows(tmp_path):
+    from lars.nepho.inference import label_radar_data
+    from lars.nepho.journal import LabelJournal
+
+    df = _radar_df(2)
+    journal_path = str(tmp_path / "journal.jsonl")
+    answers = {fp: "No Precipitation" for fp in df["file_path"]}
+    model = _FakeModel(answers, fail={df["file_path"][0]})
+
+    await label_radar_data(df, model, categories=CATEGORIES, verbose=False,
+                           journal_path=journal_path)
+
+    journal = LabelJournal(journal_path)
+    assert df["file_path"][0] not in journal
+    assert df["file_path"][1] in journal
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_resume_requires_journal():
+    from lars.nepho.inference import label_radar_data
+
+    with pytest.raises(ValueError, match="journal_path"):
+        await label_radar_data(_radar_df(1), _FakeModel({}),
+                               categories=CATEGORIES, resume=True)
+
+
+@pytest.mark.asyncio
+async def test_iter_label_radar_data_yields_in_completion_order():
+    from lars.nepho.inference import iter_label_radar_data
+
+    df = _radar_df(2)
+    answers = dict(zip(df["file_path"], ["No Precipitation",
+                                         "Isolated Convection"]))
+
+    class _SlowFirst(_FakeModel):
+        async def chat(self, prompt, images=None):
+            if images[0] == df["file_path"][0]:
+                await asyncio.sleep(0.05)
+            return await super().chat(prompt, images)
+
+    records = [r async for r in iter_label_radar_data(
+        df, _SlowFirst(answers), categories=CATEGORIES, max_concurrent=2)]
+
+    assert [r["position"] for r in records] == [1, 0]
+    assert records[0]["file_path"] == df["file_path"][1]
+    assert records[0]["label"] == "Isolated Convection"
+    assert records[0]["raw_output"] == "Isolated Convection"
+    assert records[0]["latency"] >= 0
+    assert "llm_label" not in df.columns
+
+
+@pytest.mark.asyncio
+async def test_iter_label_radar_data_applies_criteria_per_record():
+    from lars.nepho.inference import iter_label_radar_data
+
+    df = _radar_df(2)
+    df["pct_gates_50dbz"] = [0.0, 1.0]
+    criteria = {"No Precipitation": [{
+        "field": "pct_gates_50dbz", "kind": "pct", "threshold_dbz": 50,
+        "max_value": 0.005, "reclassify_as": "Isolated Convection",
+    }]}
+    answers = {fp: "No Precipitation" for fp in df["file_path"]}
+
+    records = {r["position"]: r async for r in iter_label_radar_data(
+        df, _FakeModel(answers), categories=CATEGORIES, criteria=criteria)}
+
+    assert records[0]["label"] == "No Precipitation"
+    assert records[0]["label_original"] is None
+    assert records[1]["label"] == "Isolated Convection"
+    assert records[1]["label_original"] == "No Precipitation"
+    assert "pct_gates_50dbz" in records[1]["criteria_violation"]
+
+
+@pytest.mark.asyncio
+async def test_iter_label_radar_data_cancels_pending_calls_on_close():
+    from lars.nepho.inference import iter_label_radar_data
+
+    df = _radar_df(4)
+    answers = {fp: "No Precipitation" for fp in df["file_path"]}
+    model = _FakeModel(answers, delay=0.01)
+
+    stream = iter_label_radar_data(df, model, categories=CATEGORIES,
+                                   max_concurrent=2)
+    async for _ in stream:
+        break
+    await stream.aclose()
+
+    assert len(model.calls) < 4
+    assert model.in_flight == 0
+
+
+@pytest.mark.parametrize("reply, expected", [
+    ('{"label": "Isolated Convection"}', "Isolated Convection"),
+    ("isolated convection.", "Isolated Convection"),
+    ("Reasoning...\nThis is Stratiform Precipitation", "Stratiform Precipitation"),
+    ('{"label": "Hail"}', "Unknown"),
+    ("", "Unknown"),
+])
+def test_parse_label(reply, expected):
+    from lars.nepho.inference import _parse_label
+
+    assert _parse_label(reply, CATEGORIES) == expected
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_constrained_output_passes_choices():
+    from lars.nepho.inference import label_radar_data
+
+    class _ConstrainedModel(_FakeModel):
+        async def chat(self, prompt, images=None, choices=None):
+            self.choices = choices
+            return '{"label": "No Precipitation"}'
+
+    model = _ConstrainedModel({})
+    out = await label_radar_data(_radar_df(1), model, categories=CATEGORIES,
+                                 verbose=False, constrained_output=True)
+
+    assert model.choices == list(CATEGORIES)
+    assert list(out["llm_label"]) == ["No Precipitation"]
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_streaming_model_gets_stop_labels():
+    from lars.nepho.inference import label_radar_data
+
+    class _StreamingModel(_FakeModel):
+        stream = True
+
+        async def chat(self, prompt, images=None, stop_labels=None):
+            self.stop_labels = stop_labels
+            return "Looking at the image...\nNo Precipitation"
+
+    model = _StreamingModel({})
+    out = await label_radar_data(_radar_df(1), model, categories=CATEGORIES,
+                                 verbose=False)
+
+    assert model.stop_labels == list(CATEGORIES)
+    assert list(out["llm_label"]) == ["No Precipitation"]
+
+
+@pytest.mark.parametrize("reply, expected", [
+    ("1: No Precipitation\n2: Isolated Convection",
+     ["No Precipitation", "Isolated Convection"]),
+    ("Image 2 - isolated convection.\n**1.** Stratiform Precipitation",
+     ["Stratiform Precipitation", "Isolated Convection"]),
+    ("1: No Precipitation\n3: Isolated Convection", ["No Precipitation", None]),
+    ("1: No Precipitation\n2: something else", ["No Precipitation", None]),
+    ("1: No Precipitation\n1: Isolated Convection\n2: No Precipitation",
+     [None, "No Precipitation"]),
+])
+def test_parse_packed_labels(reply, expected):
+    from lars.nepho.inference import _parse_packed_labels
+
+    assert _parse_packed_labels(reply, 2, CATEGORIES) == expected
+
+
+def test_parse_packed_labels_keeps_unknown_category():
+    from lars.nepho.inference import _parse_packed_labels
+
+    categories = dict(CATEGORIES, Unknown="Cannot tell.")
+
+    assert _parse_packed_labels("1: Unknown\n2: no idea", 2, categories) == [
+        "Unknown", None]
+
+
+class _PackedModel(_FakeModel):
+    """Answers packed requests with numbered lines, leaving out ``skip``."""
+
+    def __init__(self, answers, skip=()):
+        super().__init__(answers)
+        self.skip = set(skip)
+
+    async def chat(self, prompt, images=None):
+        from lars.nepho.models.base_model import ChatResult
+
+        if len(images) == 1:
+            return await super().chat(prompt, images)
+        self.calls.append((prompt, list(images)))
+        lines = [f"{i}: {self.answers[image]}"
+                 for i, image in enumerate(images, start=1) if image not in self.skip]
+        return ChatResult("\n".join(lines), prompt_tokens=1000, completion_tokens=30,
+                          server_latency=0.6)
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_packs_images_per_request():
+    from lars.nepho.inference import label_radar_data
+
+    df = _radar_df(5)
+    answers = {fp: ("Isolated Convection" if i % 2 else "No Precipitation")
+               for i, fp in enumerate(df["file_path"])}
+    model = _PackedModel(answers, skip={df["file_path"][1]})
+    out = await label_radar_data(df, model, categories=CATEGORIES,
+                                 verbose=False, pack_size=3, max_concurrent=1)
+
+    assert list(out["llm_label"]) == [answers[fp] for fp in df["file_path"]]
+    assert [len(images) for _, images in model.calls] == [3, 1, 2]
+    assert "Image 3 was taken at time 2025-05-27 00:02:00" in model.calls[0][0]
+    # Row 1 was re-sent alone; rows 0 and 2 share the first pack's tokens.
+    assert model.calls[1][1] == [df["file_path"][1]]
+    assert list(out["llm_prompt_tokens"][:3]) == [500, pd.NA, 500]
+    assert list(out["llm_prompt_tokens"][3:]) == [500, 500]
+
+
+@pytest.mark.asyncio
+async def test_packed_latency_is_split_over_rows():
+    from lars.nepho.inference import _UsageBudget, _usage_metrics, label_radar_data
+
+    df = _radar_df(4)
+    answers = {fp: "No Precipitation" for fp in df["file_path"]}
+    model = _PackedModel(answers)
+    out = await label_radar_data(df, model, categories=CATEGORIES,
+                                 verbose=False, pack_size=2, max_concurrent=1)
+
+    assert list(out["llm_server_latency"]) == pytest.approx([0.3] * 4)
+    assert (out["llm_latency"] > 0).all()
+    metrics = _usage_metrics(out, _UsageBudget())
+    assert metrics["usage/server_latency_total_s"] == pytest.approx(2 * 0.6)
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_pack_size_rejects_constrained_output():
+    from lars.nepho.inference import label_radar_data
+
+    with pytest.raises(ValueError, match="pack_size"):
+        await label_radar_data(_radar_df(2), _FakeModel({}), categories=CATEGORIES,
+                               verbose=False, pack_size=2, constrained_output=True)
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_triage_skips_model_for_clear_air():
+    from lars.nepho.inference import label_radar_data
+
+    df = _radar_df(3)
+    df["pct_gates_10dbz"] = [0.0, 25.0, 0.0]
+    color_criteria = {
+        "No Precipitation": [{"kind": "max_pct_above",
+                              "field": "pct_gates_10dbz", "value": 0.5}],
+        "Stratiform Precipitation": [{"kind": "min_pct_above",
+                                      "field": "pct_gates_10dbz",
+                                      "value": 10.0}],
+        "Isolated Convection": [{"kind": "min_pct_above",
+                                 "field": "pct_gates_10dbz", "value": 1.0}],
+    }
+    answers = {fp: "Isolated Convection" for fp in df["file_path"]}
+    model = _FakeModel(answers)
+
+    out = await label_radar_data(df, model, categories=CATEGORIES,
+                                 verbose=False, color_criteria=color_criteria,
+                                 triage=["No Precipitation"])
+
+    assert [c[1][0] for c in model.calls] == [df["file_path"][1]]
+    assert list(out["llm_label"]) == ["No Precipitation",
+                                      "Isolated Convection",
+                                      "No Precipitation"]
+    assert list(out["llm_label_source"]) == ["triage", "model", "triage"]
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_triage_with_default_categories():
+    from lars.nepho.inference import label_radar_data
+
+    df = _radar_df(2)
+    df["pct_gates_10dbz"] = [0.0, 25.0]
+    model = _FakeModel({fp: "Stratiform rain" for fp in df["file_path"]})
+
+    out = await label_radar_data(df, model, verbose=False, triage=True)
+
+    assert list(out["llm_label"]) == ["No precipitation", "Stratiform rain"]
+    assert list(out["llm_label_source"]) == ["triage", "model"]
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_warns_when_triage_decides_nothing():
+    from lars.nepho.inference import label_radar_data
+
+    df = _radar_df(2)
+    df["pct_gates_10dbz"] = [30.0, 25.0]
+    model = _FakeModel({fp: "Isolated Convection" for fp in df["file_path"]})
+
+    with pytest.warns(UserWarning, match="triage decided no rows"):
+        await label_radar_data(df, model, categories=CATEGORIES, verbose=False,
+                               triage=True)
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_triage_requires_rules():
+    from lars.nepho.inference import label_radar_data
+
+    with pytest.raises(ValueError, match="triage"):
+        await label_radar_data(_radar_df(1), _FakeModel({}),
+                               categories=CATEGORIES, triage=True)
+    df = _radar_df(1)
+    df["pct_gates_10dbz"] = [0.0]
+    with pytest.raises(ValueError, match="No Precipitation"):
+        await label_radar_data(df, _FakeModel({}), triage=True,
+                               categories={"Rain": "Echoes.", "Snow": "Echoes."})
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_reuses_labels_for_near_duplicates(tmp_path):
+    from PIL import Image
+    from lars.nepho.inference import label_radar_data
+
+    df = _radar_df(3)
+    colors = ["gray", "gray", "black"]
+    df["file_path"] = [str(tmp_path / f"scan_{i}.png") for i in range(3)]
+    for path, color in zip(df["file_path"], colors):
+        img = Image.new("RGB", (32, 32), color="gray")
+        img.paste(color, (0, 0, 16, 32))
+        img.save(path, format="PNG")
+    answers = {fp: "No Precipitation" for fp in df["file_path"]}
+    model = _FakeModel(answers)
+
+    out = await label_radar_data(df, model, categories=CATEGORIES,
+                                 verbose=False, dedup_distance=2)
+
+    assert sorted(c[1][0] for c in model.calls) == [df["file_path"][0],
+                                                    df["file_path"][2]]
+    assert list(out["llm_label"]) == ["No Precipitation"] * 3
+    assert list(out["llm_label_reused"]) == [False, True, False]
+    assert list(out["llm_label_source"]) == ["model", "dedup", "model"]
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_ensemble_encodes_each_image_once(tmp_path):
+    from PIL import Image
+    from lars.nepho.inference import label_radar_data_ensemble
+    from lars.nepho.models.base_model import PreparedImage
+    from lars.util.dawid_skene import fit_dawid_skene
+
+    df = _radar_df(2)
+    df["file_path"] = [str(tmp_path / f"scan_{i}.png") for i in range(2)]
+    for path in df["file_path"]:
+        Image.new("RGB", (8, 8), color="white").save(path, format="PNG")
+
+    class _CountingEncoder(_FakeModel):
+        encoded = 0
+
+        def encode_image(self, image_path):
+            type(self).encoded += 1
+            return super().encode_image(image_path)
+
+    answers_a = {fp: "No Precipitation" for fp in df["file_path"]}
+    answers_b = {fp: "Isolated Convection" for fp in df["file_path"]}
+    model_a, model_b = _CountingEncoder(answers_a), _CountingEncoder(answers_b)
+    model_b.fail = {df["file_path"][1]}
+
+    out = await label_radar_data_ensemble(
+        df, [model_a, model_b], categories=CATEGORIES,
+        column_names=["a", "b"], max_concurrent=2)
+
+    assert _CountingEncoder.encoded == 2
+    assert all(isinstance(c[1][0], PreparedImage) for c in model_b.calls)
+    assert list(out["a"]) == ["No Precipitation"] * 2
+    assert out["b"][0] == "Isolated Convection"
+    assert pd.isna(out["b"][1])
+    assert "backend failed" in out["b_error"][1]
+    assert len(fit_dawid_skene(out, columns=["a", "b"])["consensus"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_ensemble_rejects_duplicate_columns():
+    from lars.nepho.inference import label_radar_data_ensemble
+
+    with pytest.raises(ValueError, match="unique"):
+        await label_radar_data_ensemble(_radar_df(1),
+                                        [_FakeModel({}), _FakeModel({})],
+                                        categories=CATEGORIES)
+
+
+class _MeteredModel(_FakeModel):
+    async def chat(self, prompt, images=None):
+        from lars.nepho.models.base_model import ChatResult
+
+        text = await super().chat(prompt, images)
+        return ChatResult(text, prompt_tokens=100, completion_tokens=5,
+                          server_latency=0.25, prompt_eval_latency=0.05,
+                          eval_latency=0.15)
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_records_usage_columns():
+    from lars.nepho.inference import label_radar_data
+
+    df = _radar_df(2)
+    answers = {fp: "No Precipitation" for fp in df["file_path"]}
+
+    out = await label_radar_data(df, _MeteredModel(answers),
+                                 categories=CATEGORIES, verbose=False)
+
+    assert list(out["llm_prompt_tokens"]) == [100, 100]
+    assert list(out["llm_completion_tokens"]) == [5, 5]
+    assert list(out["llm_server_latency"]) == [0.25, 0.25]
+    assert list(out["llm_prompt_eval_latency"]) == [0.05, 0.05]
+    assert list(out["llm_eval_latency"]) == [0.15, 0.15]
+    assert out["llm_load_latency"].isna().all()
+    assert (out["llm_latency"] >= 0).all()
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_stops_cleanly_at_token_budget():
+    from lars.nepho.inference import label_radar_data
+
+    df = _radar_df(5)
+    answers = {fp: "No Precipitation" for fp in df["file_path"]}
+    model = _MeteredModel(answers)
+
+    with pytest.warns(UserWarning, match="budget"):
+        out = await label_radar_data(df, model, categories=CATEGORIES,
+                                     verbose=False, max_concurrent=1,
+                                     token_budget=200)
+
+    assert len(model.calls) == 2
+    assert list(out["llm_label"][:2]) == ["No Precipitation"] * 2
+    assert out["llm_label"][2:].isna().all()
+
+
+def test_usage_budget_cost():
+    from lars.nepho.inference import _UsageBudget
+
+    budget = _UsageBudget(cost_budget=1.0, token_prices=(2.0, 10.0))
+    budget.add({"prompt_tokens": 400, "completion_tokens": 20})
+    assert budget.cost == pytest.approx(1.0)
+    assert budget.exhausted
+    with pytest.raises(ValueError, match="token_prices"):
+        _UsageBudget(cost_budget=1.0)
+
+
+class _ScoringModel(_FakeModel):
+    async def score(self, prompt, images=None, choices=None):
+        from lars.nepho.models.base_model import ChatResult
+
+        label = self.answers[images[0]]
+        rest = (1 - 0.7) / (len(choices) - 1)
+        probabilities = {choice: 0.7 if choice == label else rest for choice in choices}
+        return ChatResult(label, prompt_tokens=100, completion_tokens=1,
+                          probabilities=probabilities)
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_score_writes_probability_columns():
+    from lars.nepho.inference import label_radar_data, probability_columns
+
+    df = _radar_df(3)
+    answers = dict(zip(df["file_path"], ["No Precipitation", "Isolated Convection",
+                                         "No Precipitation"]))
+    out = await label_radar_data(df, _ScoringModel(answers), categories=CATEGORIES,
+                                 verbose=False, score=True)
+
+    columns = probability_columns(CATEGORIES)
+    assert columns["Stratiform Precipitation"] == "llm_prob_stratiform_precipitation"
+    assert list(out["llm_label"]) == ["No Precipitation", "Isolated Convection",
+                                      "No Precipitation"]
+    assert list(out[columns["No Precipitation"]]) == pytest.approx([0.7, 0.15, 0.7])
+    np.testing.assert_allclose(out[list(columns.values())].sum(axis=1), 1.0)
+
+
+@pytest.mark.asyncio
+async def test_score_fails_run_when_backend_cannot_score():
+    from lars.nepho.inference import label_radar_data
+
+    df = _radar_df(5)
+    model = _FakeModel({fp: "No Precipitation" for fp in df["file_path"]})
+
+    with pytest.raises(NotImplementedError):
+        await label_radar_data(df, model, categories=CATEGORIES, verbose=False,
+                               score=True, max_concurrent=1)
+    assert model.calls == []
+
+
+@pytest.mark.asyncio
+async def test_score_rejects_packing():
+    from lars.nepho.inference import label_radar_data
+
+    with pytest.raises(ValueError, match="score"):
+        await label_radar_data(_radar_df(2), _ScoringModel({}), categories=CATEGORIES,
+                               verbose=False, score=True, pack_size=2)
@@ -0,0 +1,68 @@
+import json
+
+from lars.nepho.journal import LabelJournal
+
+
+def test_record_appends_and_reloads(tmp_path):
+    path = tmp_path / "runs" / "journal.jsonl"
+    journal = LabelJournal(str(path))
+    journal.record("/data/a.png", "No Precipitation", "No Precipitation",
+                   time="2025-05-27 00:00:00")
+    journal.record("/data/b.png", "Isolated Convection", "isolated convection")
+
+    reloaded = LabelJournal(str(path))
+    assert len(reloaded) == 2
+    assert "/data/a.png" in reloaded
+    assert reloaded.get("/data/b.png")["raw_output"] == "isolated convection"
+    assert reloaded.get("/data/a.png")["time"] == "2025-05-27 00:00:00"
+
+
+def test_last_record_wins(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = LabelJournal(str(path))
+    journal.record("/data/a.png", "Unknown", "???")
+    journal.record("/data/a.png", "No Precipitation", "No Precipitation")
+
+    assert LabelJournal(str(path)).get("/data/a.png")["label"] == "No Precipitation"
+    assert len(path.read_text().splitlines()) == 2
+
+
+def test_truncated_final_line_is_ignored(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    good = {"file_path": "/data/a.png", "time": None,
+            "label": "No Precipitation", "raw_output": "No Precipitation"}
+    path.write_text(json.dumps(good) + "\n" + '{"file_path": "/data/b.p')
+
+    journal = LabelJournal(str(path))
+    assert "/data/a.png" in journal
+    assert "/data/b.png" not in journal
+
+
+def test_truncated_final_line_is_cut_before_appending(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    good = {"file_path": "/data/a.png", "time": None,
+            "label": "No Precipitation", "raw_output": "No Precipitation"}
+    path.write_text(json.dumps(good) + "\n" + '{"file_path": "/data/b.p')
+
+    LabelJournal(str(path)).record("/data/c.png", "Stratiform Precipitation",
+                                   "Stratiform Precipitation")
+
+    reloaded = LabelJournal(str(path))
+    assert "/data/a.png" in reloaded
+    assert "/data/c.png" in reloaded
+    assert [json.loads(line)["file_path"] for line in path.read_text().splitlines()] == [
+        "/data/a.png", "/data/c.png"]
+
+
+def test_complete_final_line_without_newline_is_kept(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    good = {"file_path": "/data/a.png", "time": None,
+            "label": "No Precipitation", "raw_output": "No Precipitation"}
+    path.write_text(json.dumps(good))
+
+    LabelJournal(str(path)).record("/data/b.png", "Isolated Convection",
+                                   "Isolated Convection")
+
+    reloaded = LabelJournal(str(path))
+    assert "/data/a.png" in reloaded
+    assert "/data/b.png" in reloaded
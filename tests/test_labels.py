@@ -166,3 +166,141 @@ def test_standardize_labels_does_not_mutate_input():
     standardize_labels(df)
 
     assert df["label"].tolist() == ["UNKNOWN"]
+
+
+_CHAINED_CRITERIA = {
+    "No Precipitation": [{
+        "field": "pct_gates_50dbz", "kind": "pct", "threshold_dbz": 50,
+        "max_value": 0.005, "reclassify_as": "Isolated Convection",
+    }],
+    "Isolated Convection": [{
+        "field": "pct_gates_30dbz", "kind": "pct", "threshold_dbz": 30,
+        "max_value": 1.3, "reclassify_as": "Mesoscale Convective System",
+    }],
+}
+
+
+def test_reclassify_label_matches_apply_criteria_to_labels():
+    from lars.preprocessing.labels import (apply_criteria_to_labels,
+                                           reclassify_label)
+
+    df = pd.DataFrame({
+        "label": ["No Precipitation", "No Precipitation",
+                  "Isolated Convection", "Stratiform Precipitation"],
+        "pct_gates_50dbz": [0.0, 0.1, 0.0, 5.0],
+        "pct_gates_30dbz": [0.0, 2.0, 0.5, 5.0],
+    })
+    expected = apply_criteria_to_labels(df, _CHAINED_CRITERIA)
+
+    for i, row in df.iterrows():
+        label, original, note = reclassify_label(row["label"], row,
+                                                 _CHAINED_CRITERIA)
+        assert label == expected.loc[i, "label"]
+        assert (original is None) == pd.isna(expected.loc[i, "label_original"])
+        if note is not None:
+            assert note == expected.loc[i, "label_criteria_violation"]
+
+
+def test_reclassify_label_skips_missing_fields():
+    from lars.preprocessing.labels import reclassify_label
+
+    assert reclassify_label("No Precipitation", {}, _CHAINED_CRITERIA) == (
+        "No Precipitation", None, None)
+
+
+def test_triage_labels_decides_only_unambiguous_rows():
+    from lars.preprocessing.labels import triage_labels
+
+    df = pd.DataFrame({
+        "pct_gates_10dbz": [0.0, 20.0, 0.2, None],
+        "pct_gates_30dbz": [0.0, 1.0, 0.0, 0.0],
+        "pct_gates_50dbz": [0.0, 0.0, 0.01, None],
+    })
+
+    decided = triage_labels(df, _CHAINED_CRITERIA)
+
+    assert decided[0] == "No Precipitation"
+    assert pd.isna(decided[1])
+    # Clear air by 10 dBZ but over the 50 dBZ criterion; the criteria then
+    # leave Isolated Convection as the only category.
+    assert decided[2] == "Isolated Convection"
+    assert pd.isna(decided[3])
+
+
+def test_triage_labels_uses_colors_only_when_asked():
+    from lars.preprocessing.labels import triage_labels
+
+    color_criteria = {
+        "No Precipitation": [{"kind": "max_pct_above",
+                              "field": "pct_gates_10dbz", "value": 0.5}],
+        "Isolated Convection": [{"kind": "min_pct_above",
+                                 "field": "pct_gates_30dbz", "value": 0.1}],
+    }
+    df = pd.DataFrame({"pct_gates_10dbz": [20.0], "pct_gates_30dbz": [1.0],
+                       "pct_gates_50dbz": [0.0]})
+
+    assert pd.isna(triage_labels(df, _CHAINED_CRITERIA, color_criteria)[0])
+    decided = triage_labels(df, _CHAINED_CRITERIA, color_criteria,
+                            use_color_criteria=True)
+    assert decided[0] == "Isolated Convection"
+
+
+def test_triage_labels_cannot_rule_out_categories_without_rules():
+    from lars.preprocessing.labels import triage_labels
+
+    df = pd.DataFrame({"pct_gates_10dbz": [0.0, 20.0],
+                       "pct_gates_30dbz": [0.0, 3.0],
+                       "pct_gates_50dbz": [0.0, 0.01]})
+    categories = ["No Precipitation", "Isolated Convection",
+                  "Mesoscale Convective System"]
+
+    decided = triage_labels(df, _CHAINED_CRITERIA, categories=categories)
+
+    assert decided[0] == "No Precipitation"
+    assert pd.isna(decided[1])
+
+
+def test_triage_labels_keeps_weak_echoes_out_of_no_precipitation():
+    from lars.nepho.inference import (CODEBOOK_CATEGORIES, CODEBOOK_COLOR_CRITERIA,
+                                      CODEBOOK_CRITERIA)
+    from lars.preprocessing.labels import triage_labels
+
+    # 45% of gates above 10 dBZ and 5% above 30 dBZ is widespread rain,
+    # even though it breaks none of the No Precipitation thresholds.
+    df = pd.DataFrame({"pct_gates_10dbz": [45.0, 0.1],
+                       "pct_gates_30dbz": [5.0, 0.0],
+                       "pct_gates_40dbz": [0.05, 0.0],
+                       "pct_gates_50dbz": [0.0, 0.0]})
+
+    decided = triage_labels(df, CODEBOOK_CRITERIA, CODEBOOK_COLOR_CRITERIA)
+    assert pd.isna(decided[0])
+    assert decided[1] == "No Precipitation"
+    decided = triage_labels(df, CODEBOOK_CRITERIA, CODEBOOK_COLOR_CRITERIA,
+                            categories=list(CODEBOOK_CATEGORIES))
+    assert pd.isna(decided[0])
+    assert decided[1] == "No Precipitation"
+
+
+def test_triage_labels_can_be_restricted_to_some_labels():
+    from lars.preprocessing.labels import triage_labels
+
+    df = pd.DataFrame({"pct_gates_50dbz": [0.0], "pct_gates_30dbz": [3.0]})
+
+    decided = triage_labels(df, _CHAINED_CRITERIA)
+    assert decided[0] == "No Precipitation"
+    restricted = triage_labels(df, _CHAINED_CRITERIA,
+                               labels=["Isolated Convection"])
+    assert pd.isna(restricted[0])
+
+
+def test_triage_labels_matches_clear_air_label_to_default_categories():
+    from lars.nepho.inference import DEFAULT_CATEGORIES
+    from lars.preprocessing.labels import triage_labels
+
+    df = pd.DataFrame({"pct_gates_10dbz": [0.0, 0.1, 45.0]})
+
+    decided = triage_labels(df, None, categories=list(DEFAULT_CATEGORIES),
+                            labels=["No Precipitation"])
+
+    assert list(decided[:2]) == ["No precipitation", "No precipitation"]
+    assert pd.isna(decided[2])
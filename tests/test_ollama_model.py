@@ -0,0 +1,312 @@
+import asyncio
+import json
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from lars.nepho.models.ollama_model import OllamaModel
+from lars.nepho.transport import HTTPTransport
+
+
+class _FakeOllama:
+    """Minimal Ollama HTTP API that records requests and connections."""
+
+    def __init__(self, models=("llava",), answer="Clear air"):
+        self.models = list(models)
+        self.answer = answer
+        self.requests = []
+        self.bodies = []
+        self.answer_stream = ["Clear", " Air\n", "The scan shows ", "no echoes", "."]
+        self.disconnected = False
+        self.overloaded = False
+        self.delay = 0
+        self.peers = set()
+        self.app = web.Application()
+        self.app.router.add_get("/api/tags", self.tags)
+        self.app.router.add_post("/api/generate", self.generate)
+        self.app.router.add_post("/api/chat", self.chat)
+        self.app.router.add_post("/api/pull", self.pull)
+
+    def _seen(self, request, path):
+        self.requests.append(path)
+        self.peers.add(request.transport.get_extra_info("peername"))
+
+    async def tags(self, request):
+        self._seen(request, "tags")
+        return web.json_response({"models": [{"name": m} for m in self.models]})
+
+    async def generate(self, request):
+        self._seen(request, "generate")
+        body = await request.json()
+        self.bodies.append(body)
+        if body.get("stream"):
+            return await self._stream(request)
+        return web.json_response({"response": self.answer, "prompt_eval_count": 10,
+                                  "eval_count": 2, "total_duration": 5e8,
+                                  "load_duration": 2e8,
+                                  "prompt_eval_duration": 1e8,
+                                  "eval_duration": 1.5e8})
+
+    async def _stream(self, request):
+        response = web.StreamResponse()
+        await response.prepare(request)
+        self.streamed = 0
+        try:
+            for piece in self.answer_stream:
+                await response.write((json.dumps({"response": piece, "done": False}) + "\n").encode())
+                self.streamed += 1
+                await asyncio.sleep(0.02)
+            await response.write((json.dumps({"response": "", "done": True, "eval_count": 9}) + "\n").encode())
+        except (ConnectionResetError, asyncio.CancelledError):
+            self.disconnected = True
+            raise
+        return response
+
+    async def chat(self, request):
+        self._seen(request, "chat")
+        if self.overloaded:
+            return web.Response(status=503, text="busy", headers={"Retry-After": "2"})
+        await request.json()
+        await asyncio.sleep(self.delay)
+        return web.json_response({"message": {"content": self.answer}})
+
+    async def pull(self, request):
+        self._seen(request, "pull")
+        body = await request.json()
+        await asyncio.sleep(0.05)
+        self.models.append(body["name"])
+        return web.json_response({"status": "success"})
+
+
+@pytest_asyncio.fixture
+async def fake_ollama():
+    fake = _FakeOllama()
+    server = TestServer(fake.app)
+    await server.start_server()
+    fake.url = str(server.make_url("")).rstrip("/")
+    yield fake
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_chat_reuses_pooled_connection(fake_ollama):
+    async with HTTPTransport() as transport:
+        model = OllamaModel("llava", base_url=fake_ollama.url, transport=transport)
+        for _ in range(3):
+            assert await model.chat("Hello") == "Clear air"
+        session = transport.session()
+        assert await model.list_available_models() == ["llava"]
+        assert transport.session() is session
+
+    assert session.closed
+    assert fake_ollama.requests.count("chat") == 3
+    assert len(fake_ollama.peers) == 1
+
+
+@pytest.mark.asyncio
+async def test_models_share_transport(fake_ollama):
+    async with HTTPTransport() as transport:
+        first = OllamaModel("llava", base_url=fake_ollama.url, transport=transport)
+        second = OllamaModel("llava", base_url=fake_ollama.url, transport=transport)
+        await first.chat("Hello")
+        await second.chat("Hello")
+    assert len(fake_ollama.peers) == 1
+
+
+@pytest.mark.asyncio
+async def test_transport_limits():
+    transport = HTTPTransport(limit=7, limit_per_host=3, keepalive_timeout=5)
+    connector = transport.session().connector
+    assert connector.limit == 7
+    assert connector.limit_per_host == 3
+    client = transport.openai_http_client()
+    assert transport.openai_http_client() is client
+    await transport.close()
+    assert client.is_closed
+
+
+def test_session_from_previous_loop_is_closed():
+    transport = HTTPTransport()
+
+    async def open_session():
+        return transport.session()
+
+    first = asyncio.run(open_session())
+    second = asyncio.run(open_session())
+    assert second is not first
+    asyncio.run(transport.close())
+    assert first.closed
+    assert second.closed
+
+
+@pytest.mark.asyncio
+async def test_availability_checked_once(fake_ollama):
+    async with HTTPTransport() as transport:
+        model = OllamaModel("llava", base_url=fake_ollama.url, transport=transport)
+        for _ in range(3):
+            await model.chat("Hello")
+    assert fake_ollama.requests.count("tags") == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_pull_once(fake_ollama):
+    async with HTTPTransport() as transport:
+        model = OllamaModel("bakllava", base_url=fake_ollama.url, transport=transport)
+        results = await asyncio.gather(*(model.chat("Hello") for _ in range(5)))
+    assert results == ["Clear air"] * 5
+    assert fake_ollama.requests.count("pull") == 1
+    assert fake_ollama.requests.count("tags") == 1
+
+
+@pytest.mark.asyncio
+async def test_availability_expires_after_ttl(fake_ollama):
+    async with HTTPTransport() as transport:
+        model = OllamaModel("llava", base_url=fake_ollama.url, transport=transport,
+                            ready_ttl=0)
+        await model.chat("Hello")
+        await model.chat("Hello")
+    assert fake_ollama.requests.count("tags") == 2
+
+
+@pytest.mark.asyncio
+async def test_ensure_ready_loads_with_keep_alive(fake_ollama):
+    async with HTTPTransport() as transport:
+        model = OllamaModel("llava", base_url=fake_ollama.url, transport=transport,
+                            keep_alive="1h")
+        load = await model.ensure_ready()
+        await model.chat("Describe", images=None)
+    assert load == pytest.approx(0.2)
+    assert fake_ollama.bodies[0] == {"model": "llava", "keep_alive": "1h"}
+    assert fake_ollama.requests.count("tags") == 1
+
+
+@pytest.mark.asyncio
+async def test_chat_reports_server_timings(tmp_path, fake_ollama):
+    from PIL import Image
+
+    image_path = str(tmp_path / "scan.png")
+    Image.new("RGB", (8, 8), color="white").save(image_path)
+    async with HTTPTransport() as transport:
+        model = OllamaModel("llava", base_url=fake_ollama.url, transport=transport)
+        result = await model.chat("Classify", images=[image_path])
+
+    assert result.prompt_tokens == 10
+    assert result.completion_tokens == 2
+    assert result.server_latency == pytest.approx(0.5)
+    assert result.load_latency == pytest.approx(0.2)
+    assert result.prompt_eval_latency == pytest.approx(0.1)
+    assert result.eval_latency == pytest.approx(0.15)
+
+
+@pytest.mark.asyncio
+async def test_streaming_cancels_once_label_recognized(tmp_path, fake_ollama):
+    from PIL import Image
+
+    image_path = str(tmp_path / "scan.png")
+    Image.new("RGB", (8, 8), color="white").save(image_path)
+    async with HTTPTransport() as transport:
+        model = OllamaModel("llava", base_url=fake_ollama.url, transport=transport,
+                            stream=True)
+        result = await model.chat("Classify", images=[image_path],
+                                  stop_labels=["Clear Air", "Isolated Convection"])
+        await asyncio.sleep(0.1)
+
+    assert fake_ollama.bodies[-1]["stream"] is True
+    assert result == "Clear Air"
+    assert result.stopped_early
+    assert fake_ollama.streamed < len(fake_ollama.answer_stream)
+
+
+@pytest.mark.asyncio
+async def test_streaming_without_label_returns_full_reply(tmp_path, fake_ollama):
+    from PIL import Image
+
+    image_path = str(tmp_path / "scan.png")
+    Image.new("RGB", (8, 8), color="white").save(image_path)
+    async with HTTPTransport() as transport:
+        model = OllamaModel("llava", base_url=fake_ollama.url, transport=transport,
+                            stream=True)
+        result = await model.chat("Classify", images=[image_path])
+
+    assert result == "".join(fake_ollama.answer_stream)
+    assert not result.stopped_early
+    assert result.completion_tokens == 9
+
+
+@pytest.mark.asyncio
+async def test_overload_raises_transient_error(fake_ollama):
+    from lars.nepho.retry import TransientModelError
+
+    fake_ollama.overloaded = True
+    async with HTTPTransport() as transport:
+        model = OllamaModel("llava", base_url=fake_ollama.url, transport=transport)
+        with pytest.raises(TransientModelError, match="503") as excinfo:
+            await model.chat("Hello")
+    assert excinfo.value.retry_after == 2.0
+    assert excinfo.value.status == 503
+
+
+@pytest_asyncio.fixture
+async def second_ollama():
+    fake = _FakeOllama()
+    server = TestServer(fake.app)
+    await server.start_server()
+    fake.url = str(server.make_url("")).rstrip("/")
+    yield fake
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_spreads_load_and_favours_faster_host(fake_ollama, second_ollama):
+    fake_ollama.delay = 0.01
+    second_ollama.delay = 0.05
+    async with HTTPTransport() as transport:
+        model = OllamaModel("llava", base_url=[fake_ollama.url, second_ollama.url],
+                            transport=transport)
+        # One request to each host measures its latency.
+        await model.chat("Hello")
+        await model.chat("Hello")
+        results = await asyncio.gather(*(model.chat("Hello") for _ in range(40)))
+
+    assert results == ["Clear air"] * 40
+    fast, slow = fake_ollama.requests.count("chat"), second_ollama.requests.count("chat")
+    assert fast + slow == 42
+    assert slow > 1
+    assert fast > 2 * slow
+    # Availability is checked once per server.
+    assert fake_ollama.requests.count("tags") == second_ollama.requests.count("tags") == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_fails_over_and_reprobes_dead_host(fake_ollama):
+    from lars.nepho.endpoints import EndpointPool
+
+    server = TestServer(web.Application())
+    await server.start_server()
+    dead_url = str(server.make_url("")).rstrip("/")
+    await server.close()
+
+    pool = EndpointPool([dead_url, fake_ollama.url], eject_time=0.05)
+    async with HTTPTransport() as transport:
+        model = OllamaModel("llava", pool=pool, transport=transport)
+        for _ in range(3):
+            assert await model.chat("Hello") == "Clear air"
+        dead = pool.endpoints[0]
+        assert dead.errors == 1
+        assert dead.ejected()
+
+        await asyncio.sleep(0.06)
+        await model.chat("Hello")
+
+    # The dead host was tried again once its ejection ran out.
+    assert dead.errors == 2
+    assert fake_ollama.requests.count("chat") == 4
+
+
+@pytest.mark.asyncio
+async def test_comma_separated_base_url(fake_ollama, second_ollama):
+    model = OllamaModel("llava", base_url=f"{fake_ollama.url}, {second_ollama.url}")
+    assert model.base_urls == [fake_ollama.url, second_ollama.url]
+    assert model.base_url == fake_ollama.url
@@ -0,0 +1,105 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from lars.nepho.ratelimit import (RateLimiter, TokenBucket, get_rate_limiter,
+                                  set_rate_limiter)
+
+
+def test_token_bucket_goes_into_debt_evenly():
+    bucket = TokenBucket(rate_per_minute=600)  # 10 per second, burst of 10
+    waits = [bucket.reserve(1) for _ in range(13)]
+
+    assert waits[:10] == [0.0] * 10
+    assert waits[10:] == pytest.approx([0.1, 0.2, 0.3], abs=0.01)
+
+
+def test_token_bucket_refund_returns_unused_tokens():
+    bucket = TokenBucket(rate_per_minute=60, capacity=10)
+    bucket.reserve(10)
+    bucket.refund(4)
+    assert bucket.reserve(4) == pytest.approx(0.0, abs=0.01)
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_paces_concurrent_requests():
+    limiter = RateLimiter(rpm=1200)  # 20 per second, burst of 20
+    start = time.monotonic()
+    await asyncio.gather(*(limiter.acquire() for _ in range(25)))
+    elapsed = time.monotonic() - start
+
+    assert 0.2 <= elapsed < 0.6
+    assert limiter.stats()["requests"] == 25
+    assert limiter.stats()["waits"] == 5
+    assert limiter.stats()["wait_time_s"] == pytest.approx(0.75, abs=0.05)
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_counts_tokens():
+    limiter = RateLimiter(tpm=60_000)  # 1000 tokens per second
+    assert await limiter.acquire(1000) == 0.0
+    limiter.settle(1000, 400)
+    assert await limiter.acquire(600) == pytest.approx(0.0, abs=0.01)
+    assert await limiter.acquire(100) == pytest.approx(0.1, abs=0.02)
+
+
+def test_limiters_are_shared_per_backend_and_key(monkeypatch):
+    from lars.nepho.config import config
+
+    monkeypatch.setattr(config, "OPENAI_RPM", 500.0)
+    try:
+        first = get_rate_limiter("openai", "key-a")
+        assert get_rate_limiter("openai", "key-a") is first
+        assert get_rate_limiter("openai", "key-b") is not first
+        assert first.rpm == 500.0
+        assert get_rate_limiter("ask_sage", "key-a").rpm is None
+    finally:
+        for backend, key in [("openai", "key-a"), ("openai", "key-b"), ("ask_sage", "key-a")]:
+            set_rate_limiter(backend, key, None)
+
+
+@pytest.mark.asyncio
+async def test_gpt_models_with_same_key_share_limiter():
+    from lars.nepho.models.gpt_model import GPTModel
+
+    limiter = RateLimiter(rpm=60)
+    set_rate_limiter("openai", "shared-key", limiter)
+    try:
+        with patch("lars.nepho.models.gpt_model.AsyncOpenAI") as mock_cls:
+            response = MagicMock()
+            response.choices[0].message.content = "Clear Air"
+            response.usage.prompt_tokens = 10
+            response.usage.completion_tokens = 2
+            mock_cls.return_value.chat.completions.create = AsyncMock(return_value=response)
+            first = GPTModel(model_name="gpt-4o", api_key="shared-key")
+            second = GPTModel(model_name="gpt-4o-mini", api_key="shared-key")
+
+            assert first.rate_limiter is second.rate_limiter is limiter
+            result = await first.chat("Hello")
+    finally:
+        set_rate_limiter("openai", "shared-key", None)
+
+    assert result.rate_limit_wait == 0.0
+    assert limiter.stats()["requests"] == 1
+
+
+@pytest.mark.asyncio
+async def test_label_radar_data_reports_rate_limit_wait():
+    import pandas as pd
+    from lars.nepho.inference import _usage_metrics, _UsageBudget, label_radar_data
+    from lars.nepho.models.base_model import BaseModel, ChatResult
+
+    class _WaitingModel(BaseModel):
+        async def chat(self, prompt, images=None):
+            return ChatResult("No Precipitation", rate_limit_wait=0.25)
+
+    df = pd.DataFrame({"file_path": ["/data/a.png", "/data/b.png"],
+                       "time": ["2025-05-27 00:00:00", "2025-05-27 00:01:00"]})
+    out = await label_radar_data(df, _WaitingModel("waiting"),
+                                 categories={"No Precipitation": ""}, verbose=False)
+
+    assert list(out["llm_rate_limit_wait"]) == [0.25, 0.25]
+    metrics = _usage_metrics(out, _UsageBudget())
+    assert metrics["usage/rate_limit_wait_total_s"] == 0.5
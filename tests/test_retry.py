@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import pytest
+
+from lars.nepho.models.base_model import BaseModel
+from lars.nepho.models.retrying_model import RetryingModel
+from lars.nepho.retry import (CircuitBreaker, RetryPolicy, TransientModelError,
+                              is_transient_status, parse_retry_after)
+
+
+class _FlakyModel(BaseModel):
+    """Fails with the queued exceptions before answering."""
+
+    def __init__(self, errors):
+        super().__init__("flaky")
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def chat(self, prompt, images=None):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "Clear Air"
+
+
+def _fast_policy(**kwargs):
+    return RetryPolicy(base_delay=0.001, max_delay=0.01, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_retries_transient_errors():
+    inner = _FlakyModel([TransientModelError("429"), TransientModelError("503")])
+    model = RetryingModel(inner, policy=_fast_policy(max_attempts=3))
+
+    assert await model.chat("Hello") == "Clear Air"
+    assert inner.calls == 3
+    assert model.stats()["retries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_attempts():
+    inner = _FlakyModel([TransientModelError("503")] * 5)
+    model = RetryingModel(inner, policy=_fast_policy(max_attempts=2))
+
+    with pytest.raises(TransientModelError):
+        await model.chat("Hello")
+    assert inner.calls == 2
+    assert model.stats()["failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_other_errors_are_not_retried():
+    inner = _FlakyModel([RuntimeError("invalid image")])
+    model = RetryingModel(inner, policy=_fast_policy())
+
+    with pytest.raises(RuntimeError, match="invalid image"):
+        await model.chat("Hello")
+    assert inner.calls == 1
+
+
+def test_delay_honours_retry_after_and_caps_backoff():
+    policy = RetryPolicy(base_delay=1, max_delay=8, jitter=False)
+
+    assert [policy.delay(n) for n in range(1, 6)] == [1, 2, 4, 8, 8]
+    assert policy.delay(1, retry_after=3) == 3
+    assert policy.delay(1, retry_after=100) == 8
+    assert 0 <= RetryPolicy(base_delay=1, max_delay=8).delay(3) <= 4
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_is_transient_status():
+    assert all(is_transient_status(s) for s in (408, 429, 500, 502, 503))
+    assert not any(is_transient_status(s) for s in (400, 401, 404, 409, 422))
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_pauses_then_probes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    start = time.monotonic()
+    await breaker.wait()
+    assert time.monotonic() - start >= 0.04
+    assert breaker.state == "half_open"
+
+    # Only one trial at a time; a failed trial reopens the breaker.
+    waiter = asyncio.ensure_future(breaker.wait())
+    await asyncio.sleep(0.02)
+    assert not waiter.done()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    await waiter
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.opened == 2
@@ -206,3 +206,22 @@ def test_log_run_to_mlflow_calls_expected_apis(monkeypatch):
     fake.log_artifacts.assert_called_with(
         outputs, artifact_path="model_outputs"
     )
+
+
+def test_log_run_to_mlflow_logs_extra_metrics(monkeypatch):
+    from lars.nepho import tracking
+
+    fake = MagicMock()
+    cm = MagicMock()
+    cm.__enter__ = MagicMock(return_value=MagicMock())
+    cm.__exit__ = MagicMock(return_value=False)
+    fake.start_run.return_value = cm
+    monkeypatch.setitem(sys.modules, "mlflow", fake)
+
+    df = pd.DataFrame({"label": ["x"], "llm_label": ["x"]})
+    tracking.log_run_to_mlflow(df, experiment="exp",
+                               metrics={"usage/total_tokens": 1234})
+
+    logged = fake.log_metrics.call_args.args[0]
+    assert logged["usage/total_tokens"] == 1234.0
+    assert "agreement/n_compared" in logged